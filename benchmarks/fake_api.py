@@ -0,0 +1,442 @@
+"""
+Local fake Whispertrades API used by the benchmark suite.
+
+Serves deterministic, pre-serialized payloads for the endpoints used by WTClient so that benchmarks measure the client and not the network or the real API. Nothing here talks to the internet.
+"""
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Union, get_args, get_origin
+from urllib.parse import parse_qs, urlparse
+
+import orjson
+from requests import Session
+
+from whispertrades.bot import Adjustment, EntryCondition, ExitCondition
+from whispertrades.report import BotReportDetail, ResultByDay, ResultByTimeframe, Results
+
+PAGE_SIZE = 100
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+
+#: Account sizes used by the benchmarks. Report years controls the size of each detailed report payload.
+ACCOUNT_SIZES = {
+    'small': {'bots': 3, 'orders': 60, 'positions': 30, 'variables': 5, 'reports': 2, 'report_years': 1},
+    'medium': {'bots': 20, 'orders': 1500, 'positions': 600, 'variables': 30, 'reports': 15, 'report_years': 3},
+    'huge': {'bots': 100, 'orders': 12000, 'positions': 5000, 'variables': 200, 'reports': 60, 'report_years': 8},
+}
+
+
+class UnlimitedSession(Session):
+    """Session that ignores adapters mounted by WTClient, so the client-side rate limiter does not throttle local benchmarks."""
+
+    def mount(self, prefix, adapter):
+        if prefix.startswith('http://127.0.0.1'):
+            return
+        super().mount(prefix, adapter)
+
+
+def _number(prefix: str, i: int) -> str:
+    return f'{prefix}{i:09d}'
+
+
+def _fill_numbers(model, rng: random.Random, **overrides) -> dict:
+    """Build a payload for a model whose remaining fields are all numeric (optionally nullable)."""
+    data = {}
+    for name, field in model.model_fields.items():
+        if name in overrides:
+            data[name] = overrides[name]
+            continue
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next(a for a in get_args(annotation) if a is not type(None))
+        if annotation is int:
+            data[name] = rng.randint(0, 500)
+        elif annotation is float:
+            data[name] = round(rng.uniform(-50, 50), 4)
+        elif not field.is_required():
+            continue
+        else:
+            raise TypeError(f'Cannot generate a value for {model.__name__}.{name}')
+    return data
+
+
+class FakeAccount:
+    """Deterministic synthetic account of a given size, with every response pre-serialized."""
+
+    def __init__(self, bots: int, orders: int, positions: int, variables: int, reports: int, report_years: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.broker = {'name': 'Benchmark Broker', 'number': _number('C', 0), 'account_number': '12345678'}
+        self.bots = [self._bot(i) for i in range(bots)]
+        self.orders = [self._order(i) for i in range(orders)]
+        self.positions = [self._position(i) for i in range(positions)]
+        self.variables = [self._variable(i) for i in range(variables)]
+        self.reports = [self._report(i, report_years) for i in range(reports)]
+
+        self.bot_details = {b['number']: dict(b, **self._bot_details(i)) for i, b in enumerate(self.bots)}
+        self.report_details = {r['number']: dict(r, results=self._results(report_years, detailed=True)) for r in self.reports}
+
+    def _bot(self, i: int) -> dict:
+        return {'name': f'Bot {i}', 'number': _number('B', i), 'broker_connection': self.broker, 'is_paper': bool(i % 2), 'status': 'Enabled',
+                'can_enable': False, 'can_disable': True, 'symbol': 'SPX', 'type': 'Put Credit Spread', 'notes': None,
+                'last_active_at': '2024-04-26T19:59:00.000000Z', 'disabled_at': None}
+
+    def _bot_variable(self, i: int) -> dict:
+        return {'number': _number('V', i), 'name': f'Variable {i}', 'value': str(i), 'condition': 'Greater Than', 'bot_value_to_set': 'Free Text'}
+
+    def _bot_details(self, i: int) -> dict:
+        entry = dict.fromkeys(EntryCondition.model_fields)
+        entry.update({'frequency': 'Daily', 'allocation_type': 'Contract Quantity', 'contract_quantity': 1, 'entry_speed': 'Normal', 'maximum_entries_per_day': 1,
+                      'earliest_time_of_day': '09:45', 'latest_time_of_day': '15:30', 'days_of_week': 'Monday, Wednesday, Friday', 'minutes_between_positions': 5,
+                      'minimum_days_to_expiration': 0, 'target_days_to_expiration': 7, 'maximum_days_to_expiration': 14, 'move_strike_selection_with_conflict': False,
+                      'variables': [self._bot_variable(i)], 'put_short_strike_type': 'Delta', 'put_short_strike_target_delta': 0.2,
+                      'call_spread_smart_width': False, 'put_spread_smart_width': True})
+        exit_condition = dict.fromkeys(ExitCondition.model_fields)
+        exit_condition.update({'exit_speed': 'Normal', 'profit_target_percent': '50%', 'stop_loss_percent': '200%', 'delta_stop': 0.5, 'monitored_stop_sensitivity': 'Normal',
+                               'variables': [], 'close_short_strike_only': False, 'sell_abandoned_long_strike': False, 'trailing_stop_sensitivity': 'Normal'})
+        adjustment = dict.fromkeys(Adjustment.model_fields)
+        adjustment.update({'number': _number('A', i), 'status': 'Enabled', 'type': 'Roll', 'days_of_week': 'All', 'days_to_expiration': 1, 'time_of_day': '10:00 to 15:30',
+                           'minimum_position_delta': '0.3', 'variables': []})
+        return {'entry_condition': entry, 'exit_condition': exit_condition, 'adjustments': [adjustment],
+                'notifications': [{'number': _number('N', i), 'event': 'Order Filled', 'type': 'Email'}], 'variables': [self._bot_variable(i)]}
+
+    def _bot_ref(self, i: int) -> dict:
+        bot = self.bots[i % len(self.bots)]
+        return {'name': bot['name'], 'number': bot['number']}
+
+    def _order(self, i: int) -> dict:
+        submitted = (datetime(2024, 1, 2, 14, 30) + timedelta(minutes=i)).isoformat() + 'Z'
+        legs = [{'number': n, 'type': 'PUT', 'instrument': f'SPX   240119P0470{n}000', 'expiration_date': '2024-01-19T00:00:00Z', 'strike_price': 4700.0 + n * 5,
+                 'instruction': 'SELL_TO_OPEN' if n == 1 else 'BUY_TO_OPEN', 'quantity': 1, 'bid': 1.1, 'mid': 1.2, 'ask': 1.3} for n in (1, 2)]
+        return {'number': _number('O', i), 'broker_order_number': str(100000 + i), 'status': 'FILLED', 'type': 'OPENING', 'duration': 'DAY', 'bot': self._bot_ref(i),
+                'is_paper': False, 'symbol': 'SPX', 'original_quantity': 1, 'current_quantity': 0, 'filled_quantity': 1, 'order_price': 1.05, 'fill_price': 1.05,
+                'broker_fee': 1.3, 'submitted_at': submitted, 'filled_at': submitted, 'canceled_at': None, 'legs': legs,
+                'submissions': [{'quantity': 1, 'price': 1.05, 'bid': 1.0, 'mid': 1.05, 'ask': 1.1, 'submitted_at': submitted}],
+                'fills': [{'leg_number': 1, 'quantity': 1, 'price': 1.05, 'filled_at': submitted, 'bid': 1.0, 'mid': 1.05, 'ask': 1.1}]}
+
+    def _position(self, i: int) -> dict:
+        entered = (datetime(2024, 1, 2, 14, 30) + timedelta(minutes=i)).isoformat() + 'Z'
+        is_open = i % 10 == 0
+        legs = [{'status': 'OPEN' if is_open else 'CLOSED', 'type': 'PUT', 'action': 'SELL_TO_OPEN' if n == 1 else 'BUY_TO_OPEN', 'instrument': f'SPX   240119P0470{n}000',
+                 'expiration_date': '2024-01-19', 'days_to_expiration': 7, 'days_to_expiration_at_exit': None if is_open else 3, 'strike_price': 4700.0 + n * 5,
+                 'quantity': 1, 'quantity_open': int(is_open), 'entered_at': entered, 'exited_at': None if is_open else entered, 'entry_bid': 1.0, 'entry_ask': 1.1,
+                 'entry_price': 1.05, 'exit_bid': None, 'exit_ask': None, 'exit_price': None, 'current_bid': 0.5, 'current_mid': 0.55, 'current_ask': 0.6,
+                 'current_profit': 50.0, 'current_delta': -0.1, 'profit_dollars': 50.0, 'delta_at_entry': -0.2, 'delta_at_exit': None, 'iv_at_entry': 0.15,
+                 'iv_at_exit': None, 'held_to_expiration': None, 'assigned': None, 'exercised': None} for n in (1, 2)]
+        return {'number': _number('P', i), 'status': 'OPEN' if is_open else 'CLOSED', 'bot': self._bot_ref(i), 'broker_connection': self.broker, 'is_paper': False,
+                'tags': '', 'symbol': 'SPX', 'type': 'Put Credit Spread', 'entered_at': entered, 'exited_at': None if is_open else entered, 'entry_bid': 1.0,
+                'entry_ask': 1.1, 'entry_price': 1.05, 'exit_bid': None, 'exit_ask': None, 'exit_price': None, 'broker_fee': 1.3, 'current_bid': 0.5,
+                'current_mid': 0.55, 'current_ask': 0.6, 'current_profit': 50.0, 'current_delta': -0.1, 'entry_value': 105.0, 'exit_value': None, 'max_risk': 395.0,
+                'profit_dollars': 50.0, 'starting_balance': 100000.0, 'ending_balance': None, 'underlying_at_entry': 4750.0, 'underlying_at_exit': None,
+                'vix_at_entry': 13.5, 'vix_at_exit': None, 'legs': legs}
+
+    def _variable(self, i: int) -> dict:
+        return {'number': _number('V', i), 'name': f'Variable {i}', 'value': str(i), 'free_text_value': None, 'last_updated_at': '2024-04-26T19:59:00.000000Z',
+                'bot': None, 'conditions': []}
+
+    def _timeframe(self, model, day: date) -> dict:
+        return _fill_numbers(model, self.rng, date=day.isoformat())
+
+    def _results(self, years: int, detailed: bool) -> dict:
+        results = _fill_numbers(Results, self.rng)
+        if not detailed:
+            return results
+        first_year = 2024 - years + 1
+        results['bots'] = [_fill_numbers(BotReportDetail, self.rng, **self._bot_ref(i)) for i in range(min(3, len(self.bots)))]
+        results['years'] = {}
+        for year in range(first_year, first_year + years):
+            year_data = self._timeframe(ResultByTimeframe, date(year, 1, 1))
+            year_data['months'] = {month: self._timeframe(ResultByTimeframe, date(year, m + 1, 1)) for m, month in enumerate(MONTHS)}
+            results['years'][str(year)] = year_data
+        day, end = date(first_year, 1, 1), date(first_year + years, 1, 1)
+        results['days'] = []
+        while day < end:
+            if day.weekday() < 5:
+                results['days'].append(_fill_numbers(ResultByDay, self.rng, date=day.isoformat()))
+            day += timedelta(days=1)
+        return results
+
+    def _report(self, i: int, years: int) -> dict:
+        return {'number': _number('R', i), 'name': f'Report {i}', 'status': 'Complete', 'completed_at': '2024-04-26T19:59:00.000000Z',
+                'start_date': f'{2024 - years + 1}-01-01', 'end_date': '2024-12-31', 'run_until_latest_date': False, 'is_public': False, 'symbol': 'SPX',
+                'nlv_source': 'Fixed Balance', 'nlv_amount': 100000.0, 'bot_statuses': ['Enabled'], 'brokers': [self.broker], 'bots': [self._bot_ref(i)],
+                'bot_tags': [], 'bot_position_tags': [], 'results': self._results(years, detailed=False)}
+
+
+def _envelope(data) -> bytes:
+    return orjson.dumps({'success': True, 'message': 'OK', 'data': data})
+
+
+class FakeAPIServer:
+    """
+    Threaded HTTP server replaying a FakeAccount. Use as a context manager; the client endpoint is available as ``server.endpoint``.
+
+    :param size: One of the keys of ACCOUNT_SIZES.
+    :param rate_limit: Optional, enforce this many requests per rate_window seconds like the real API, sending X-RateLimit headers and 429 with Retry-After when exceeded. Defaults to None, unlimited.
+    :param rate_window: Optional, defaults to 60.
+    :param latency: Optional, seconds to delay every response by, to simulate network round trips. Defaults to 0.
+    :param etags: Optional, send an ETag with GET responses and answer If-None-Match with 304 Not Modified. Defaults to False, like the real API, in which case unchanged data is sent again in full.
+    """
+
+    routes = [
+        (re.compile(r'^/v1/bots/orders/(\w*)$'), 'orders'),
+        (re.compile(r'^/v1/bots/positions/(\w*)$'), 'positions'),
+        (re.compile(r'^/v1/bots/variables/(\w*)$'), 'variables'),
+        (re.compile(r'^/v1/bots/reports/(\w*)$'), 'reports'),
+        (re.compile(r'^/v1/broker_connections/(\w*)$'), 'brokers'),
+        (re.compile(r'^/v1/bots/(\w*)$'), 'bots'),
+    ]
+
+    def __init__(self, size: str = 'small', rate_limit: int = None, rate_window: float = 60.0, latency: float = 0.0, etags: bool = False):
+        self.size = size
+        self.latency = latency
+        self.etags = etags
+        self.error_status: Optional[int] = None  # if set, every request fails with this status, to simulate an outage
+        self.fill_delay: float = 1.0  # seconds until the closing order of a closed position fills
+        self.rejected_closes: set[str] = set()  # position numbers whose closing orders are rejected after fill_delay instead of filled
+        self._fills: list[tuple[float, dict, dict]] = []  # (monotonic fill time, order, position) of working closing orders
+        self.report_delay: float = 2.0  # seconds a report run takes
+        self.report_start_delay: float = 0.0  # seconds a report run stays queued, still listed with the status and results of the previous run
+        self._starts: list[tuple[float, str]] = []  # (monotonic start time, report number) of queued report runs
+        self._runs: list[tuple[float, str]] = []  # (monotonic completion time, report number) of running reports
+        self.not_modified_count = 0
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rejected_count = 0
+        self._window_start = 0.0
+        self._window_count = 0
+        self.account = FakeAccount(**ACCOUNT_SIZES[size])
+        self.request_count = 0
+        self._cache: dict[tuple, bytes] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1/'
+
+    def _paginate(self, items: list, query: dict) -> list:
+        page = int(query.get('page', ['1'])[0])
+        return items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+
+    def _filter(self, items: list, query: dict) -> list:
+        bot_number = query.get('bot', [''])[0]
+        if bot_number:
+            items = [i for i in items if i['bot']['number'] == bot_number]
+        status = query.get('status', [''])[0]
+        if status:
+            items = [i for i in items if i['status'] == status]
+        from_date = query.get('from_date', [''])[0]
+        if from_date:
+            items = [i for i in items if (i.get('submitted_at') or i.get('entered_at'))[:10] >= from_date]
+        return items
+
+    def _apply_due(self):
+        """Fill or reject closing orders, and start and complete report runs that are due"""
+        now = time.monotonic()
+        with self._lock:
+            started = [number for at, number in self._starts if at <= now]
+            if started:
+                self._starts = [r for r in self._starts if r[0] > now]
+                for number in started:
+                    for report in (self._report(number), self.account.report_details[number]):
+                        report['status'] = 'Running'
+                self._cache.clear()
+            done = [number for at, number in self._runs if at <= now]
+            if done:
+                self._runs = [r for r in self._runs if r[0] > now]
+                completed_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+                for number in done:
+                    for report in (self._report(number), self.account.report_details[number]):
+                        report.update({'status': 'Complete', 'completed_at': completed_at})
+                self._cache.clear()
+            due = [f for f in self._fills if f[0] <= now]
+            if not due:
+                return
+            self._fills = [f for f in self._fills if f[0] > now]
+            filled_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+            for _, order, position in due:
+                if position['number'] in self.rejected_closes:
+                    order.update({'status': 'REJECTED', 'current_quantity': 0})
+                    continue
+                order.update({'status': 'FILLED', 'current_quantity': 0, 'filled_quantity': order['original_quantity'], 'fill_price': order['order_price'], 'filled_at': filled_at,
+                              'fills': [{'leg_number': leg['number'], 'quantity': leg['quantity'], 'price': leg['mid'], 'filled_at': filled_at, 'bid': leg['bid'], 'mid': leg['mid'],
+                                         'ask': leg['ask']} for leg in order['legs']]})
+                position.update({'status': 'CLOSED', 'exited_at': filled_at, 'exit_price': order['order_price']})
+                for leg in position['legs']:
+                    leg.update({'status': 'CLOSED', 'quantity_open': 0, 'exited_at': filled_at})
+            self._cache.clear()
+
+    def _report(self, number: str) -> Optional[dict]:
+        return next((r for r in self.account.reports if r['number'] == number), None)
+
+    def _update_report(self, number: str, body: bytes, run: bool) -> Optional[bytes]:
+        """Change the name or dates of a report, or queue a run that starts after report_start_delay and completes report_delay later"""
+        report = self._report(number)
+        if report is None:
+            return None
+        with self._lock:
+            if run:
+                now = time.monotonic()
+                self._runs.append((now + self.report_start_delay + self.report_delay, number))
+                if self.report_start_delay:
+                    self._starts.append((now + self.report_start_delay, number))
+                    return _envelope([])
+                changes = {'status': 'Running'}
+            else:
+                changes = {k: v for k, v in orjson.loads(body or b'{}').items() if k in ('name', 'start_date', 'end_date', 'run_until_latest_date')}
+            report.update(changes)
+            self.account.report_details[number].update(changes)
+            self._cache.clear()
+        return _envelope([])
+
+    def _close_position(self, number: str) -> Optional[bytes]:
+        """Add a WORKING closing order for an open position, filled (or rejected, see rejected_closes) after fill_delay. Returns the position, still open, like the real API."""
+        account = self.account
+        position = next((p for p in account.positions if p['number'] == number), None)
+        if position is None:
+            return None
+        if position['status'] != 'OPEN':
+            return orjson.dumps({'success': False, 'message': 'Position is not open', 'data': []})
+        with self._lock:
+            order = account._order(len(account.orders))
+            submitted = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+            legs = [{**leg, 'instruction': {'SELL_TO_OPEN': 'BUY_TO_CLOSE', 'BUY_TO_OPEN': 'SELL_TO_CLOSE'}[p_leg['action']], 'instrument': p_leg['instrument'],
+                     'quantity': p_leg['quantity_open']} for leg, p_leg in zip(order['legs'], position['legs'])]
+            order.update({'status': 'WORKING', 'type': 'CLOSING', 'bot': position['bot'], 'current_quantity': 1, 'filled_quantity': 0, 'fill_price': None,
+                          'submitted_at': submitted, 'filled_at': None, 'legs': legs, 'submissions': [{**order['submissions'][0], 'submitted_at': submitted}], 'fills': []})
+            account.orders.insert(0, order)  # newest first
+            self._fills.append((time.monotonic() + self.fill_delay, order, position))
+            self._cache.clear()
+        return _envelope(position)
+
+    def respond(self, path: str, query: dict) -> Optional[bytes]:
+        self._apply_due()
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+        if key in self._cache:
+            return self._cache[key]
+        account = self.account
+        for pattern, kind in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            number = match.groups()[-1]
+            if kind in ('orders', 'positions'):
+                items = account.positions if kind == 'positions' else account.orders
+                if number:
+                    data = next((i for i in items if i['number'] == number), None)
+                else:
+                    data = self._paginate(self._filter(items, query), query)
+            elif kind == 'bots':
+                details = query.get('include_details', ['False'])[0].lower() == 'true'
+                bots = [account.bot_details[b['number']] for b in account.bots] if details else account.bots
+                data = next((b for b in bots if b['number'] == number), None) if number else bots
+            elif kind == 'variables':
+                data = next((v for v in account.variables if v['number'] == number), None) if number else account.variables
+            elif kind == 'reports':
+                data = account.report_details.get(number) if number else account.reports
+            else:
+                data = [account.broker] if not number else account.broker
+            body = _envelope(data) if data is not None else None
+            self._cache[key] = body
+            return body
+        return None
+
+    def update(self, path: str, body: bytes) -> bytes:
+        """Apply a PUT. Variable updates change the account and return the variable like the real API, position closes add a closing order and report updates and runs change the report; other actions return an empty envelope."""
+        match = re.match(r'^/v1/bots/positions/(\w+)/close$', path)
+        if match:
+            return self._close_position(match.group(1))
+        match = re.match(r'^/v1/bots/reports/(\w+)(/run)?$', path)
+        if match:
+            return self._update_report(match.group(1), body, bool(match.group(2)))
+        match = re.match(r'^/v1/bots/variables/(\w+)$', path)
+        if not match:
+            return _envelope([])
+        variable = next((v for v in self.account.variables if v['number'] == match.group(1)), None)
+        if variable is None:
+            return None
+        variable.update({k: v for k, v in orjson.loads(body or b'{}').items() if k in ('name', 'value')})
+        with self._lock:
+            self._cache.clear()
+        return _envelope(variable)
+
+    def _rate_limit_headers(self) -> dict:
+        if self.rate_limit is None:
+            return {}
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            remaining = self.rate_limit - self._window_count
+            headers = {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Remaining': str(max(0, remaining))}
+            if remaining < 0:
+                self.rejected_count += 1
+                headers['Retry-After'] = str(max(1, math.ceil(self._window_start + self.rate_window - now)))
+            return headers
+
+    def __enter__(self) -> 'FakeAPIServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            wbufsize = 1 << 16  # send headers and body in one segment, avoiding delayed-ACK stalls on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def _reply(self, body: Optional[bytes], status: int = 200, etag: bool = False):
+                if server.latency:
+                    time.sleep(server.latency)
+                headers = server._rate_limit_headers()
+                if server.error_status:
+                    status, body = server.error_status, orjson.dumps({'message': 'Server Error'})
+                elif headers.get('Retry-After'):
+                    status, body = 429, orjson.dumps({'message': 'Too Many Attempts.'})
+                elif body is None:
+                    status, body = 404, orjson.dumps({'success': False, 'message': 'Not found', 'data': []})
+                elif etag:
+                    headers['ETag'] = f'"{zlib.crc32(body):08x}-{len(body)}"'
+                    if self.headers.get('If-None-Match') == headers['ETag']:
+                        with server._lock:
+                            server.not_modified_count += 1
+                        status, body = 304, b''
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                url = urlparse(self.path)
+                self._reply(server.respond(url.path, parse_qs(url.query)), etag=server.etags)
+
+            def do_PUT(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                with server._lock:
+                    server.request_count += 1
+                self._reply(server.update(urlparse(self.path).path, body))
+
+            do_POST = do_PUT
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
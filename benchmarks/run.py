@@ -0,0 +1,309 @@
+"""
+Benchmark suite for WTClient hot paths, run against a local fake API (see fake_api.py).
+
+Usage::
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --sizes small medium --compare results.json --threshold 0.2
+
+Every benchmark records the per-operation time in seconds (min, median and mean over the repeats) so that result files from different commits can be compared directly. With --compare, the run fails with exit code 1 if any benchmark's median got slower than the baseline by more than the threshold.
+"""
+import argparse
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from typing import Callable, Optional
+
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from fake_api import ACCOUNT_SIZES, FakeAPIServer, UnlimitedSession  # noqa: E402
+
+import whispertrades  # noqa: E402
+from whispertrades import WTClient  # noqa: E402
+from whispertrades.bot import BotResponse  # noqa: E402
+from whispertrades.common import UpdatingDict  # noqa: E402
+from whispertrades.order import OrderResponse  # noqa: E402
+from whispertrades.position import PositionResponse  # noqa: E402
+from whispertrades.report import Report, ReportResponse, parse_report  # noqa: E402
+
+TOKEN = 'benchmark-token'
+
+
+def measure(fn: Callable[[], object], repeat: int, number: int = 1, setup: Optional[Callable[[], object]] = None) -> dict:
+    """Time fn, returning seconds per call. setup runs before each repeat and is not timed."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return {'min': min(timings), 'median': statistics.median(timings), 'mean': statistics.fmean(timings), 'repeat': repeat, 'number': number}
+
+
+def new_client(server: FakeAPIServer, auto_init: bool = False, auto_refresh: bool = False) -> WTClient:
+    return WTClient(token=TOKEN, auto_init=auto_init, auto_refresh=auto_refresh, session=UnlimitedSession(), endpoint=server.endpoint)
+
+
+def bench_construction(server: FakeAPIServer, repeat: int) -> dict:
+    return measure(lambda: new_client(server, auto_init=True), repeat)
+
+
+def bench_bootstrap_modes(size: str, latency: float, repeat: int) -> dict:
+    """auto_init in each bootstrap mode against a server with simulated network latency, where concurrency matters."""
+    results = {}
+    with FakeAPIServer(size, latency=latency) as server:
+        for mode in ('sequential', 'parallel'):
+            results[mode] = measure(lambda: WTClient(token=TOKEN, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint, bootstrap=mode), repeat)
+    return results
+
+
+def bench_thread_pool(size: str, latency: float, repeat: int) -> dict:
+    """Paginated fetches and report detail fetches with and without a thread pool, against a server with simulated network latency."""
+    results = {}
+    with FakeAPIServer(size, latency=latency) as server:
+        for workers in (1, 4):
+            def client():
+                return WTClient(token=TOKEN, auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint, response_cache=False, max_workers=workers)
+            results[f'orders.workers_{workers}'] = measure(lambda: client().get_orders(), repeat)
+            results[f'reports_detailed.workers_{workers}'] = measure(lambda: client().get_reports(detailed=True), repeat)
+    return results
+
+
+def bench_pagination(server: FakeAPIServer, repeat: int) -> dict:
+    return {
+        'orders': measure(lambda: new_client(server).get_orders(), repeat),
+        'positions': measure(lambda: new_client(server).get_positions(), repeat),
+    }
+
+
+def bench_unchanged_refresh(server: FakeAPIServer, repeat: int) -> dict:
+    """Refreshing collections whose data did not change, with the response cache (conditional GET, parse skipped) and without it."""
+    results = {}
+    for cached in (True, False):
+        client = WTClient(token=TOKEN, auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint, response_cache=cached)
+        client.get_orders()
+        client.get_positions()
+        key = 'cached' if cached else 'uncached'
+        results[f'orders.{key}'] = measure(client.get_orders, repeat)
+        results[f'positions.{key}'] = measure(client.get_positions, repeat)
+    return results
+
+
+def bench_attribute_access(server: FakeAPIServer, repeat: int) -> dict:
+    results = {}
+    for auto_refresh in (False, True):
+        client = new_client(server, auto_refresh=auto_refresh)
+        client.get_orders(page=1)
+        client.get_positions(page=1)
+        order = next(iter(client._orders.values()))
+        position = next(iter(client._positions.values()))
+        number = 20 if auto_refresh else 10000
+        key = 'auto_refresh' if auto_refresh else 'cached'
+        results[f'order.status.{key}'] = measure(lambda: order.status, repeat, number)
+        results[f'position.current_mid.{key}'] = measure(lambda: position.current_mid, repeat, number)
+        results[f'order.number.{key}'] = measure(lambda: order.number, repeat, number)
+    return results
+
+
+def bench_updating_dict(repeat: int) -> dict:
+    plain = UpdatingDict(update_fn=None, **{str(i): i for i in range(1000)})
+    updating = UpdatingDict(update_fn=lambda key: int(key), **{str(i): i for i in range(1000)})
+    return {
+        'without_update_fn': measure(lambda: plain['500'], repeat, 10000),
+        'with_update_fn': measure(lambda: updating['500'], repeat, 1000),
+    }
+
+
+def bench_monthly_results(server: FakeAPIServer, repeat: int) -> dict:
+    number = server.account.reports[0]['number']
+    report = Report(parse_report(orjson.loads(orjson.dumps(server.account.report_details[number]))), new_client(server), auto_refresh=False)
+
+    def rebuild():
+        report._monthly_results = None
+        return report.monthly_results
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return measure(rebuild, repeat, 100)
+
+
+def bench_parsing(server: FakeAPIServer, repeat: int) -> dict:
+    """Validation time for one 100-item page, starting from the raw response bytes."""
+    account = server.account
+    pages = {
+        'orders': (OrderResponse, orjson.dumps(account.orders[:100])),
+        'positions': (PositionResponse, orjson.dumps(account.positions[:100])),
+        'bots_detailed': (BotResponse, orjson.dumps([account.bot_details[b['number']] for b in account.bots][:100])),
+    }
+    results = {}
+    for name, (model, page) in pages.items():
+        items = len(orjson.loads(page))
+        r = measure(lambda: [model(**item) for item in orjson.loads(page)], repeat, 10)
+        r['items'] = items
+        r['items_per_second'] = items / r['median']
+        results[name] = r
+    return results
+
+
+IMPORT_STATEMENTS = {
+    'package': 'import whispertrades',
+    'client': 'from whispertrades import WTClient',
+    'models': 'from whispertrades import Bot, Order, Position, Report, Variable',
+}
+
+
+def bench_import_time(repeat: int) -> dict:
+    """Cold import time of the package, measured in a fresh interpreter per repeat so nothing is cached in sys.modules."""
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src, os.environ.get('PYTHONPATH')])))
+    results = {}
+    for name, statement in IMPORT_STATEMENTS.items():
+        code = f'import time\nstart = time.perf_counter()\n{statement}\nprint(time.perf_counter() - start)'
+        timings = [float(subprocess.check_output([sys.executable, '-c', code], env=env)) for _ in range(repeat)]
+        results[name] = {'min': min(timings), 'median': statistics.median(timings), 'mean': statistics.fmean(timings), 'repeat': repeat, 'number': 1}
+    return results
+
+
+def bench_report_parsing(server: FakeAPIServer, repeat: int) -> dict:
+    """Parsing the largest detailed report from its raw bytes, validating every day as a ResultByDay model (full) or into columns (columnar), and the memory each result retains."""
+    body = max((orjson.dumps(r) for r in server.account.report_details.values()), key=len)
+    parsers = {'full': lambda: ReportResponse(**orjson.loads(body)), 'columnar': lambda: parse_report(orjson.loads(body))}
+    results = {}
+    for name, parse in parsers.items():
+        r = measure(parse, repeat)
+        gc.collect()
+        tracemalloc.start()
+        parsed = parse()
+        r['retained_bytes'] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del parsed
+        r['days'] = len(orjson.loads(body)['results']['days'])
+        results[name] = r
+    return results
+
+
+def bench_mark_store(server: FakeAPIServer, repeat: int, refreshes: int = 200) -> Optional[dict]:
+    """Recording the marks of all open positions on every refresh, and range queries over the recorded history. Skipped if numpy is not installed."""
+    try:
+        from whispertrades.snapshots import PositionMarkStore
+    except ImportError:
+        return None
+    client = new_client(server)
+    client.get_positions()
+    positions = list(client._positions.values())
+    with tempfile.TemporaryDirectory() as directory, PositionMarkStore(directory, dedupe=False) as store:
+        clock = iter(range(1_700_000_000, 1_700_000_000 + refreshes * 60, 60))
+        results = {'record_refresh': measure(lambda: store.record(positions, timestamp=next(clock)), 1, refreshes)}
+        number = next(p.number for p in positions if p._PositionResponse.status == 'OPEN')
+        results['query_position'] = measure(lambda: store.query(number), repeat, 10)
+        results['query_window'] = measure(lambda: store.query(start=1_700_000_000 + refreshes * 15, end=1_700_000_000 + refreshes * 30, leg=None), repeat, 10)
+    return results
+
+
+def bench_peak_memory(server: FakeAPIServer) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    client = new_client(server, auto_init=True)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del client
+    return {'peak_bytes': peak, 'retained_bytes': current}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: list[str], repeat: int, latency: float = 0.02) -> dict:
+    results = {'import_time': bench_import_time(repeat), 'updating_dict': bench_updating_dict(repeat), 'bootstrap_with_latency': bench_bootstrap_modes('small', latency, repeat),
+               'thread_pool_with_latency': bench_thread_pool('medium', latency, repeat)}
+    for size in sizes:
+        with FakeAPIServer(size) as server:
+            print(f'Running {size} account benchmarks...', file=sys.stderr)
+            results[size] = {
+                'construction_auto_init': bench_construction(server, max(1, repeat // 2) if size == 'huge' else repeat),
+                'pagination': bench_pagination(server, repeat),
+                'unchanged_refresh': bench_unchanged_refresh(server, repeat),
+                'attribute_access': bench_attribute_access(server, repeat),
+                'monthly_results_rebuild': bench_monthly_results(server, repeat),
+                'parse_page': bench_parsing(server, repeat),
+                'parse_report': bench_report_parsing(server, repeat),
+                'mark_store': bench_mark_store(server, repeat),
+                'memory': bench_peak_memory(server),
+                'requests_served': server.request_count,
+            }
+    return {
+        'meta': {'whispertrades': whispertrades.__version__, 'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'timestamp': time.time(), 'latency': latency, 'sizes': {s: ACCOUNT_SIZES[s] for s in sizes}},
+        'results': results,
+    }
+
+
+def flatten(results: dict, prefix: str = '') -> dict[str, float]:
+    """Flatten nested benchmark results to {dotted.name: median seconds} (or bytes for memory entries)."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict) and 'median' in value:
+            flat[name] = value['median']
+        elif isinstance(value, dict) and 'peak_bytes' in value:
+            flat[f'{name}.peak_bytes'] = value['peak_bytes']
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a description of every benchmark that regressed by more than threshold (a fraction) against the baseline."""
+    now, before = flatten(current['results']), flatten(baseline['results'])
+    regressions = []
+    for name, value in sorted(now.items()):
+        if name in before and before[name] > 0 and (value - before[name]) / before[name] > threshold:
+            regressions.append(f'{name}: {before[name]:.6g} -> {value:.6g} (+{(value / before[name] - 1) * 100:.1f}%)')
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark whispertrades against a local fake API.')
+    parser.add_argument('--sizes', nargs='+', choices=list(ACCOUNT_SIZES), default=list(ACCOUNT_SIZES), help='account sizes to benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed repeats per benchmark')
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated network latency in seconds for the bootstrap mode benchmark (default 0.02)')
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown as a fraction of the baseline median (default 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.latency)
+    output = orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output.decode() + '\n')
+
+    if args.compare:
+        with open(args.compare, 'rb') as f:
+            regressions = compare(results, orjson.loads(f.read()), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,9 +14,15 @@ setup(
     install_requires=[
         'requests',
         'pydantic>=2.0',
-        'orjson',
-        'requests-ratelimiter'
+        'orjson'
     ],
+    extras_require={
+        'analytics': ['numpy'],
+        'parquet': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['whispertrades = whispertrades.cli:main'],
+    },
     python_requires='>=3.8',
     classifiers=[
         'License :: OSI Approved :: Apache Software License',
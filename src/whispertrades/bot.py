@@ -1,21 +1,22 @@
+from collections.abc import Mapping
 from datetime import datetime, time
-from typing import Literal, Optional, TYPE_CHECKING
+from functools import lru_cache
+from typing import Callable, Literal, Optional, TYPE_CHECKING
 
-from pydantic import BaseModel, field_validator
+from pydantic import TypeAdapter, field_validator
 
 if TYPE_CHECKING:
     from . import WTClient
     from .order import Order
     from .position import Position
     from .report import Report
-from .common import APIError, BaseResponse
+from .common import APIError, BasicBot, Detachable, LazyModel
+from .instrumentation import traced
 from .variable import BaseVariable
 from .broker_connection import BaseBrokerConnection
 
-import orjson
 
-
-class DaysOfWeek(BaseModel):
+class DaysOfWeek(LazyModel):
     days_of_week: str
 
     @field_validator('days_of_week')
@@ -48,7 +49,7 @@ class BotVariable(BaseVariable):
     ]] = None
 
 
-class EntryCondition(BaseModel):
+class EntryCondition(LazyModel):
     frequency: Literal["Sequential", "Daily", "Weekly"]
     allocation_type: Literal["Leverage Amount", "Contract Quantity", "Percent of Portfolio"]
     contract_quantity: Optional[int]
@@ -156,7 +157,7 @@ class EntryCondition(BaseModel):
             raise ValueError(f"Invalid days_of_week type: must be DaysOfWeek or dict, got {type(value)}")
 
 
-class ExitCondition(BaseModel):
+class ExitCondition(LazyModel):
     exit_speed: Literal["Super Patient", "Patient", "Normal", "Aggressive", "Super Aggressive"]
     profit_premium_value: Optional[str]
     profit_target_percent: Optional[str]
@@ -176,7 +177,7 @@ class ExitCondition(BaseModel):
     trailing_stop_sensitivity: Literal["Patient", "Normal", "Aggressive"]
 
 
-class AdjustmentTime(BaseModel):
+class AdjustmentTime(LazyModel):
     start_time: time
     end_time: Optional[time]
 
@@ -192,7 +193,7 @@ class AdjustmentTime(BaseModel):
         return cls(**{'start_time': start_time, 'end_time': end_time})
 
 
-class Adjustment(BaseModel):
+class Adjustment(LazyModel):
     number: str
     status: str
     type: str
@@ -236,7 +237,7 @@ class Adjustment(BaseModel):
             raise ValueError(f"Invalid time_of_day type: must be AdjustmentTime or str, got {type(value)}")
 
 
-class Notification(BaseModel):
+class Notification(LazyModel):
     number: str
     event: Literal[
         "Order Placed",
@@ -252,11 +253,6 @@ class Notification(BaseModel):
     type: Literal["Email"]
 
 
-class BasicBot(BaseModel):
-    name: str
-    number: str
-
-
 class BotResponse(BasicBot):
     broker_connection: BaseBrokerConnection
     is_paper: bool
@@ -275,8 +271,41 @@ class BotResponse(BasicBot):
     variables: list[Optional[BotVariable]] = None
 
 
-class Bot:
-    def __init__(self, data: BotResponse, client: 'WTClient', auto_refresh: bool = True):
+DETAIL_FIELDS = ('entry_condition', 'exit_condition', 'adjustments', 'notifications', 'variables')  #: BotResponse fields only returned with include_details
+_detail_types = {
+    'entry_condition': EntryCondition,
+    'exit_condition': ExitCondition,
+    'adjustments': list[Optional[Adjustment]],
+    'notifications': list[Optional[Notification]],
+    'variables': list[Optional[BotVariable]],
+}
+
+
+@lru_cache(maxsize=None)
+def _detail_validator(name: str) -> Callable:
+    """Validator for one detail field, built on first use as it compiles a schema."""
+    return TypeAdapter(_detail_types[name]).validate_python
+
+
+def split_details(bot_data: dict) -> tuple[dict, Optional[dict]]:
+    """
+    Split a raw bot payload into its summary part and its unvalidated detail part.
+
+    :return: (summary, details) where details is None if the payload has no details
+    """
+    if not any(name in bot_data for name in DETAIL_FIELDS):
+        return bot_data, None
+    summary = {k: v for k, v in bot_data.items() if k not in DETAIL_FIELDS}
+    return summary, {name: bot_data.get(name) for name in DETAIL_FIELDS}
+
+
+class Bot(Detachable):
+    """
+    A bot. Details (entry_condition, exit_condition, adjustments, notifications and variables) are loaded lazily: the raw payload is kept and only validated when a detail attribute is first accessed, and if the bot was loaded in summary form, the first access fetches them from the API.
+    Use WTClient.prefetch_details() to load details of many bots in one request.
+    """
+
+    def __init__(self, data: BotResponse, client: 'WTClient', auto_refresh: bool = True, details: dict = None):
         self._BotResponse: BotResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
         self.auto_refresh: bool = auto_refresh  #: auto_refresh toggle inherited from WTClient
@@ -293,74 +322,142 @@ class Bot:
         self.notes: Optional[str] = data.notes  #: Bot notes
         self.last_active_at: Optional[datetime] = data.last_active_at  #: Last active time
         self.disabled_at: Optional[datetime] = data.disabled_at  #: Disabled time
-        self.entry_condition: EntryCondition = data.entry_condition  #: Entry condition
-        self.exit_condition: ExitCondition = data.exit_condition  #: Exit condition
-        self.adjustments: list[Optional[Adjustment]] = data.adjustments  #: Adjustments
-        self.notifications: list[Optional[Notification]] = data.notifications  #: Notifications
-        self.variables: list[Optional[BotVariable]] = data.variables  #: Variables
+        self._raw_details: Optional[dict] = details  # unvalidated detail payload, None if details were not fetched
+        self._details: dict = {name: getattr(data, name) for name in DETAIL_FIELDS if getattr(data, name) is not None}  # validated details
+        if self._details and self._raw_details is None:  # constructed from a fully validated BotResponse
+            self._raw_details = {}
 
         self.endpoint: str = f'{self.client.endpoint}bots/{self.number}/'
 
-        self._orders: dict[str, 'Order'] = {}
-        self._positions: dict[str, 'Position'] = {}
+        self._orders: Mapping[str, 'Order'] = client._bot_view('orders', self.number)  # views of the client collections, the bot holds no orders or positions itself
+        self._positions: Mapping[str, 'Position'] = client._bot_view('positions', self.number)
 
     def __repr__(self):
         return f'<Bot {self.number} - {self.name}>'
 
+    def detach(self) -> 'Bot':
+        """Detached copy of this bot, including detached copies of its linked orders and positions. The bot itself stays attached."""
+        bot = super().detach()
+        bot._orders = {number: order.detach() for number, order in self._orders.items()}
+        bot._positions = {number: position.detach() for number, position in self._positions.items()}
+        return bot
+
+    def attach(self, client: 'WTClient', auto_refresh: bool = None) -> 'Bot':
+        """
+        Attach this bot and its linked orders and positions to a client. Does not add them to the cached collections of the client.
+
+        :param auto_refresh: Optional, defaults to the auto_refresh setting of the client.
+        :return: this bot
+        """
+        for item in (*self._orders.values(), *self._positions.values()):
+            item.attach(client, auto_refresh)
+        return super().attach(client, auto_refresh)
+
+    @property
+    def details_loaded(self) -> bool:
+        """If details were fetched from the API. They may not have been validated yet."""
+        return self._raw_details is not None
+
+    def _detail(self, name: str):
+        if name not in self._details:
+            if self._raw_details is None:
+                cached = self.client.get_bot(self.number, include_details=True)  # fills in _raw_details of the cached instance
+                if cached is not self:  # e.g. attached after unpickling, keep the details here too so that they survive the next round trip
+                    self._raw_details = cached._raw_details
+                if self._raw_details is None:
+                    raise APIError(f"Details of bot {self.number} were not returned by the API")
+            value = self._raw_details.get(name)
+            self._details[name] = _detail_validator(name)(value) if value is not None else None
+            setattr(self._BotResponse, name, self._details[name])
+        return self._details[name]
+
+    def load_details(self):
+        """Fetch details if needed and validate all of them now."""
+        for name in DETAIL_FIELDS:
+            self._detail(name)
+
+    @property
+    def entry_condition(self) -> Optional[EntryCondition]:
+        """Entry condition. Loaded on first access."""
+        return self._detail('entry_condition')
+
+    @property
+    def exit_condition(self) -> Optional[ExitCondition]:
+        """Exit condition. Loaded on first access."""
+        return self._detail('exit_condition')
+
+    @property
+    def adjustments(self) -> Optional[list[Optional[Adjustment]]]:
+        """Adjustments. Loaded on first access."""
+        return self._detail('adjustments')
+
+    @property
+    def notifications(self) -> Optional[list[Optional[Notification]]]:
+        """Notifications. Loaded on first access."""
+        return self._detail('notifications')
+
+    @property
+    def variables(self) -> Optional[list[Optional[BotVariable]]]:
+        """Variables. Loaded on first access."""
+        return self._detail('variables')
+
+    @traced
     def enable(self):
         """
         Enable a bot that is currently disabled or disable on close
         Auth Required: Write Bots
         """
-        response = self.client.session.put(self.endpoint + 'enable', headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/{number}/enable', number=self.number)
         if not response.success:
             raise APIError(response.message)
 
+    @traced
     def disable(self):
         """
         Disable a bot that is currently enabled. If the bot has open positions, the bot will move to Disable on Close. If there are no open positions, the bot will move to Disabled.
         Auth Required: Write Bots
         """
-        response = self.client.session.put(self.endpoint + 'disable', headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/{number}/disable', number=self.number)
         if not response.success:
             raise APIError(response.message)
 
+    @traced
     def open_position(self):
         """
         Open a new position for the bot. This is only valid during market hours, while the bot is enabled, and while the bot has no more than one position currently open. This API request will ignore any entry filters configured for the bot and will immediately enter a new position when submitted.
         Auth Required: Write Positions
         """
-        response = self.client.session.post(self.endpoint + 'open', headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('POST', 'bots/{number}/open', number=self.number)
         if not response.success:
             raise APIError(response.message)
 
+    @traced
     def close_all_positions(self):
         """
         Close open position(s) for the bot. This is only valid during market hours and while the bot is set to Enabled or Disable on Close.
         Auth Required: Write Positions
         """
-        response = self.client.session.put(self.endpoint + 'close', headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/{number}/close', number=self.number)
         if not response.success:
             raise APIError(response.message)
 
     @property
-    def orders(self) -> dict[str, 'Order']:
+    @traced
+    def orders(self) -> Mapping[str, 'Order']:
+        """Orders of this bot, the same objects as in client.orders. Read-only, reflects every later refresh of the client. Refreshes load all orders of the bot the first time, then only those from the oldest WORKING one on."""
         if not self._orders or self.auto_refresh:
-            orders = self.client.get_orders(bot=self)
-            self._orders.update(orders)
+            self._orders = self.client._refresh_bot('orders', self.number)
         return self._orders
 
     @property
-    def positions(self) -> dict[str, 'Position']:
+    @traced
+    def positions(self) -> Mapping[str, 'Position']:
+        """Positions of this bot, the same objects as in client.positions. Read-only, reflects every later refresh of the client. Refreshes load all positions of the bot the first time, then only those from the oldest OPEN one on."""
         if not self._positions or self.auto_refresh:
-            positions = self.client.get_positions(bot=self)
-            self._positions.update(positions)
+            self._positions = self.client._refresh_bot('positions', self.number)
         return self._positions
 
     @property
+    @traced
     def reports(self) -> list['Report']:
         return [r for r in self.client.reports.values() if self.number in (b.number for b in r.bots)]
@@ -1,15 +1,14 @@
 from datetime import datetime
 from typing import Literal, Optional, TYPE_CHECKING
 
-import orjson
-from pydantic import BaseModel
 
 if TYPE_CHECKING:
     from . import WTClient
-from .common import APIError, BaseResponse
+from .common import APIError, Detachable, LazyModel
+from .instrumentation import traced
 
 
-class BaseBrokerConnection(BaseModel):
+class BaseBrokerConnection(LazyModel):
     name: Optional[str]
     number: str
     account_number: str
@@ -22,7 +21,7 @@ class BrokerConnectionResponse(BaseBrokerConnection):
     expires_at: Optional[datetime]
 
 
-class BrokerConnection:
+class BrokerConnection(Detachable):
     def __init__(self, data: BrokerConnectionResponse, client: 'WTClient', auto_refresh: bool = True):
         self._BrokerConnectionResponse: BrokerConnectionResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
@@ -41,12 +40,12 @@ class BrokerConnection:
     def __repr__(self):
         return str(self._BrokerConnectionResponse)
 
+    @traced
     def rebalance_collateral(self):
         """
         Rebalance your collateral position for a given broker connection. This requires that the collateral be configured and enabled at Whispertrades. If your current collateral balance is within the minimum and maximum target amounts, a transaction will not happen.
         Auth Required: Write Broker Connections
         """
-        response = self.client.session.put(self.endpoint + 'collateral/rebalance', headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'broker_connections/{number}/collateral/rebalance', number=self.number)
         if not response.success:
             raise APIError(response.message)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Optional, Union
+
+import orjson
+from pydantic import BaseModel
+from requests import Response
+
+from .common import BaseResponse
+
+
+class CacheEntry:
+    """Validators and parsed envelope of the last response received for one URL."""
+    __slots__ = ('etag', 'last_modified', 'digest', 'response', 'stored_at')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], digest: bytes, response: BaseResponse, stored_at: float = None):
+        self.etag: Optional[str] = etag  #: ETag header of the response, if any
+        self.last_modified: Optional[str] = last_modified  #: Last-Modified header of the response, if any
+        self.digest: bytes = digest  #: hash of the response body, used when the server sends no validators or ignores them
+        self.response: BaseResponse = response  #: parsed envelope, returned again while the body is unchanged
+        self.stored_at: float = time.time() if stored_at is None else stored_at  #: unix time the data was last confirmed by the server
+
+
+def _encode(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Sequence):  # compact forms such as report.DailyResults
+        return list(obj)
+    raise TypeError(f"Cannot encode {type(obj)}")
+
+
+class ResponseCache:
+    """
+    Cache of GET responses for conditional requests. Requests are always sent, so data is never served without asking the server, but they carry If-None-Match / If-Modified-Since from the previous response of the same URL.
+    If the server answers 304 Not Modified, or sends a body that is byte for byte identical to the cached one, the previously parsed envelope is returned with cached=True, skipping JSON decoding and model validation, and the client keeps its existing objects.
+    Entries are evicted least recently used first. All entries are dropped after any request that may modify data (PUT, POST, DELETE), as the client may have updated its objects from that response.
+    With max_age, responses confirmed by the server within the last max_age seconds are served without sending a request at all. Entries can be saved to and loaded from a file, so that separate processes (e.g. repeated command line invocations) share them.
+
+    :param max_entries: Optional, maximum number of URLs to keep, defaults to 512.
+    :param max_age: Optional, seconds for which a response is served without asking the server. Defaults to None, always send a conditional request.
+    """
+
+    def __init__(self, max_entries: int = 512, max_age: float = None):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits: int = 0  #: responses served from cache (304 or identical body)
+        self.misses: int = 0  #: responses that were new or changed and had to be parsed
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(content: bytes) -> bytes:
+        return hashlib.blake2b(content, digest_size=16).digest()
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """Conditional request headers for a URL, empty if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def fresh(self, url: str) -> Optional[BaseResponse]:
+        """Return a copy of the cached envelope if it is younger than max_age, so no request is needed, else None"""
+        if self.max_age is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or time.time() - entry.stored_at > self.max_age:
+                return None
+            self._entries.move_to_end(url)
+            self.hits += 1
+        return entry.response.model_copy(update={'cached': True})
+
+    def stale(self, url: str) -> Optional[BaseResponse]:
+        """Return a copy of the cached envelope flagged stale regardless of its age, e.g. while the API is down, or None if the URL is not cached"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return None
+        return entry.response.model_copy(update={'cached': True, 'stale': True})
+
+    def lookup(self, url: str, response: Response) -> Optional[BaseResponse]:
+        """
+        Return a copy of the cached envelope if the response shows that the data of the URL did not change, else None.
+        The copy is shallow, so callers may reassign its attributes but must not change the data it holds, other than replacing values by equivalent compact forms (see report.parse_report).
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or (response.status_code != 304 and (response.status_code != 200 or self.digest(response.content) != entry.digest)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            entry.stored_at = time.time()
+            self.hits += 1
+        return entry.response.model_copy(update={'cached': True})
+
+    def store(self, url: str, response: Response, parsed: BaseResponse):
+        """Remember a successful response and its parsed envelope. Anything other than a successful 200 response removes the URL instead."""
+        with self._lock:
+            if response.status_code != 200 or not parsed.success:
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = CacheEntry(response.headers.get('ETag'), response.headers.get('Last-Modified'), self.digest(response.content), parsed.model_copy())
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url: str = None):
+        """Drop one URL, or all entries if url is None"""
+        with self._lock:
+            if url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(url, None)
+
+    def save(self, path: Union[str, os.PathLike]):
+        """Write all entries to a file, replacing it atomically. The file holds account data and is only readable by the current user."""
+        with self._lock:
+            entries = [{'url': url, 'etag': e.etag, 'last_modified': e.last_modified, 'digest': e.digest.hex(), 'stored_at': e.stored_at,
+                        'response': {'success': e.response.success, 'message': e.response.message, 'data': e.response.data, 'pages': e.response.pages}}
+                       for url, e in self._entries.items()]
+        content = orjson.dumps({'version': 1, 'entries': entries}, default=_encode)
+        temp = f'{os.fspath(path)}.{os.getpid()}.tmp'
+        with open(os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(content)
+        os.replace(temp, path)
+
+    def load(self, path: Union[str, os.PathLike]) -> int:
+        """
+        Add the entries saved in a file by save(). Entries of this cache for the same URLs are replaced. A missing or unreadable file is ignored.
+
+        :return: number of entries loaded
+        """
+        try:
+            with open(path, 'rb') as f:
+                saved = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return 0
+        if not isinstance(saved, dict) or saved.get('version') != 1:
+            return 0
+        with self._lock:
+            for item in saved['entries']:  # validated when first received
+                self._entries[item['url']] = CacheEntry(item['etag'], item['last_modified'], bytes.fromhex(item['digest']), BaseResponse.model_construct(**item['response']), item['stored_at'])
+                self._entries.move_to_end(item['url'])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return len(saved['entries'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f'<ResponseCache entries={len(self._entries)} max_age={self.max_age} hits={self.hits} misses={self.misses}>'
@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Callable, Literal
+
+FAMILIES = ('bots', 'brokers', 'orders', 'positions', 'variables', 'reports')
+
+
+def endpoint_family(path: str) -> str:
+    """Endpoint family of an API path, e.g. "orders" for "bots/orders/{number}". One of FAMILIES."""
+    if path.startswith('broker_connections'):
+        return 'brokers'
+    for family in ('orders', 'positions', 'variables', 'reports'):
+        if family in path:
+            return family
+    return 'bots'
+
+
+class Circuit:
+    """State of the circuit of one endpoint family."""
+    __slots__ = ('state', 'failures', 'retry_at', 'reset_timeout', 'probing')
+
+    def __init__(self, reset_timeout: float):
+        self.state: Literal['closed', 'open', 'half_open'] = 'closed'  #: closed: requests are sent, open: requests fail fast, half_open: one trial request is in flight
+        self.failures: int = 0  #: consecutive failed requests
+        self.retry_at: float = 0.0  # monotonic time after which a probe or trial request may be sent
+        self.reset_timeout: float = reset_timeout  # seconds to stay open, doubled after each failed probe
+        self.probing: bool = False
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an endpoint family (bots, brokers, orders, positions, variables, reports) while the API is failing for it, so that a degraded API does not block every caller on timeouts and retries.
+    After failure_threshold consecutive failures (connection errors, timeouts, 5xx responses after retries, or responses slower than slow_threshold), the circuit opens: requests of the family are not sent, and WTClient serves the last response cached for the same URL with stale=True, or raises CircuitOpenError if there is none. Auto-refreshing attributes of orders, positions and variables then keep their last known values.
+    After reset_timeout seconds, the last failed GET request is sent again on a background thread (or, for other requests, the next call is let through) to probe for recovery. If it succeeds the circuit closes, otherwise it stays open twice as long, up to max_reset_timeout.
+
+    :param failure_threshold: Optional, consecutive failures that open the circuit, defaults to 5.
+    :param reset_timeout: Optional, seconds before the first probe, defaults to 30.
+    :param max_reset_timeout: Optional, maximum seconds between probes, defaults to 300.
+    :param slow_threshold: Optional, seconds after which a successful response still counts as a failure. Defaults to None, only errors count.
+    :param serve_stale: Optional, defaults to True, serve cached responses while open. If False, always raise CircuitOpenError.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, max_reset_timeout: float = 300.0, slow_threshold: float = None, serve_stale: bool = True):
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1, got {failure_threshold}")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.slow_threshold = slow_threshold
+        self.serve_stale = serve_stale
+        self.circuits: dict[str, Circuit] = {}  #: circuits by endpoint family, created on first failure
+        self._lock = threading.Lock()
+
+    def state(self, family: str) -> Literal['closed', 'open', 'half_open']:
+        circuit = self.circuits.get(family)
+        return circuit.state if circuit is not None else 'closed'
+
+    def retry_in(self, family: str) -> float:
+        """Seconds until the next probe of an open circuit, 0 if closed or due"""
+        circuit = self.circuits.get(family)
+        return max(0.0, circuit.retry_at - time.monotonic()) if circuit is not None and circuit.state != 'closed' else 0.0
+
+    def allow(self, family: str) -> bool:
+        """If a request of the family may be sent now. Lets one trial request through once an open circuit is due and no background probe is running."""
+        with self._lock:
+            circuit = self.circuits.get(family)
+            if circuit is None or circuit.state == 'closed':
+                return True
+            if circuit.state == 'open' and not circuit.probing and time.monotonic() >= circuit.retry_at:
+                circuit.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self, family: str):
+        with self._lock:
+            circuit = self.circuits.get(family)
+            if circuit is not None:
+                circuit.state = 'closed'
+                circuit.failures = 0
+                circuit.reset_timeout = self.reset_timeout
+
+    def record_failure(self, family: str, probe: Callable[[], bool] = None):
+        """
+        Count a failed request, opening the circuit at the threshold or if it was a trial.
+
+        :param probe: Optional, function that repeats the failed request and returns whether it succeeded. If given, recovery is probed with it on a background thread.
+        """
+        with self._lock:
+            circuit = self.circuits.setdefault(family, Circuit(self.reset_timeout))
+            circuit.failures += 1
+            if circuit.state == 'open' or (circuit.state == 'closed' and circuit.failures < self.failure_threshold):
+                return
+            if circuit.state == 'half_open':  # the trial failed, back off
+                circuit.reset_timeout = min(circuit.reset_timeout * 2, self.max_reset_timeout)
+            circuit.state = 'open'
+            circuit.retry_at = time.monotonic() + circuit.reset_timeout
+            circuit.probing = probe is not None
+        if probe is not None:
+            timer = threading.Timer(circuit.reset_timeout, self._probe, (family, probe))
+            timer.daemon = True
+            timer.start()
+
+    def release(self, family: str):
+        """Return a trial that ended without a recorded outcome (e.g. a local timeout or an interrupted read) by opening the circuit again with a fresh retry time, so that a later call can try again."""
+        with self._lock:
+            circuit = self.circuits.get(family)
+            if circuit is not None and circuit.state == 'half_open' and not circuit.probing:
+                circuit.state = 'open'
+                circuit.retry_at = time.monotonic() + circuit.reset_timeout
+
+    def _probe(self, family: str, probe: Callable[[], bool]):
+        with self._lock:
+            circuit = self.circuits.get(family)
+            if circuit is None or circuit.state == 'closed':  # reset meanwhile
+                return
+            circuit.state = 'half_open'
+        try:
+            ok = probe()
+        except Exception:
+            ok = False
+        with self._lock:
+            circuit.probing = False
+        if ok:
+            self.record_success(family)
+        else:
+            self.record_failure(family, probe)
+
+    def reset(self, family: str = None):
+        """Close one circuit, or all if family is None. A probe already scheduled still runs."""
+        with self._lock:
+            for name in ([family] if family is not None else list(self.circuits)):
+                self.circuits.pop(name, None)
+
+    def _reinit_after_fork(self):
+        self._lock = threading.Lock()
+        for circuit in self.circuits.values():
+            circuit.probing = False  # the timer thread did not survive, let the next call try
+
+    def __repr__(self):
+        states = ', '.join(f'{name}={c.state}' for name, c in self.circuits.items() if c.state != 'closed')
+        return f'<CircuitBreaker failure_threshold={self.failure_threshold} reset_timeout={self.reset_timeout:g}s{" " + states if states else ""}>'
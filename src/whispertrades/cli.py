@@ -0,0 +1,374 @@
+"""
+Command line interface, installed as the whispertrades command (or python -m whispertrades).
+Responses and the rate limiter state are kept on disk between invocations, per API token, so repeated commands within --max-age seconds send no requests and later ones only send conditional requests. Invocations running at the same time share the rate limit budget.
+"""
+import argparse
+import csv
+import hashlib
+import os
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional, TextIO
+
+import orjson
+
+from .cache import ResponseCache
+from .client import ENDPOINT, WTClient
+from .common import APIError, BulkActionError, InvalidTokenError, ReportRunningWarning, TokenPermissionError
+from .ratelimit import AdaptiveRateLimiter
+from .report_jobs import ReportJob
+
+try:
+    import fcntl
+except ImportError:  # Windows, concurrent invocations are not serialized
+    fcntl = None
+
+RESOURCES = ('bots', 'orders', 'positions', 'variables', 'reports', 'brokers')
+#: columns shown by the table output of each resource, nested fields are joined with dots
+COLUMNS = {
+    'bots': ['number', 'name', 'status', 'symbol', 'type', 'is_paper'],
+    'orders': ['number', 'bot.number', 'status', 'type', 'symbol', 'current_quantity', 'order_price', 'fill_price', 'submitted_at'],
+    'positions': ['number', 'bot.number', 'status', 'symbol', 'type', 'entered_at', 'entry_price', 'current_mid', 'current_profit', 'profit_dollars'],
+    'variables': ['number', 'name', 'value', 'bot'],
+    'reports': ['number', 'name', 'status', 'symbol', 'start_date', 'end_date', 'completed_at'],
+    'brokers': ['number', 'name', 'broker', 'status', 'net_liquidation_value'],
+}
+
+
+def default_cache_dir() -> str:
+    """WHISPERTRADES_CACHE_DIR, else whispertrades in XDG_CACHE_HOME or ~/.cache"""
+    return os.getenv('WHISPERTRADES_CACHE_DIR') or os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'whispertrades')
+
+
+class LocalState:
+    """
+    Response cache and rate limiter state of one API token, stored in a directory named after a hash of the token.
+
+    :param directory: base cache directory
+    :param token: API token
+    """
+
+    def __init__(self, directory: str, token: str):
+        self.directory = os.path.join(directory, hashlib.sha256(token.encode()).hexdigest()[:16])
+        self.cache_path = os.path.join(self.directory, 'responses.json')
+        self.limiter_path = os.path.join(self.directory, 'limiter.json')
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold an exclusive lock on the state, so concurrent invocations do not interleave reads and writes"""
+        with open(os.path.join(self.directory, '.lock'), 'w') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _limiter_state(self) -> dict:
+        try:
+            with open(self.limiter_path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return {}
+
+    def load(self, cache: Optional[ResponseCache], limiter: AdaptiveRateLimiter):
+        with self.locked():
+            limiter.import_state(self._limiter_state())
+            if cache is not None:
+                cache.load(self.cache_path)
+
+    def save(self, cache: Optional[ResponseCache], limiter: AdaptiveRateLimiter):
+        """Write the state. Requests sent meanwhile by other invocations are merged into the limiter state, responses are replaced by this invocation's."""
+        with self.locked():
+            limiter.import_state(self._limiter_state())
+            temp = f'{self.limiter_path}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as f:
+                f.write(orjson.dumps(limiter.export_state()))
+            os.replace(temp, self.limiter_path)
+            if cache is not None:
+                cache.save(self.cache_path)
+
+    def clear(self):
+        with self.locked():
+            for path in (self.cache_path, self.limiter_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def _flatten(data: dict, prefix: str = '') -> dict:
+    row = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            row.update(_flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, list):
+            row[f'{prefix}{key}'] = orjson.dumps(value).decode()
+        else:
+            row[f'{prefix}{key}'] = value
+    return row
+
+
+def to_row(obj) -> dict:
+    """Flat dict of the API data of a Bot, Order, Position, Variable, Report or BrokerConnection, with nested fields joined with dots and lists as JSON"""
+    data = getattr(obj, f'_{type(obj).__name__}Response')  # the response model, as attribute access may trigger a refresh
+    exclude = {'results': {'days', 'years'}} if type(obj).__name__ == 'Report' else None  # daily and yearly results do not fit a row
+    return _flatten(data.model_dump(mode='json', exclude=exclude))
+
+
+def fetch(client: WTClient, resource: str, bot: str = None, status: str = None) -> list[dict]:
+    """Rows of a resource, filtered by bot number and status where applicable"""
+    if resource == 'bots':
+        items = client.get_bots(statuses=[status] if status else None)
+    elif resource == 'orders':
+        items = client.get_orders(bot=bot, status=status)
+    elif resource == 'positions':
+        items = client.get_positions(bot=bot, status=status)
+    elif resource == 'variables':
+        items = client.get_variables()
+    elif resource == 'reports':
+        items = client.get_reports()
+    else:
+        items = client.get_broker_connections()
+    rows = [to_row(item) for item in items.values()]  # the client returns everything it has cached, filter again
+    if bot and resource in ('orders', 'positions'):
+        rows = [r for r in rows if r['bot.number'] == bot]
+    elif bot and resource == 'variables':
+        rows = [r for r in rows if r['bot'] == bot]
+    if status:
+        rows = [r for r in rows if str(r.get('status', '')).upper() == status.upper()]
+    return rows
+
+
+def print_table(rows: list[dict], columns: list[str], out: TextIO = None, max_width: int = 40):
+    out = out or sys.stdout
+    cells = [[('' if row.get(c) is None else str(row.get(c)))[:max_width] for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print('  '.join(c.ljust(w) for c, w in zip(columns, widths)).rstrip(), file=out)
+    for r in cells:
+        print('  '.join(v.ljust(w) for v, w in zip(r, widths)).rstrip(), file=out)
+
+
+def write_rows(rows: list[dict], output: str, columns: list[str], out: TextIO = None):
+    """Print rows as a table (only the given columns), JSON lines or CSV"""
+    out = out or sys.stdout
+    if output == 'table':
+        print_table(rows, columns, out)
+    elif output == 'json':
+        for row in rows:
+            out.write(orjson.dumps(row).decode() + '\n')
+    else:
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        writer = csv.DictWriter(out, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def export(rows: list[dict], path: str, file_format: str = None) -> str:
+    """
+    Write rows to a CSV or Parquet file. Parquet requires pyarrow.
+
+    :param file_format: Optional, csv or parquet. Defaults to the file extension, else csv.
+    :return: the format written
+    """
+    file_format = file_format or ('parquet' if path.endswith(('.parquet', '.pq')) else 'csv')
+    if file_format == 'parquet':
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow. Install it with: pip install whispertrades[parquet]") from e
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            write_rows(rows, 'csv', [], f)
+    return file_format
+
+
+@contextmanager
+def _always_ask(client: WTClient) -> Iterator[None]:
+    """Send (conditional) requests while polling, as responses within max_age would otherwise be served from cache"""
+    cache = client.response_cache
+    max_age = cache.max_age if cache is not None else None
+    if cache is not None:
+        cache.max_age = None
+    try:
+        yield
+    finally:
+        if cache is not None:
+            cache.max_age = max_age
+
+
+def wait_for_report(client: WTClient, number: str, timeout: float = None, poll: float = 10.0, started_at: datetime = None):
+    """
+    Poll a report until it is no longer running, then return it with details
+
+    :param started_at: Optional, UTC time the run was requested. Until the run is seen running, a report completed before this time is the result of the previous run and not returned. Defaults to None, any status but Running is final.
+    """
+    start = time.monotonic()
+    job = ReportJob(number)
+    job.started_at = started_at
+    with _always_ask(client):
+        while True:
+            response = client._request('GET', 'bots/reports/{number}', number=number)
+            if not response.success:
+                raise APIError(response.message)
+            status = response.data['status']
+            finished = job._finished(status, response.data.get('completed_at')) if started_at is not None else status != 'Running'
+            if finished:
+                break
+            if timeout is not None and time.monotonic() - start + poll > timeout:
+                raise TimeoutError(f"Report {number} still running after {timeout}s")
+            time.sleep(poll)
+    with client._lock:
+        client._reports_cache.pop(number, None)  # built from a response before the run, so it would be reused as the cached response is unchanged since the last poll
+    return client.get_report(number)  # served from the response just received
+
+
+def watch_orders(client: WTClient, state: Optional[LocalState], args: argparse.Namespace):
+    """Print orders, then one line per new, changed or disappeared order every interval seconds"""
+    previous = None
+    polls = 0
+    with _always_ask(client):
+        while True:
+            rows = {row['number']: row for row in fetch(client, 'orders', args.bot, args.status)}
+            if previous is None:
+                write_rows(list(rows.values()), args.output, COLUMNS['orders'])
+            else:
+                now = time.strftime('%H:%M:%S')
+                for number, row in rows.items():
+                    if number not in previous:
+                        print(f"{now} + {number} {row['status']} {row['symbol']}")
+                    elif row['status'] != previous[number]['status'] or row['current_quantity'] != previous[number]['current_quantity']:
+                        print(f"{now} ~ {number} {previous[number]['status']} -> {row['status']} quantity {row['current_quantity']}")
+                for number in previous.keys() - rows.keys():
+                    print(f"{now} - {number}")
+            sys.stdout.flush()
+            previous = rows
+            polls += 1
+            if state is not None:
+                state.save(client.response_cache, client.rate_limiter)
+            if args.count and polls >= args.count:
+                return
+            time.sleep(args.watch)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='whispertrades', description='Query and manage a Whispertrades account.')
+    parser.add_argument('--token', help='API token, defaults to the WHISPERTRADES_API_KEY environment variable')
+    parser.add_argument('--endpoint', default=ENDPOINT, help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', default=default_cache_dir(), help='directory of the local cache, defaults to %(default)s')
+    parser.add_argument('--max-age', type=float, default=60.0, help='seconds for which cached responses are used without any request, defaults to %(default)s')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the local response cache')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent requests for pages and bulk actions, defaults to %(default)s')
+    parser.add_argument('--output', '-o', choices=('table', 'json', 'csv'), default='table', help='output format, defaults to %(default)s')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for resource in RESOURCES:
+        sub = commands.add_parser(resource, help=f'list {resource}')
+        if resource in ('orders', 'positions', 'variables'):
+            sub.add_argument('--bot', help='only this bot number')
+        if resource in ('bots', 'orders', 'positions'):
+            sub.add_argument('--status', help='only this status, e.g. Enabled, WORKING or OPEN')
+        if resource == 'orders':
+            sub.add_argument('--watch', type=float, metavar='SECONDS', help='keep polling and print changes every SECONDS')
+            sub.add_argument('--count', type=int, help='with --watch, stop after this many polls')
+
+    for action in ('enable', 'disable'):
+        sub = commands.add_parser(action, help=f'{action} bots')
+        sub.add_argument('bots', nargs='*', help='bot numbers')
+        sub.add_argument('--all', action='store_true', help=f'{action} all bots')
+
+    report = commands.add_parser('report', help='run or wait for a report')
+    report.add_argument('action', choices=('run', 'wait', 'show'))
+    report.add_argument('number', help='report number')
+    report.add_argument('--wait', action='store_true', help='with run, wait until the report completed')
+    report.add_argument('--timeout', type=float, help='maximum seconds to wait')
+    report.add_argument('--poll', type=float, default=10.0, help='seconds between status checks, defaults to %(default)s')
+
+    sub = commands.add_parser('export', help='write a resource to a CSV or Parquet file')
+    sub.add_argument('resource', choices=RESOURCES)
+    sub.add_argument('path')
+    sub.add_argument('--format', choices=('csv', 'parquet'), help='defaults to the file extension, else csv')
+    sub.add_argument('--bot', help='only this bot number')
+    sub.add_argument('--status', help='only this status')
+
+    sub = commands.add_parser('cache', help='show or clear the local cache')
+    sub.add_argument('action', choices=('info', 'clear'))
+    return parser
+
+
+def run(args: argparse.Namespace, client: WTClient, state: Optional[LocalState]) -> int:
+    if args.command in RESOURCES:
+        if args.command == 'orders' and args.watch:
+            watch_orders(client, state, args)
+        else:
+            write_rows(fetch(client, args.command, getattr(args, 'bot', None), getattr(args, 'status', None)), args.output, COLUMNS[args.command])
+    elif args.command in ('enable', 'disable'):
+        if not args.bots and not args.all:
+            raise SystemExit(f'{args.command}: give bot numbers or --all')
+        try:
+            results = client.bulk_bot_action(args.command, bots=args.bots or None)
+        except BulkActionError as e:
+            for number, error in e.errors.items():
+                print(f'{number}: {error}', file=sys.stderr)
+            results = e.results
+            for number in results:
+                print(f'{number}: {args.command}d')
+            return 1
+        for number in results:
+            print(f'{number}: {args.command}d')
+    elif args.command == 'report':
+        started_at = None
+        if args.action == 'run':
+            report = client.get_report(args.number)
+            started_at = datetime.now(timezone.utc)
+            print(report.run())
+        if args.action == 'wait' or args.wait:
+            report = wait_for_report(client, args.number, args.timeout, args.poll, started_at)
+            write_rows([to_row(report)], args.output, COLUMNS['reports'])
+        elif args.action == 'show':
+            write_rows([to_row(client.get_report(args.number))], args.output, COLUMNS['reports'])
+    elif args.command == 'export':
+        rows = fetch(client, args.resource, args.bot, args.status)
+        file_format = export(rows, args.path, args.format)
+        print(f'{len(rows)} {args.resource} written to {args.path} ({file_format})')
+    return 0
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    token = args.token or os.getenv('WHISPERTRADES_API_KEY', '')
+    if not token:
+        print('An API token is required: pass --token or set WHISPERTRADES_API_KEY.', file=sys.stderr)
+        return 2
+    state = LocalState(args.cache_dir, token)
+    if args.command == 'cache':
+        if args.action == 'clear':
+            state.clear()
+            print(f'Cleared {state.directory}')
+        else:
+            cache, limiter = ResponseCache(), AdaptiveRateLimiter()
+            state.load(cache, limiter)
+            print(f'directory: {state.directory}\nresponses: {len(cache)}\nrequests in the last minute: {len(limiter.export_state()["sent"])}')
+        return 0
+
+    cache = None if args.no_cache else ResponseCache(max_age=args.max_age)
+    limiter = AdaptiveRateLimiter()
+    state.load(cache, limiter)
+    client = WTClient(token, auto_init=False, auto_refresh=False, endpoint=args.endpoint, rate_limiter=limiter, response_cache=cache if cache is not None else False, max_workers=args.workers)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', ReportRunningWarning)
+            return run(args, client, state)
+    except KeyboardInterrupt:
+        return 130
+    except (APIError, InvalidTokenError, TokenPermissionError, TimeoutError, ImportError) as e:
+        print(f'{type(e).__name__}: {e}', file=sys.stderr)
+        return 1
+    finally:
+        state.save(cache, limiter)
+        client.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1085 @@
+import contextvars
+import os
+import threading
+import time
+import warnings
+import weakref
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Literal, Optional, TYPE_CHECKING, Union
+from urllib.parse import urlencode
+
+import orjson
+from requests import Session
+from requests.exceptions import ConnectionError, Timeout
+
+from . import profiling
+from .cache import ResponseCache
+from .circuit import CircuitBreaker, endpoint_family
+from .common import APIError, BaseResponse, BulkActionError, CircuitOpenError, InvalidTokenError, RateLimitError, ReportRunningWarning, TokenPermissionError, EntityView, UpdatingDict
+from .instrumentation import Instrumentation, RequestEvent, current_trigger, traced, trigger
+from .ratelimit import AdaptiveLimiterAdapter, AdaptiveRateLimiter, RetryPolicy
+from .refresher import BackgroundRefresher
+from .transport import TransportConfig
+
+if TYPE_CHECKING:  # model modules are imported on first use, so that only the resources actually used pay for building their pydantic schemas
+    from .bot import Bot
+    from .broker_connection import BrokerConnection
+    from .closing import BulkCloseReport
+    from .comparison import ReportComparison
+    from .evaluator import ConditionEvaluation, MarketInputs
+    from .order import Order
+    from .position import Position
+    from .report import Report
+    from .snapshots import PositionMarkStore
+    from .variable import Variable
+
+ENDPOINT = 'https://api.whispertrades.com/v1/'
+_clients: 'weakref.WeakSet[WTClient]' = weakref.WeakSet()  # live clients, reinitialized in the child process after a fork
+
+
+class WTClient:
+    """
+    Client for the WhisperTrade API.
+    To initialize, provide a valid API token. Endpoint can be customized if needed e.g. proxy server etc.
+    Bots, orders, positions, variables and reports can be pickled, e.g. to process them in a ProcessPoolExecutor: they are sent as plain data without the client and can be re-attached with attach(client). After os.fork() the client reinitializes its connections, locks and thread pool in the child.
+
+    :param token: API token obtained from Whispertrade. If not provided, will attempt to read from WHISPERTRADES_API_KEY environment variable.
+    :param auto_init: Defaults to True. If True, will automatically query and cache all information about the account that the token has access to. This can be slow.
+    :param auto_refresh: Defaults to True. If True, will automatically refresh the attribute on each access (excluding prints). This can be slow and may trigger rate limit. If you do not anticipate them changing often, set this to False. You can also call the respective refresh methods manually e.g. get_orders().
+    :param session: Provide your own requests Session object if needed. Defaults to a new session. Rate limiting and retries will be applied on this session.
+    :param endpoint: Optional, defaults to https://api.whispertrades.com/v1/, only for debugging or proxying purposes.
+    :param instrumentation: Optional, an Instrumentation object that receives an event for every request and cache lookup, e.g. to find refresh storms caused by auto_refresh. Defaults to None (no instrumentation).
+    :param rate_limiter: Optional, an AdaptiveRateLimiter. Share one between clients using the same token so that they respect a common budget. Defaults to a new limiter at 30 requests per minute that adapts to the quota reported by the server.
+    :param retry: Optional, a RetryPolicy for 429 responses and failed GET requests. Defaults to 3 retries with jittered exponential backoff, honouring Retry-After.
+    :param response_cache: Optional, defaults to True. Send conditional GET requests and skip parsing and rebuilding objects when the data did not change since the last request to the same URL (304 Not Modified or an identical body). Pass a ResponseCache to configure its size or max_age, or to share it, or False to disable.
+    :param max_workers: Optional, defaults to 1. Size of the thread pool used to overlap network latency: pages of orders and positions, report details in get_reports(detailed=True) and bulk_bot_action() run concurrently, sharing the rate limiter and connection pool. Fetching pages concurrently may request up to max_workers - 1 pages past the last one. submit() runs any call on the pool.
+    :param mark_store: Optional, a PositionMarkStore. If given, the marks (current bid, mid, ask, profit and delta) of open positions are appended to it on every refresh of positions, keeping their intraday history. Requires numpy.
+    :param circuit_breaker: Optional, defaults to True. Stop sending requests to an endpoint family after repeated failures and serve the last cached responses flagged stale instead (see is_stale()), probing for recovery in the background. Pass a CircuitBreaker to configure thresholds, or False to disable.
+    :param transport: Optional, a TransportConfig with connection pool size, keep-alive, timeouts, an overall deadline per call and compression. Defaults to TransportConfig(): keep-alive connections, 5 second connect and 30 second read timeouts, no overall deadline, compression accepted.
+    :param bootstrap: Optional, how auto_init loads the account. "sequential" (default) loads bots, orders, variables, positions and reports one after another. "parallel" loads them concurrently and returns when all are loaded. "background" loads them concurrently and returns immediately; reading a collection that is still loading blocks until it is loaded, and wait_until_ready() waits for all of them. Per collection load times are recorded in bootstrap_timings.
+    """
+
+    def __init__(self, token: str = None, auto_init: bool = True, auto_refresh: bool = True, session: Session = None, endpoint: str = ENDPOINT, instrumentation: Instrumentation = None,
+                 rate_limiter: AdaptiveRateLimiter = None, retry: RetryPolicy = None, response_cache: Union[bool, ResponseCache] = True, max_workers: int = 1, mark_store: 'PositionMarkStore' = None, circuit_breaker: Union[bool, CircuitBreaker] = True, transport: TransportConfig = None, bootstrap: Literal['sequential', 'parallel', 'background'] = 'sequential'):
+        self.token = token or os.getenv('WHISPERTRADES_API_KEY', '')
+        if not self.token:
+            raise ValueError("API token is required. Please provide it as an argument or set the WHISPERTRADES_API_KEY environment variable.")
+        self.endpoint = endpoint
+        self.auto_refresh = auto_refresh
+        self.instrumentation = instrumentation
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.session = session or Session()
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+        self.max_workers = max_workers
+        self.transport = transport or TransportConfig()
+        self.session.mount(self.endpoint, AdaptiveLimiterAdapter(limiter=self.rate_limiter, retry=retry, deadline=self.transport.deadline, pool_maxsize=self.transport.pool_size(max_workers)))
+        self.mark_store: Optional['PositionMarkStore'] = mark_store
+        self.response_cache: Optional[ResponseCache] = ResponseCache() if response_cache is True else response_cache if isinstance(response_cache, ResponseCache) else None  #: None if disabled
+        self.circuit_breaker: Optional[CircuitBreaker] = CircuitBreaker() if circuit_breaker is True else circuit_breaker if isinstance(circuit_breaker, CircuitBreaker) else None  #: None if disabled
+        self._stale: set[str] = set()
+        self.headers = {'Accept': 'application/json',
+                        'Content-Type': 'application/json',
+                        'Authorization': f'Bearer {self.token}',
+                        **self.transport.headers}
+        self._bots: dict[str, 'Bot'] = {}
+        self._orders: dict[str, 'Order'] = {}
+        self._variables: dict[str, 'Variable'] = {}
+        self._positions: dict[str, 'Position'] = {}
+        self._brokers: dict[str, 'BrokerConnection'] = {}
+        self._reports: UpdatingDict[str, 'Report'] = UpdatingDict(update_fn=self.__get_reports_raw if self.auto_refresh else None)
+        self._reports_cache = {}
+        self._bot_orders: dict[str, dict[str, None]] = {}  # bot number -> numbers of its orders, as an ordered set. Each order is stored once, in _orders
+        self._bot_positions: dict[str, dict[str, None]] = {}  # bot number -> numbers of its positions
+        self._complete: set[tuple[str, str]] = set()  # (orders or positions, bot number or '' for all bots) loaded in full at least once, so that refreshes can be incremental
+        self._lock = threading.RLock()  # guards inserting into and merging with the cached collections
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._worker = threading.local()
+        self._refresher: Optional[BackgroundRefresher] = None
+        self.bootstrap_timings: dict[str, float] = {}  #: seconds spent loading each collection during auto_init, plus "total"
+        self._bootstrap_futures: dict[str, Future] = {}
+        self._bootstrap_done = threading.Event()
+        _clients.add(self)
+
+        if bootstrap not in ('sequential', 'parallel', 'background'):
+            raise ValueError(f"Invalid bootstrap mode: {bootstrap}. Valid modes are sequential, parallel and background.")
+        if not auto_init:
+            self._bootstrap_done.set()
+        elif bootstrap == 'sequential':
+            start = time.perf_counter()
+            for name, func in [('bots', self.__get_bots), ('orders', self.__get_orders), ('variables', self.__get_variables), ('positions', self.__get_positions), ('reports', self.__get_reports)]:
+                self.__bootstrap_step(name, func)
+            self.bootstrap_timings['total'] = time.perf_counter() - start
+            self._bootstrap_done.set()
+        else:
+            self.__start_bootstrap()
+            if bootstrap == 'parallel':
+                self.wait_until_ready()
+
+    def __bootstrap_step(self, name: str, func):
+        start = time.perf_counter()
+        try:
+            with trigger('WTClient.__init__'):
+                func()
+        except TokenPermissionError:
+            warnings.warn(f"Token does not have permission to access {name}. Skipping.")
+        except InvalidTokenError:
+            raise InvalidTokenError(f"Invalid token: {self.token}")
+        finally:
+            self.bootstrap_timings[name] = time.perf_counter() - start
+
+    def __start_bootstrap(self):
+        functions = {'bots': self.__get_bots, 'orders': self.__get_orders, 'variables': self.__get_variables, 'positions': self.__get_positions, 'reports': self.__get_reports}
+        executor = ThreadPoolExecutor(max_workers=len(functions), thread_name_prefix='whispertrades-bootstrap')
+        start = time.perf_counter()
+        self._bootstrap_futures = {name: executor.submit(self.__bootstrap_step, name, func) for name, func in functions.items()}
+        executor.shutdown(wait=False)
+
+        def finish():
+            try:
+                wait(self._bootstrap_futures.values())
+            finally:
+                self.bootstrap_timings['total'] = time.perf_counter() - start
+                self._bootstrap_done.set()
+
+        threading.Thread(target=finish, name='whispertrades-bootstrap-finish', daemon=True).start()
+
+    def wait_until_ready(self, collections: list[str] = None, timeout: float = None) -> bool:
+        """
+        Wait for a background or parallel auto_init to finish loading. Returns immediately for sequential mode or if auto_init is False.
+
+        :param collections: Optional, only wait for these collections (bots, orders, variables, positions, reports). Defaults to all of them.
+        :param timeout: Optional, maximum seconds to wait.
+        :return: True if loading finished, False if the timeout expired
+        """
+        if collections is None:
+            finished = self._bootstrap_done.wait(timeout)
+            futures = list(self._bootstrap_futures.values())
+        else:
+            futures = [self._bootstrap_futures[name] for name in collections if name in self._bootstrap_futures]
+            finished = not wait(futures, timeout).not_done
+        for future in futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        return finished
+
+    def __await_bootstrap(self, name: str):
+        future = self._bootstrap_futures.get(name)
+        if future is not None and not future.done():
+            future.result()
+
+    @staticmethod
+    def __bot_number(bot: Union['Bot', str]) -> str:
+        if isinstance(bot, str):
+            return bot
+        from .bot import Bot  # already imported if bot is a Bot instance
+        if isinstance(bot, Bot):
+            return bot.number
+        raise TypeError(f"Invalid type for bot, expected Bot or str, got {type(bot)}")
+
+    def __merge(self, store: dict, obj):
+        """Add obj to a cached collection, or copy its data into the cached instance so that existing references see the update. Returns the cached instance."""
+        with self._lock:
+            cached = dict.get(store, obj.number)
+            if cached is None:
+                store[obj.number] = obj
+                return obj
+            cached.__dict__.update(obj.__dict__)
+            return cached
+
+    def __link(self, index: dict[str, dict[str, None]], store: dict, obj: Union['Order', 'Position']) -> Union['Order', 'Position']:
+        """Merge an order or position into its cached collection like __merge, and record its bot in an index. If it moved to another bot, it is dropped from the index of the previous one. The bot does not need to be loaded."""
+        with self._lock:
+            cached = dict.get(store, obj.number)
+            if cached is not None and cached.bot.number != obj.bot.number:
+                index.get(cached.bot.number, {}).pop(obj.number, None)
+            item = self.__merge(store, obj)
+            numbers = index.get(item.bot.number)
+            if numbers is None:
+                numbers = index[item.bot.number] = {}
+            numbers[item.number] = None
+            return item
+
+    def _bot_view(self, kind: Literal['orders', 'positions'], bot_number: str) -> EntityView:
+        """Orders or positions of a bot, as a view of the cached collection"""
+        store, index = (self._orders, self._bot_orders) if kind == 'orders' else (self._positions, self._bot_positions)
+        with self._lock:
+            return EntityView(store, index.setdefault(bot_number, {}))
+
+    def __changed_since(self, kind: Literal['orders', 'positions'], bot_number: str) -> Optional[date]:
+        """
+        Date from which orders or positions of a bot may have changed since they were loaded, None if they were never loaded in full.
+        Newer ones may be new, and working orders and open positions change, but anything older than the oldest of those is final.
+        """
+        if (kind, bot_number) not in self._complete and (kind, '') not in self._complete:
+            return None
+        view = self._bot_view(kind, bot_number)
+        if kind == 'orders':
+            items = [(o._OrderResponse.submitted_at, o._OrderResponse.status == 'WORKING') for o in view.values()]
+        else:
+            items = [(p._PositionResponse.entered_at, p._PositionResponse.status == 'OPEN') for p in view.values()]
+        pending = [at for at, changing in items if changing]
+        since = min(pending) if pending else max((at for at, _ in items), default=None)
+        today = datetime.now().date()
+        return (since.date() if since is not None else today) - timedelta(days=1)  # the API may use another time zone for dates
+
+    def _refresh_bot(self, kind: Literal['orders', 'positions'], bot_number: str) -> EntityView:
+        """Refresh the orders or positions of one bot, with one request for its recent ones once all of them were loaded, and return them"""
+        since = self.__changed_since(kind, bot_number)
+        if kind == 'orders':
+            self.__get_orders(bot=bot_number, from_date=since)
+        else:
+            self.__get_positions(bot=bot_number, from_date=since)
+        return self._bot_view(kind, bot_number)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool of this client with max_workers threads, created on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='whispertrades-worker', initializer=self.__init_worker)
+            return self._executor
+
+    def __init_worker(self):
+        self._worker.active = True
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Run a call on the client's thread pool, e.g. client.submit(client.get_orders, status='WORKING').
+        Requests made by it are attributed to the caller in instrumentation.
+
+        :return: Future of the result
+        """
+        context = contextvars.copy_context()
+        if getattr(self._worker, 'active', False):  # already on a pool thread, waiting for pool tasks from here could deadlock
+            future = Future()
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(context.run(fn, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self.executor.submit(context.run, fn, *args, **kwargs)
+
+    def __map(self, fn, items: list) -> list:
+        """Call fn on every item, concurrently if the pool has more than one worker, and return the results in order. Raises the first error after all calls finished."""
+        if self.max_workers == 1 or len(items) < 2:
+            return [fn(item) for item in items]
+        futures = [self.submit(fn, item) for item in items]
+        wait(futures)
+        return [f.result() for f in futures]
+
+    def __fetch_pages(self, request, payload: dict):
+        """Fetch pages 2, 3, ... until one has fewer than 100 items, max_workers pages at a time."""
+        page = 2
+        window = 1 if getattr(self._worker, 'active', False) else self.max_workers
+        while True:
+            results = self.__map(request, [{**payload, 'page': p} for p in range(page, page + window)])
+            if any(len(r) < 100 for r in results):
+                return
+            page += window
+
+    def close(self):
+        """Stop background refresh and the thread pool, and close the HTTP session."""
+        self.stop_background_refresh()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.session.close()
+
+    def _reinit_after_fork(self):
+        """
+        Make this client usable in a child process after os.fork(), e.g. in a ProcessPoolExecutor with the fork start method. Called automatically.
+        Threads do not survive a fork, so the thread pool is recreated on first use and background refresh stops (collections are then refreshed on access as without it). Locks that another thread may have held are replaced, and pooled connections, whose sockets are shared with the parent, are dropped so the child opens its own.
+        The rate limiter keeps the parent's state but is not shared with it afterwards, so parent and child together may exceed the rate limit. Only one process should write to a mark_store.
+        """
+        self._lock = threading.RLock()
+        self._executor = None
+        self._worker = threading.local()
+        self._refresher = None
+        self.rate_limiter._lock = threading.Lock()
+        if self.response_cache is not None:
+            self.response_cache._lock = threading.Lock()
+        if self.instrumentation is not None:
+            self.instrumentation._lock = threading.Lock()
+        if self.mark_store is not None:
+            self.mark_store._lock = threading.Lock()
+        if self.circuit_breaker is not None:
+            self.circuit_breaker._reinit_after_fork()
+        for adapter in self.session.adapters.values():
+            adapter.init_poolmanager(adapter._pool_connections, adapter._pool_maxsize, block=adapter._pool_block)
+
+    def __enter__(self) -> 'WTClient':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, method: str, path: str, params: dict = None, json: dict = None, **path_params) -> BaseResponse:
+        """
+        Send a request to the API and parse the response envelope. Used by all API calls of this package.
+
+        :param method: HTTP method e.g. GET
+        :param path: path relative to the endpoint, with {placeholders} for path_params e.g. "bots/orders/{number}". Also used as the endpoint name in instrumentation.
+        :param params: Optional, query string parameters
+        :param json: Optional, JSON body
+        :return: parsed response envelope
+        """
+        url = f"{self.endpoint}{path.format(**path_params)}"
+        body = orjson.dumps(json) if json is not None else None  # Content-Type is set in self.headers
+        family = endpoint_family(path)
+        headers = self.headers
+        cache_key = None
+        if self.response_cache is not None and method == 'GET':
+            cache_key = f'{url}?{urlencode(params, doseq=True)}' if params else url
+            fresh = self.response_cache.fresh(cache_key)
+            if fresh is not None:  # confirmed by the server within max_age, no request needed
+                return fresh
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow(family):
+            return self.__degraded(family, cache_key)
+        if self.response_cache is not None:
+            if method == 'GET':
+                headers = {**headers, **self.response_cache.request_headers(cache_key)}
+            else:  # the request may change data that cached responses describe
+                self.response_cache.invalidate()
+        if self.instrumentation is None:
+            response = self.__send(method, url, headers, params, body, family)
+            return self.__parse_response(response, cache_key)
+
+        event = RequestEvent(endpoint=f'{method} {path}', caller=current_trigger(), url=url, started_at=datetime.now())
+        start = time.perf_counter()
+        try:
+            response = self.__send(method, url, headers, params, body, family)
+        except Exception as e:
+            event.http_latency = time.perf_counter() - start
+            event.error = repr(e)
+            self.instrumentation.emit(event)
+            raise
+        total = time.perf_counter() - start
+        event.http_latency = getattr(response, 'network_time', total)
+        event.limiter_wait = getattr(response, 'limiter_wait', max(0.0, total - event.http_latency))
+        event.status_code = response.status_code
+        event.payload_size = len(response.content)
+        start = time.perf_counter()
+        try:
+            parsed = self.__parse_response(response, cache_key)
+            event.not_modified = parsed.cached
+            return parsed
+        except Exception as e:
+            event.error = repr(e)
+            raise
+        finally:
+            event.parse_time = time.perf_counter() - start
+            self.instrumentation.emit(event)
+
+    def __send(self, method: str, url: str, headers: dict, params: Optional[dict], body: Optional[bytes], family: str):
+        """Send a request through the session, counting failures and successes in the circuit breaker"""
+        if profiling._profilers:
+            profiling._note_request()
+        if self.circuit_breaker is None:
+            return self.session.request(method, url, headers=headers, params=params, data=body, timeout=self.transport.timeout)
+        probe = partial(self.__probe, url, params) if method == 'GET' else None  # repeating other requests could change data
+        try:
+            response = self.session.request(method, url, headers=headers, params=params, data=body, timeout=self.transport.timeout)
+        except (ConnectionError, Timeout) as e:
+            if e.request is not None:  # not a timeout of the local rate limiter
+                self.circuit_breaker.record_failure(family, probe)
+            else:
+                self.circuit_breaker.release(family)
+            raise
+        except BaseException:  # e.g. ChunkedEncodingError or KeyboardInterrupt, neither a success nor a failure of the API, but a trial must not stay in flight
+            self.circuit_breaker.release(family)
+            raise
+        slow_threshold = self.circuit_breaker.slow_threshold
+        if response.status_code >= 500 or (slow_threshold is not None and getattr(response, 'network_time', 0.0) > slow_threshold):
+            self.circuit_breaker.record_failure(family, probe)
+        else:
+            self.circuit_breaker.record_success(family)
+            self._stale.discard(family)
+        return response
+
+    def __probe(self, url: str, params: Optional[dict]) -> bool:
+        return self.session.request('GET', url, headers=self.headers, params=params, timeout=self.transport.timeout).status_code < 500
+
+    def __degraded(self, family: str, cache_key: Optional[str]) -> BaseResponse:
+        """Response for a request not sent as the circuit of its family is open: the cached envelope flagged stale, else CircuitOpenError"""
+        if self.circuit_breaker.serve_stale and cache_key is not None:
+            stale = self.response_cache.stale(cache_key)
+            if stale is not None:
+                self._stale.add(family)
+                return stale
+        retry_in = self.circuit_breaker.retry_in(family)
+        raise CircuitOpenError(f"Requests for {family} are failing and were not sent. Recovery is probed in {retry_in:.0f}s.", family, retry_in)
+
+    def is_stale(self, family: str) -> bool:
+        """
+        If data of an endpoint family was last served from cache because the API was failing (see CircuitBreaker), instead of being confirmed by the server.
+
+        :param family: one of bots, brokers, orders, positions, variables, reports
+        """
+        return family in self._stale
+
+    @staticmethod
+    def __excerpt(response) -> str:
+        return response.content[:200].decode(response.encoding or 'utf-8', errors='replace')
+
+    def __parse_response(self, response, cache_key: str = None) -> BaseResponse:
+        if cache_key is not None:
+            cached = self.response_cache.lookup(cache_key, response)
+            if cached is not None:
+                return cached
+        if response.status_code == 429:
+            raise RateLimitError(f"Rate limit exceeded and retries exhausted for {response.request.method} {response.url}")
+        try:
+            data = orjson.loads(response.content)  # from the raw UTF-8 bytes, without decoding the body to a str first
+        except orjson.JSONDecodeError:
+            raise APIError(f"Unexpected non-JSON response from API (HTTP {response.status_code}): {self.__excerpt(response)}")
+        if not isinstance(data, dict) or 'success' not in data:  # error body not in the usual envelope e.g. from a proxy or server error page
+            raise APIError(isinstance(data, dict) and data.get('message') or f"Unexpected response from API (HTTP {response.status_code}): {self.__excerpt(response)}")
+        if isinstance(data.get('success'), bool) and isinstance(data.get('message'), str) and isinstance(data.get('data', []), (list, dict)):
+            parsed = BaseResponse.model_construct(**data)  # items are validated by their own models, validating them as dicts here would only copy them
+        else:
+            parsed = BaseResponse(**data)
+        if cache_key is not None:
+            self.response_cache.store(cache_key, response, parsed)
+        return parsed
+
+    @staticmethod
+    def __unchanged(response: BaseResponse, store: dict) -> bool:
+        """If the response is unchanged since it was last parsed and every object it describes is still in store, so nothing needs to be rebuilt."""
+        if not response.cached:
+            return False
+        data = [response.data] if isinstance(response.data, dict) else response.data
+        return all(dict.__contains__(store, item.get('number')) for item in data)
+
+    def _record_cache(self, collection: str, hit: bool):
+        if self.instrumentation is not None:
+            self.instrumentation.record_cache(collection, hit)
+
+    def _refresh_collection(self, name: str) -> dict:
+        refresh_functions = {'bots': self.__get_bots, 'brokers': self.__get_broker_connections, 'orders': self.__get_orders,
+                             'variables': self.__get_variables, 'positions': self.__get_positions}
+        with trigger('BackgroundRefresher'):
+            return refresh_functions[name]()
+
+    def start_background_refresh(self, intervals: dict[str, float] = None, max_staleness: Union[float, dict[str, float]] = None, budget_share: float = 0.5) -> BackgroundRefresher:
+        """
+        Refresh collections on a background thread (stale-while-revalidate). Reading client.bots, client.orders, client.positions etc. then returns the latest snapshot immediately instead of refreshing on every access.
+        This works best with auto_refresh=False, as otherwise every attribute access on individual Order/Position/Variable objects still refreshes them.
+
+        :param intervals: Optional, refresh interval in seconds per collection (bots, brokers, orders, variables, positions). Defaults to bots every 300s, orders every 30s and positions every 15s. Collections not listed keep their normal behaviour.
+        :param max_staleness: Optional, seconds (for all collections or as dict per collection). Reads of a snapshot older than this block and refresh it first. Defaults to None, never block once a snapshot exists.
+        :param budget_share: Optional, fraction of the rate limit that background refreshes may use, defaults to 0.5.
+        :return: the running BackgroundRefresher
+        """
+        self.stop_background_refresh()
+        self._refresher = BackgroundRefresher(self, intervals=intervals, max_staleness=max_staleness, budget_share=budget_share)
+        self._refresher.start()
+        return self._refresher
+
+    def stop_background_refresh(self):
+        """Stop background refreshing started by start_background_refresh(), if any."""
+        if self._refresher is not None:
+            self._refresher.stop()
+            self._refresher = None
+
+    def data_age(self, collection: str) -> Optional[float]:
+        """
+        Seconds since a collection was last refreshed in the background. Only available while background refresh is running.
+
+        :param collection: one of bots, brokers, orders, variables, positions
+        :return: age in seconds, or None if background refresh is not running for this collection or it was never loaded
+        """
+        if self._refresher is None:
+            return None
+        return self._refresher.age(collection)
+
+    def __get_bots(self, bot_number: str = '', statuses: list = None, include_details: bool = False) -> dict[str, 'Bot']:
+        from .bot import Bot, BotResponse, split_details
+        payload = {}
+        if isinstance(bot_number, int):
+            bot_number = str(bot_number)
+        valid_statuses = ["Enabled", "Disabled", "Disable on Close"]
+        if statuses:
+            for status in statuses:
+                if status not in valid_statuses:
+                    raise ValueError(f"Invalid status: {status}. Valid status are {valid_statuses}")
+            payload['statuses'] = statuses
+        if include_details:
+            payload['include_details'] = include_details
+        response = self._request('GET', 'bots/{bot_number}', params=payload, bot_number=bot_number)
+        if response.success:
+            if self.__unchanged(response, self._bots) and (not include_details or all(self._bots[b['number']].details_loaded for b in ([response.data] if isinstance(response.data, dict) else response.data))):
+                return self._bots
+            if isinstance(response.data, dict):
+                response.data = [response.data]
+            for bot_data in response.data:
+                summary, details = split_details(bot_data)  # details are validated lazily on first access
+                bot = Bot(BotResponse(**summary), self, self.auto_refresh, details=details)
+                with self._lock:
+                    if bot.number in self._bots:
+                        cached = self._bots[bot.number]
+                        if details is None:  # summary refresh, keep previously loaded details
+                            bot._raw_details, bot._details = cached._raw_details, cached._details
+                            for name, value in bot._details.items():  # and the validated ones in the new response data
+                                setattr(bot._BotResponse, name, value)
+                        cached.__dict__.update(bot.__dict__)  # copy the already cached data
+                    else:
+                        self._bots[bot.number] = bot
+            return self._bots
+        else:
+            raise APIError(response.message)
+
+    @traced
+    def get_bots(self, statuses: list = None, include_details: bool = False) -> dict[str, 'Bot']:
+        """
+        Get information of all bots
+        Auth Required: Read Bots
+
+        :param statuses: Optional, list of statuses to filter by, valid values are "Enabled", "Disabled", "Disable on Close"
+        :param include_details: Optional, defaults to False. Details are validated lazily when first accessed. If False, details already loaded are kept and bots without details fetch them on first access.
+        :return: dict of Bot objects where dict key is the bot number
+        """
+        return self.__get_bots(statuses=statuses, include_details=include_details)
+
+    @traced
+    def prefetch_details(self, bots: list[Union['Bot', str]] = None, validate: bool = False) -> dict[str, 'Bot']:
+        """
+        Load details (entry/exit conditions, adjustments, notifications, variables) of many bots at once, instead of one request per bot on first access.
+        Auth Required: Read Bots
+
+        :param bots: Optional, Bot objects or bot numbers. Defaults to all bots. Bots that already have details are skipped.
+        :param validate: Optional, defaults to False. If True, also validate all details now instead of on first access.
+        :return: dict of Bot objects where dict key is the bot number. Raises APIError naming the bots that do not exist, if any.
+        """
+        numbers = list(self._bots) if bots is None else [str(b) if isinstance(b, (str, int)) else b.number for b in bots]
+        missing = [n for n in numbers if dict.get(self._bots, n) is None or not dict.get(self._bots, n).details_loaded]
+        if len(missing) == 1:
+            try:
+                self.__get_bots(bot_number=missing[0], include_details=True)
+            except APIError as e:
+                raise APIError(f"Bots not found: {missing[0]} ({e})") from e
+        elif missing:  # a single list request returns the details of every bot
+            self.__get_bots(include_details=True)
+        unknown = [n for n in numbers if dict.get(self._bots, n) is None]
+        if unknown:
+            raise APIError(f"Bots not found: {', '.join(unknown)}")
+        if validate:
+            for number in numbers:
+                dict.__getitem__(self._bots, number).load_details()
+        return {n: dict.__getitem__(self._bots, n) for n in numbers}
+
+    @traced
+    def bulk_bot_action(self, action: Literal['enable', 'disable', 'open_position', 'close_all_positions'], bots: list[Union['Bot', str]] = None, wait: bool = True) -> dict:
+        """
+        Run the same action on many bots through the thread pool (see max_workers), e.g. client.bulk_bot_action('disable').
+        Auth Required: Write Bots for enable and disable, Write Positions for open_position and close_all_positions
+
+        :param action: Bot method to call, one of enable, disable, open_position, close_all_positions
+        :param bots: Optional, Bot objects or bot numbers. Defaults to all bots.
+        :param wait: Optional, defaults to True, wait for all calls to finish. If False, return their futures immediately.
+        :return: if wait, dict of bot number to the result of the call. Raises BulkActionError if any call failed, after all calls finished. If not wait, dict of bot number to Future.
+        """
+        if action not in ('enable', 'disable', 'open_position', 'close_all_positions'):
+            raise ValueError(f"Invalid action: {action}. Valid actions are enable, disable, open_position and close_all_positions.")
+        if bots is None:
+            if not self._bots:
+                self.__get_bots()
+            bots = list(self._bots.values())
+        bots = [self._bots[b] if isinstance(b, str) and b in self._bots else self.get_bot(b, include_details=False) if isinstance(b, str) else b for b in bots]
+        futures = {bot.number: self.submit(getattr(bot, action)) for bot in bots}
+        if not wait:
+            return futures
+        results, errors = {}, {}
+        for number, future in futures.items():
+            try:
+                results[number] = future.result()
+            except Exception as e:
+                errors[number] = e
+        if errors:
+            raise BulkActionError(f"{action} failed for {len(errors)} of {len(futures)} bots: {', '.join(f'{n}: {e}' for n, e in errors.items())}", results, errors)
+        return results
+
+    @traced
+    def get_bot(self, bot_number: str, include_details: bool = True) -> 'Bot':
+        """
+        Get information of a bot by number
+        Auth Required: Read Bots
+
+        :param bot_number: e.g. BYZ8UNMX8M
+        :param include_details: Optional, defaults to True.
+        :return: Bot object
+        """
+        self.__get_bots(bot_number=bot_number, include_details=include_details)
+        return self._bots[bot_number]
+
+    @property
+    @traced
+    def bots(self) -> dict[str, 'Bot']:
+        """
+        Returns a list of Bot objects that was cached by the previous call to get_bots(). To refresh, call get_bots() again (not needed if auto_refresh was set to True). If get_bots() was never called, accessing this attribute will call get_bots() and return the result.
+        Auth Required: Read Bots
+        """
+        self.__await_bootstrap('bots')
+        if self._refresher is not None and self._refresher.manages('bots'):
+            return self._refresher.read('bots')
+        refresh = not self._bots or self.auto_refresh
+        self._record_cache('bots', hit=not refresh)
+        if refresh:
+            self.__get_bots()
+        return self._bots
+
+    def __get_broker_connections(self, number: str = ''):
+        from .broker_connection import BrokerConnection, BrokerConnectionResponse
+        response = self._request('GET', 'broker_connections/{number}', number=number)
+        if response.success:
+            if self.__unchanged(response, self._brokers):
+                return self._brokers
+            if isinstance(response.data, dict):
+                response.data = [response.data]
+            for broker_data in response.data:
+                self.__merge(self._brokers, BrokerConnection(BrokerConnectionResponse(**broker_data), self, self.auto_refresh))
+            return self._brokers
+        else:
+            raise APIError(response.message)
+
+    @traced
+    def get_broker_connections(self, number: str = ''):
+        """
+        Get a single broker connection or a list of all broker connections
+        Auth Required: Read Broker Connections
+
+        :param number: e.g. GZH7QT03FD
+        :return: dict of Broker Connection objects where dict key is the broker connection number
+        """
+        return self.__get_broker_connections(number=number)
+
+    @property
+    @traced
+    def brokers(self) -> dict[str, 'BrokerConnection']:
+        """
+        Returns a list of BrokerConnection objects that was cached by the previous call to get_broker_connections(). To refresh, call get_broker_connections() again (not needed if auto_refresh was set to True). If get_broker_connections() was never called, accessing this attribute will call get_broker_connections() and return the result.
+        Auth Required: Read Broker Connections
+        """
+        if self._refresher is not None and self._refresher.manages('brokers'):
+            return self._refresher.read('brokers')
+        refresh = not self._brokers or self.auto_refresh
+        self._record_cache('brokers', hit=not refresh)
+        if refresh:
+            self.__get_broker_connections()
+        return self._brokers
+
+    def __get_orders(self, number: str = '', bot: Union['Bot', str] = None, status: Literal["WORKING", "FILLED", "CANCELED"] = None, from_date: date = None, to_date: date = None, page: int = None, found: list = None) -> dict[str, 'Order']:
+        from .order import Order, OrderResponse
+        payload = {}
+        bot_number = self.__bot_number(bot) if bot else ''
+        if bot_number:
+            payload['bot'] = bot_number
+        if status:
+            status = status.upper()
+            if status not in ["WORKING", "FILLED", "CANCELED", "EXPIRED", "REJECTED"]:
+                raise ValueError(f"Invalid status: {status}. Valid statuses are WORKING, FILLED, CANCELED, EXPIRED, REJECTED")
+            payload['status'] = status
+        if from_date:
+            payload['from_date'] = from_date.strftime('%Y-%m-%d')
+        if to_date:
+            payload['to_date'] = to_date.strftime('%Y-%m-%d')
+        if page is not None:
+            if not isinstance(page, int):
+                raise TypeError(f"Invalid type for page, expected int, got {type(page)}")
+            payload['page'] = max(1, page)
+
+        def request(payload):
+            response = self._request('GET', 'bots/orders/{number}', params=payload, number=number)
+            if response.success:
+                data = [response.data] if isinstance(response.data, dict) else response.data
+                if found is not None:
+                    found.extend(order_data['number'] for order_data in data)
+                if self.__unchanged(response, self._orders):
+                    return data
+                response.data = data
+                for order_data in response.data:
+                    self.__link(self._bot_orders, self._orders, Order(OrderResponse(**order_data), self, self.auto_refresh))
+                return response.data
+            else:
+                raise APIError(response.message)
+
+        r = request(payload)
+        if page is None and len(r) == 100:  # get all pages
+            self.__fetch_pages(request, payload)
+        if not (number or status or from_date or to_date or page):
+            self._complete.add(('orders', bot_number))
+        return self._orders
+
+    @traced
+    def get_orders(self, bot: Union['Bot', str] = None, status: Literal["WORKING", "FILLED", "CANCELED"] = None, from_date: date = None, to_date: date = None, page: int = None) -> dict[str, 'Order']:
+        """
+        Get orders, optionally filter by bot, status, date, page.
+        Auth Required: Read Orders
+
+        :param bot: Optional, filter by bot number or Bot instance. If empty, do not filter.
+        :param status: Optional, filter by status, valid values are WORKING, FILLED, CANCELED, EXPIRED, REJECTED. If empty, do not filter.
+        :param from_date: Optional, filter by date. If empty, do not filter.
+        :param to_date: Optional, filter by date. If empty, do not filter.
+        :param page: Optional, defaults to None. If provided, will return orders on that page. If empty, return all pages. Each page is 100 orders. Sorted from newest to oldest.
+        :return: dict of Order objects where dict key is the order number
+        """
+        return self.__get_orders(bot=bot, status=status, from_date=from_date, to_date=to_date, page=page)
+
+    def _list_orders(self, status: str = None, from_date: date = None, page: int = None) -> dict[str, 'Order']:
+        """Fetch orders like get_orders(), but return only the orders in the responses instead of every cached order"""
+        found = []
+        self.__get_orders(status=status, from_date=from_date, page=page, found=found)
+        return {number: dict.__getitem__(self._orders, number) for number in found}
+
+    @traced
+    def get_order(self, number: str) -> 'Order':
+        """
+        Get order by number
+        Auth Required: Read Orders
+
+        :param number: e.g. GZH7QT03FD
+        :return: Order object
+        """
+        self.__get_orders(number=number)
+        return self._orders[number]
+
+    @traced
+    def refresh_working_orders(self, bots: list[Union['Bot', str]] = None) -> dict[str, 'Order']:
+        """
+        Refresh the WORKING orders of many bots with as few requests as possible, e.g. on every tick of a monitoring loop, instead of one listing per bot.
+        Working orders are listed for the whole account at once (one request per 100 working orders), unless listing only the given bots takes fewer requests, as estimated from the cached working orders. Cached orders of the bots that were working but are not listed anymore are then refreshed to get their final status, one by one or with one listing from the oldest of them, whichever takes fewer requests.
+        Auth Required: Read Orders
+
+        :param bots: Optional, Bot objects or bot numbers. Defaults to all bots.
+        :return: dict of the WORKING orders of the bots where dict key is the order number
+        """
+        numbers = None if bots is None else {self.__bot_number(b) for b in bots}
+
+        def of_bots(order: 'Order') -> bool:
+            return numbers is None or order._OrderResponse.bot.number in numbers
+
+        working = [o for o in list(self._orders.values()) if o._OrderResponse.status == 'WORKING']
+        calls = [{}]
+        if numbers is not None:
+            per_bot = Counter(o._OrderResponse.bot.number for o in working)
+            if sum(per_bot[n] // 100 + 1 for n in numbers) < len(working) // 100 + 1:
+                calls = [{'bot': n} for n in sorted(numbers)]
+        found = []
+        self.__map(lambda call: self.__get_orders(status='WORKING', found=found, **call), calls)
+
+        listed = set(found)
+        left = [o for o in working if of_bots(o) and o.number not in listed]
+        if left:
+            since = min(o._OrderResponse.submitted_at for o in left)
+            bot = next(iter(numbers)) if numbers is not None and len(numbers) == 1 else None
+            pages = sum(1 for o in list(self._orders.values()) if (bot is None or o._OrderResponse.bot.number == bot) and o._OrderResponse.submitted_at >= since) // 100 + 1
+            if len(left) <= pages:
+                self.__map(lambda o: self.__get_orders(number=o.number), left)
+            else:
+                self.__get_orders(bot=bot, from_date=since.date() - timedelta(days=1))  # the API may use another time zone for dates
+        return {n: dict.__getitem__(self._orders, n) for n in found if of_bots(dict.__getitem__(self._orders, n))}
+
+    @property
+    @traced
+    def orders(self) -> dict[str, 'Order']:
+        """Returns a list of Order objects that was cached by the previous call to get_orders(). To refresh, call get_orders() again (not needed if auto_refresh was set to True). If get_orders() was never called, accessing this attribute will call get_orders() and return the result."""
+        self.__await_bootstrap('orders')
+        if self._refresher is not None and self._refresher.manages('orders'):
+            return self._refresher.read('orders')
+        refresh = not self._orders or self.auto_refresh
+        self._record_cache('orders', hit=not refresh)
+        if refresh:
+            self.__get_orders()
+        return self._orders
+
+    def __get_variables(self, number: str = '') -> dict[str, 'Variable']:
+        from .variable import Variable, VariableResponse
+        response = self._request('GET', 'bots/variables/{number}', number=number)
+        if response.success:
+            if self.__unchanged(response, self._variables):
+                return self._variables
+            if isinstance(response.data, dict):
+                response.data = [response.data]
+            for variable_data in response.data:
+                self.__merge(self._variables, Variable(VariableResponse(**variable_data), self, self.auto_refresh))
+            return self._variables
+        else:
+            raise APIError(response.message)
+
+    @traced
+    def get_variables(self) -> dict[str, 'Variable']:
+        """
+        Get all variables in this account
+        Auth Required: Read Variables
+        """
+        return self.__get_variables()
+
+    @traced
+    def get_variable(self, number: str) -> 'Variable':
+        """
+        Get variable by number
+        Auth Required: Read Variables
+
+        :param number: e.g. GZH7QT03FD
+        :return: Variable object
+        """
+        self.__get_variables(number=number)
+        return self._variables[number]
+
+    @property
+    @traced
+    def variables(self) -> dict[str, 'Variable']:
+        """Returns a list of Variable objects that was cached by the previous call to get_variables(). To refresh, call get_variables() again (not needed if auto_refresh was set to True). If get_variables() was never called, accessing this attribute will call get_variables() and return the result."""
+        self.__await_bootstrap('variables')
+        if self._refresher is not None and self._refresher.manages('variables'):
+            return self._refresher.read('variables')
+        refresh = not self._variables or self.auto_refresh
+        self._record_cache('variables', hit=not refresh)
+        if refresh:
+            self.__get_variables()
+        return self._variables
+
+    def __get_positions(self, number: str = '', bot: Union['Bot', str] = None, status: Literal["OPEN", "CLOSE"] = None, from_date: date = None, to_date: date = None, page: int = None) -> dict[str, 'Position']:
+        from .position import Position, PositionResponse
+        payload = {}
+        bot_number = self.__bot_number(bot) if bot else ''
+        if bot_number:
+            payload['bot'] = bot_number
+        if status:
+            status = status.upper()
+            if status not in ["OPEN", "CLOSE"]:
+                raise ValueError(f"Invalid status: {status}. Valid statuses are OPEN and CLOSE.")
+            payload['status'] = status
+        if from_date:
+            payload['from_date'] = from_date.strftime('%Y-%m-%d')
+        if to_date:
+            payload['to_date'] = to_date.strftime('%Y-%m-%d')
+        if page is not None:
+            if not isinstance(page, int):
+                raise TypeError(f"Invalid type for page, expected int, got {type(page)}")
+            payload['page'] = max(1, page)
+
+        def request(payload):
+            response = self._request('GET', 'bots/positions/{number}', params=payload, number=number)
+            if response.success:
+                # print(response)  # debugging
+                if isinstance(response.data, dict):
+                    response.data = [response.data]
+                if not self.__unchanged(response, self._positions):
+                    for position_data in response.data:
+                        self.__link(self._bot_positions, self._positions, Position(PositionResponse(**position_data), self, self.auto_refresh))
+                if self.mark_store is not None:
+                    self.mark_store.record([self._positions[p['number']] for p in response.data])
+                return response.data
+            else:
+                raise APIError(response.message)
+
+        r = request(payload)
+        if page is None and len(r) == 100:  # page=None means default to 1st page, and if first page gives 100 result, there may be more, so try get all pages
+            self.__fetch_pages(request, payload)
+        if not (number or status or from_date or to_date or page):
+            self._complete.add(('positions', bot_number))
+        return self._positions
+
+    @traced
+    def get_positions(self, bot: Union['Bot', str] = None, status: Literal["OPEN", "CLOSE"] = None, from_date: date = None, to_date: date = None, page: int = None) -> dict[str, 'Position']:
+        """
+        Get positions, optionally filter by bot, status, date, page.
+        Auth Required: Read Positions
+
+        :param bot: Optional, filter by bot number or Bot instance. If empty, do not filter.
+        :param status: Optional, filter by status, valid values are OPEN and CLOSE. If empty, do not filter.
+        :param from_date: Optional, filter by date. If empty, do not filter.
+        :param to_date: Optional, filter by date. If empty, do not filter.
+        :param page: Optional, defaults to None. If provided, will return positions on that page. If empty, return all pages. Each page is 100 orders. Sorted from newest to oldest.
+        :return: dict of Position objects where dict key is the position number
+        """
+        return self.__get_positions(bot=bot, status=status, from_date=from_date, to_date=to_date, page=page)
+
+    @traced
+    def get_position(self, number: str) -> 'Position':
+        """
+        Get position by number
+        Auth Required: Read Positions
+        :param number: e.g. GZH7QT03FD
+        :return: Position object
+        """
+        self.__get_positions(number=number)
+        return self._positions[number]
+
+    @traced
+    def close_positions(self, positions: list[Union['Position', str]], poll_interval: float = 2.0, timeout: float = 300.0) -> 'BulkCloseReport':
+        """
+        Close many positions and wait for their closing orders to fill, e.g. client.close_positions(client.get_positions(status='OPEN').values()).
+        Close requests are sent through the thread pool (see max_workers) as fast as the rate limiter allows. The closing orders are then tracked together: each tick lists WORKING orders once instead of getting every order, and each closing order is verified leg by leg against the legs the position had open.
+        This is only valid during market hours and while the bots are set to Enabled or Disable on Close.
+        Auth Required: Write Positions, Read Orders
+
+        :param positions: Position objects or position numbers
+        :param poll_interval: Optional, seconds between polling ticks, defaults to 2.
+        :param timeout: Optional, seconds to wait for all closing orders to be final after the last close request was sent, defaults to 300. Orders still working are then left as they are and reported as pending.
+        :return: BulkCloseReport with the result and timings of each position
+        """
+        from .closing import BulkCloser
+        resolved = []
+        for position in positions:
+            if isinstance(position, str):
+                cached = dict.get(self._positions, position)  # plain dict lookup, as UpdatingDict refreshes on item access
+                position = cached if cached is not None else self.get_position(position)
+            resolved.append(position)
+        return BulkCloser(self, resolved, poll_interval, timeout).run()
+
+    @traced
+    def evaluate_positions(self, positions: list[Union['Position', str]] = None, market: 'MarketInputs' = None, now: datetime = None, refresh: bool = False) -> 'ConditionEvaluation':
+        """
+        Evaluate the exit conditions and adjustments of the bots against their open positions locally, to find positions near a trigger without waiting for the platform. Requires numpy (pip install whispertrades[analytics]).
+        Cached positions are used as they are, and bot details missing from the cache are loaded in one request, so repeated evaluations with new market inputs are free.
+        Auth Required: Read Positions, Read Bots
+
+        :param positions: Optional, Position objects or position numbers. Defaults to all cached open positions, fetched if none are cached.
+        :param market: Optional, MarketInputs for the rules that need market data (ITM/OTM stops, VIX, IV and underlying moves). Rules without their inputs are skipped.
+        :param now: Optional, time in the exchange time zone to evaluate at. Defaults to the current local time.
+        :param refresh: Optional, defaults to False. If True, fetch the open positions again first.
+        :return: ConditionEvaluation
+        """
+        from .evaluator import ConditionEvaluation
+        if positions is None:
+            if refresh or not self._positions:
+                self.__get_positions(status='OPEN')
+            resolved = [p for p in dict.values(self._positions) if p._PositionResponse.status == 'OPEN']
+        else:
+            resolved = []
+            for position in positions:
+                if isinstance(position, str):
+                    cached = dict.get(self._positions, position)  # plain dict lookup, as UpdatingDict refreshes on item access
+                    position = cached if cached is not None and not refresh else self.get_position(position)
+                resolved.append(position)
+        bots = self.prefetch_details(list({p._PositionResponse.bot.number for p in resolved}))  # only bots without details are requested
+        return ConditionEvaluation(resolved, bots, market, now)
+
+    @property
+    @traced
+    def positions(self) -> dict[str, 'Position']:
+        """Returns a list of Position objects that was cached by the previous call to get_positions(). To refresh, call get_positions() again (not needed if auto_refresh was set to True). If get_positions() was never called, accessing this attribute will call get_positions() and return the result."""
+        self.__await_bootstrap('positions')
+        if self._refresher is not None and self._refresher.manages('positions'):
+            return self._refresher.read('positions')
+        refresh = not self._positions or self.auto_refresh
+        self._record_cache('positions', hit=not refresh)
+        if refresh:
+            self.__get_positions()
+        return self._positions
+
+    def __get_reports_raw(self, number: str = '', return_raw: bool = False) -> Union[list[dict], dict, 'Report']:
+        from .report import Report, parse_report
+        if not number and not return_raw:
+            raise ValueError("Report number is required if return_raw is False.")
+        response = self._request('GET', 'bots/reports/{number}', number=number)
+        report_data = response.data
+        # print(report_data)  # for debugging
+        if response.success:
+            if isinstance(report_data, dict) and report_data['status'] == 'Running':  # if number is not supplied then report_data will be list. In this case we don't need to check status as it will always return raw. Another check will be in __get_reports for list case.
+                warnings.warn(f"Report {number} is still running. Please wait for it to complete before accessing the updated Report object. The previously cached Report will be returned, if any.", ReportRunningWarning)
+                return self._reports_cache[number] if number in self._reports_cache else None
+            if response.cached and number and number in self._reports_cache and self._reports_cache[number].daily_results is not None:  # unchanged detailed report, reuse the one built before
+                return self._reports_cache[number]
+            if response.cached and not number and self.__unchanged(response, self._reports):
+                return None  # unchanged report list, nothing to rebuild
+            return report_data if return_raw else Report(parse_report(report_data), self, self.auto_refresh)
+        else:
+            raise APIError(response.message)
+
+    def __get_reports(self, number: str = '') -> dict[str, 'Report']:
+        from .report import Report, parse_report
+        response_data = self.__get_reports_raw(number=number, return_raw=True)
+        if response_data is not None and not isinstance(response_data, Report):  # a cached one returned due to running or unchanged report, or None for an unchanged list
+            if isinstance(response_data, dict):
+                response_data = [response_data]
+            reports = [Report(parse_report(report_data), self, self.auto_refresh) for report_data in response_data]
+        else:
+            reports = [response_data] if isinstance(response_data, Report) else []
+        with self._lock:
+            for report in reports:
+                self._reports[report.number] = report
+            self._reports_cache.update(self._reports)
+        return self._reports
+
+    @traced
+    def get_reports(self, detailed: bool = False) -> dict[str, 'Report']:
+        """
+        Get all reports in this account. Optionally return detailed return data for each report.
+        Auth Required: Read Reports
+
+        :param detailed: Optional, defaults to False. If True, will return detailed return data for each report, one request per report, run concurrently if max_workers is more than 1. This can be very slow. It is recommended to use get_report() to get detailed data for a specific report if you do not need all of them at once.
+        :return: dict of Report objects where dict key is the report number
+        """
+        self.__get_reports()
+        if detailed:
+            self.__map(lambda number: self.__get_reports(number=number), list(self._reports))
+        return self._reports
+
+    @traced
+    def get_report(self, number: str) -> 'Report':
+        """
+        Get report by number. Note that this will return detailed return data.
+        Auth Required: Read Reports
+
+        :param number: e.g. GZH7QT03FD
+        :return: Report object
+        """
+        if not self.auto_refresh: self.__get_reports(number=number)  # if auto refresh is enabled, accessing the key below already refreshes so do not request again
+        return self._reports[number]
+
+    @traced
+    def compare_reports(self, reports: list[Union['Report', str]] = None, refresh: bool = False) -> 'ReportComparison':
+        """
+        Compare several reports: align their daily results by date, compute spread, correlation and drawdown overlap matrices, and rank them by any Results metric. Requires numpy (pip install whispertrades[analytics]).
+        Reports already fetched with details are reused without any request, so repeated comparisons are free.
+        Auth Required: Read Reports
+
+        :param reports: Optional, Report objects or report numbers. Defaults to all reports in this account.
+        :param refresh: Optional, defaults to False. If True, fetch every report again, e.g. after re-running them.
+        :return: ReportComparison
+        """
+        from .comparison import ReportComparison
+        if reports is None:
+            if not self._reports:
+                self.__get_reports()
+            numbers = list(self._reports)
+        else:
+            numbers = [r if isinstance(r, str) else r.number for r in reports]
+        compared = []
+        for number in numbers:
+            report = dict.get(self._reports, number)  # plain dict lookup, as UpdatingDict refreshes on item access
+            if refresh or report is None or report.daily_results is None:
+                self.__get_reports(number=number)
+                report = dict.get(self._reports, number)
+            compared.append(report)
+        return ReportComparison(compared)
+
+    @property
+    @traced
+    def reports(self) -> dict[str, 'Report']:
+        self.__await_bootstrap('reports')
+        self._record_cache('reports', hit=bool(self._reports))
+        if not self._reports:  # auto refresh is handled in UpdatingDict during client init
+            self.__get_reports()
+        return self._reports
+
+    def __repr__(self):
+        token_redacted = self.token[:4] + '...' + self.token[-4:]
+        return f'<WTClient token={token_redacted} auto_refresh={self.auto_refresh} endpoint={self.endpoint}>'
+
+
+def _reinit_clients_after_fork():
+    for client in list(_clients):
+        client._reinit_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):  # not available on Windows, where processes are always spawned
+    os.register_at_fork(after_in_child=_reinit_clients_after_fork)
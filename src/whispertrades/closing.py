@@ -0,0 +1,211 @@
+import time
+from concurrent.futures import wait
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from . import WTClient
+    from .order import Order
+    from .position import Position, PositionLeg
+
+CLOSING_INSTRUCTIONS = {'SELL_TO_OPEN': 'BUY_TO_CLOSE', 'BUY_TO_OPEN': 'SELL_TO_CLOSE'}  #: instruction expected in the closing order for each opening action
+FINAL_STATUSES = frozenset({'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED'})
+CLOCK_SKEW = timedelta(seconds=60)  # closing orders submitted up to this long before the local send time still match, in case the local clock is ahead
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class CloseResult:
+    """Outcome of closing one position with WTClient.close_positions(). Times are seconds since the close request was sent."""
+
+    def __init__(self, position: 'Position'):
+        data = position._PositionResponse  # the response model, as attribute access on Position may trigger a refresh
+        self.position: 'Position' = position  #: the closed Position
+        self.number: str = position.number  #: Position number
+        self.bot_number: str = data.bot.number  #: Bot number of the position
+        self.legs: list['PositionLeg'] = [leg for leg in data.legs if leg.quantity_open]  #: legs that were open when the close was sent
+        self.status: Literal['PENDING', 'SUBMITTED', 'WORKING', 'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'FAILED'] = 'PENDING'  #: SUBMITTED until the closing order is found, then the order status. FAILED if the close request raised.
+        self.order: Optional['Order'] = None  #: the closing Order, once found
+        self.error: Optional[Exception] = None  #: exception raised by the close request, if FAILED
+        self.issues: list[str] = []  #: problems found verifying the closing order leg by leg against the open legs of the position
+        self.sent_at: Optional[datetime] = None  #: UTC time the close request was sent
+        self.submit_time: Optional[float] = None  #: seconds the close request took, including rate limiter waits
+        self.found_time: Optional[float] = None  #: seconds until the closing order was first seen
+        self.done_time: Optional[float] = None  #: seconds until the closing order was first seen in a final status
+        self._sent: float = 0.0  # perf_counter when the close request was sent
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES or self.status == 'FAILED'
+
+    @property
+    def verified(self) -> bool:
+        """If the closing order filled completely and closes every open leg with the expected instruction and quantity"""
+        return self.status == 'FILLED' and not self.issues
+
+    def _found(self, order: 'Order'):
+        self.order = order
+        self.found_time = time.perf_counter() - self._sent
+        self.issues = self._verify(order)
+        self._update(order)
+
+    def _update(self, order: 'Order'):
+        data = order._OrderResponse
+        self.status = data.status
+        if data.status in FINAL_STATUSES and self.done_time is None:
+            self.done_time = time.perf_counter() - self._sent
+            if data.status == 'FILLED' and data.filled_quantity < data.original_quantity:
+                self.issues.append(f'filled {data.filled_quantity} of {data.original_quantity}')
+
+    def _verify(self, order: 'Order') -> list[str]:
+        data = order._OrderResponse
+        closing_legs = {leg.instrument: leg for leg in data.legs}
+        issues = []
+        for leg in self.legs:
+            closing = closing_legs.get(leg.instrument)
+            expected = CLOSING_INSTRUCTIONS.get(leg.action)
+            if closing is None:
+                issues.append(f'{leg.instrument}: not in closing order')
+            elif closing.instruction != expected:
+                issues.append(f'{leg.instrument}: {closing.instruction}, expected {expected}')
+            elif leg.quantity_open not in (closing.quantity, closing.quantity * data.original_quantity):  # leg quantity is given either per order or per unit
+                issues.append(f'{leg.instrument}: closing quantity {closing.quantity}, {leg.quantity_open} open')
+        return issues
+
+    def _matches(self, order: 'Order') -> bool:
+        data = order._OrderResponse
+        if data.type != 'CLOSING' or data.bot.number != self.bot_number or _utc(data.submitted_at) < self.sent_at - CLOCK_SKEW:
+            return False
+        instruments = {leg.instrument for leg in data.legs}
+        return any(leg.instrument in instruments for leg in self.legs)
+
+    def __repr__(self):
+        order = f' order={self.order.number}' if self.order is not None else ''
+        done = f' done={self.done_time:.1f}s' if self.done_time is not None else ''
+        return f'<CloseResult {self.number} {self.status}{order}{done}{" issues=" + str(len(self.issues)) if self.issues else ""}>'
+
+
+class BulkCloseReport:
+    """Completion report of WTClient.close_positions()."""
+
+    def __init__(self, results: dict[str, CloseResult]):
+        self.results: dict[str, CloseResult] = results  #: CloseResult of each position, keyed by position number
+        self.submit_time: float = 0.0  #: seconds until every close request returned
+        self.total_time: float = 0.0  #: seconds until every closing order was final, or the timeout
+        self.polls: int = 0  #: polling ticks
+        self.list_requests: int = 0  #: order list requests made while polling, counting every page
+        self.order_requests: int = 0  #: single order calls made while polling, only for orders that left WORKING without filling
+        self.timed_out: bool = False  #: if some closing orders were not final within the timeout
+
+    def _with_status(self, *statuses: str) -> dict[str, CloseResult]:
+        return {number: result for number, result in self.results.items() if result.status in statuses}
+
+    @property
+    def filled(self) -> dict[str, CloseResult]:
+        return self._with_status('FILLED')
+
+    @property
+    def failed(self) -> dict[str, CloseResult]:
+        """Positions whose close request raised, or whose closing order was canceled, expired or rejected"""
+        return self._with_status('FAILED', 'CANCELED', 'EXPIRED', 'REJECTED')
+
+    @property
+    def pending(self) -> dict[str, CloseResult]:
+        """Positions whose closing order was not found or not final when polling stopped"""
+        return self._with_status('PENDING', 'SUBMITTED', 'WORKING')
+
+    @property
+    def unverified(self) -> dict[str, CloseResult]:
+        """Positions that filled, but whose closing order does not match the open legs exactly"""
+        return {number: result for number, result in self.results.items() if result.status == 'FILLED' and result.issues}
+
+    def fill_times(self) -> list[float]:
+        """Seconds from close request to fill of each filled position, sorted"""
+        return sorted(result.done_time for result in self.filled.values())
+
+    def __repr__(self):
+        return (f'<BulkCloseReport positions={len(self.results)} filled={len(self.filled)} failed={len(self.failed)} pending={len(self.pending)} '
+                f'unverified={len(self.unverified)} submit={self.submit_time:.1f}s total={self.total_time:.1f}s polls={self.polls}>')
+
+
+class BulkCloser:
+    """
+    Closes many positions and tracks their closing orders with one shared polling loop. Use WTClient.close_positions().
+    Each tick lists WORKING orders once. Recently filled orders are only listed in ticks where a tracked order left WORKING or a closing order was not found yet, as it may have filled between two ticks. Only orders that left WORKING without filling are fetched one by one, to learn their final status.
+    """
+
+    def __init__(self, client: 'WTClient', positions: list['Position'], poll_interval: float, timeout: float):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.report = BulkCloseReport({position.number: CloseResult(position) for position in positions})
+        self._claimed: set[str] = set()  # order numbers matched to a position
+
+    def _close(self, result: CloseResult):
+        result.sent_at = datetime.now(timezone.utc)
+        result._sent = time.perf_counter()
+        try:
+            result.position.close()
+        except Exception as e:
+            result.status, result.error = 'FAILED', e
+        else:
+            result.status = 'SUBMITTED'
+        result.submit_time = time.perf_counter() - result._sent
+
+    def _match(self, orders: dict[str, 'Order']):
+        waiting = sorted((r for r in self.report.results.values() if r.status == 'SUBMITTED'), key=lambda r: r.sent_at)
+        if not waiting:
+            return
+        candidates = sorted((o for n, o in orders.items() if n not in self._claimed and o._OrderResponse.type == 'CLOSING'), key=lambda o: _utc(o._OrderResponse.submitted_at))
+        for order in candidates:  # oldest order to the oldest matching close, if several positions of a bot close the same instruments
+            result = next((r for r in waiting if r.status == 'SUBMITTED' and r._matches(order)), None)
+            if result is not None:
+                self._claimed.add(order.number)
+                result._found(order)
+
+    def _recently_filled(self, since: datetime) -> dict[str, 'Order']:
+        """Orders filled since the first close request. Pages are sorted newest first, so stop at the first page reaching back before it."""
+        filled, page = {}, 1
+        while True:
+            orders = self.client._list_orders(status='FILLED', from_date=(since - timedelta(days=1)).date(), page=page)  # the API may use another time zone for dates
+            self.report.list_requests += 1
+            filled.update(orders)
+            if len(orders) < 100 or any(_utc(o._OrderResponse.submitted_at) < since - CLOCK_SKEW for o in orders.values()):
+                return filled
+            page += 1
+
+    def _poll(self):
+        results = self.report.results.values()
+        working = self.client._list_orders(status='WORKING')
+        self.report.list_requests += len(working) // 100 + 1  # pages of 100
+        self._match(working)
+        left = [r for r in results if r.status == 'WORKING' and r.order.number not in working]
+        if left or any(r.status == 'SUBMITTED' for r in results):
+            filled = self._recently_filled(min(r.sent_at for r in results if r.sent_at is not None))
+            self._match(filled)
+            for result in left:
+                if result.order.number not in filled:
+                    self.client.get_order(result.order.number)
+                    self.report.order_requests += 1
+        for result in results:
+            if result.order is not None and not result.done:
+                result._update(result.order)  # the cached Order was updated in place by the list calls
+
+    def run(self) -> BulkCloseReport:
+        report = self.report
+        start = time.perf_counter()
+        wait([self.client.submit(self._close, result) for result in report.results.values()])
+        report.submit_time = time.perf_counter() - start
+        deadline = time.perf_counter() + self.timeout  # from the last close request, which may have waited long for the rate limit
+        while not all(result.done for result in report.results.values()):
+            if time.perf_counter() + self.poll_interval > deadline:
+                report.timed_out = True
+                break
+            time.sleep(self.poll_interval)
+            report.polls += 1
+            self._poll()
+        report.total_time = time.perf_counter() - start
+        return report
+
@@ -1,14 +1,32 @@
+import copy
 import traceback
-from typing import Any, Callable, Union
+import warnings
+from collections.abc import Mapping
+from typing import Any, Callable, Iterator, TYPE_CHECKING, TypeVar, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
+if TYPE_CHECKING:
+    from .client import WTClient
 
-class BaseResponse(BaseModel):
+
+class LazyModel(BaseModel):
+    """Base for all models of this package. Validation schemas are built on first use instead of at import time."""
+    model_config = ConfigDict(defer_build=True)
+
+
+class BaseResponse(LazyModel):
     success: bool
     message: str
     data: Union[list[dict], dict] = []
     pages: list = None
+    cached: bool = False  #: True if the data did not change since the previous request to the same URL and this is the previously parsed envelope (see ResponseCache)
+    stale: bool = False  #: True if no request was sent as the API is failing (see CircuitBreaker) and this is the last envelope received for the same URL
+
+
+class BasicBot(LazyModel):
+    name: str
+    number: str
 
 
 class APIError(Exception):
@@ -20,6 +38,26 @@ class APIError(Exception):
             raise InvalidTokenError(message)
 
 
+class RateLimitError(APIError):
+    pass
+
+
+class BulkActionError(APIError):
+    """Raised when some calls of a bulk action failed. The calls that succeeded were still applied."""
+    def __init__(self, message: str, results: dict = None, errors: dict[str, Exception] = None):
+        super().__init__(message)
+        self.results: dict = results or {}  #: results of the calls that succeeded, keyed by number
+        self.errors: dict[str, Exception] = errors or {}  #: exceptions of the calls that failed, keyed by number
+
+
+class CircuitOpenError(APIError):
+    """Raised without sending a request while the circuit of an endpoint family is open (see CircuitBreaker) and there is no cached response to serve."""
+    def __init__(self, message: str, family: str = None, retry_in: float = None):
+        super().__init__(message)
+        self.family: str = family  #: endpoint family e.g. orders
+        self.retry_in: float = retry_in  #: seconds until recovery is probed
+
+
 class TokenPermissionError(Exception):
     pass
 
@@ -28,10 +66,18 @@ class InvalidTokenError(Exception):
     pass
 
 
+class DetachedError(RuntimeError):
+    """Raised when a detached object needs its client, e.g. to refresh or to send an action. Call attach(client) first."""
+    pass
+
+
 class ReportRunningWarning(UserWarning):
     pass
 
 
+warnings.filterwarnings('always', category=ReportRunningWarning)
+
+
 class ReportUninitializedWarning(UserWarning):
     pass
 
@@ -46,3 +92,99 @@ class UpdatingDict(dict):
             if not "IPython\\lib\\pretty.py" in traceback.extract_stack()[-2].filename:  # do not trigger update if called from IPython/Jupyter
                 self[key] = self._update_fn(key)
         return super().__getitem__(key)
+
+
+class EntityView(Mapping):
+    """
+    Read-only mapping of the entities of a client collection that are related to another entity, e.g. the orders of a bot.
+    Entities are stored once, in the collection of the client, and the view only holds the numbers of the related ones, so it always shows their current data and costs no copies. Pickled as a plain dict.
+    """
+    __slots__ = ('_store', '_numbers')
+
+    def __init__(self, store: dict, numbers: dict[str, None]):
+        self._store = store
+        self._numbers = numbers  # used as an ordered set, shared with the index of the client
+
+    def __getitem__(self, number: str) -> Any:
+        if number not in self._numbers:
+            raise KeyError(number)
+        return dict.__getitem__(self._store, number)  # plain dict lookup, as UpdatingDict refreshes on item access
+
+    def __contains__(self, number: object) -> bool:
+        return number in self._numbers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._numbers))  # copy, as refreshes on other threads may add numbers
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class _DetachedClient:
+    """Stands in for the client of detached objects. Pickled by reference, so detached objects carry no connection state."""
+
+    def __getattr__(self, name: str):
+        raise DetachedError(f"This object is detached from its client and cannot use {name}. Call attach(client) first.")
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __reduce__(self) -> str:
+        return 'DETACHED_CLIENT'
+
+    def __repr__(self):
+        return '<detached>'
+
+
+DETACHED_CLIENT = _DetachedClient()
+
+_T = TypeVar('_T', bound='Detachable')
+
+
+class Detachable:
+    """
+    Pickling support of the objects returned by WTClient (bots, orders, positions, variables, reports and broker connections), e.g. to send them to a ProcessPoolExecutor.
+    Pickled objects and copies from detach() hold plain data only: their client is replaced by a placeholder and auto_refresh is off, so reading attributes never sends requests. Anything that needs the API raises DetachedError until attach() is called.
+    """
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['client'] = DETACHED_CLIENT
+        state['auto_refresh'] = False
+        return state
+
+    @property
+    def detached(self) -> bool:
+        """If this object has no client"""
+        return self.client is DETACHED_CLIENT
+
+    def detach(self: _T) -> _T:
+        """Detached shallow copy of this object. The object itself stays attached."""
+        return copy.copy(self)
+
+    def attach(self: _T, client: 'WTClient', auto_refresh: bool = None) -> _T:
+        """
+        Attach this object (e.g. after unpickling) to a client, so that it refreshes and sends actions through it again. Does not add it to the cached collections of the client: refreshes update the cached instance, and their data is then copied into this object.
+
+        :param auto_refresh: Optional, defaults to the auto_refresh setting of the client.
+        :return: this object
+        """
+        self.client = client
+        self.auto_refresh = client.auto_refresh if auto_refresh is None else auto_refresh
+        return self
+
+    def _sync(self, current: 'Detachable'):
+        """Copy the data of the client's cached instance into this object after a refresh, if this is another instance, e.g. attached after unpickling"""
+        if current is self:
+            return
+        with self.client._lock:
+            state = current.__dict__.copy()
+        state.pop('client', None)
+        state.pop('auto_refresh', None)
+        self.__dict__.update(state)
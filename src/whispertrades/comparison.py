@@ -0,0 +1,146 @@
+from typing import Optional
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("Report comparison requires numpy. Install it with: pip install whispertrades[analytics]") from e
+
+from .report import DailyResults, Report, ResultByDay, Results
+
+
+class ReportComparison:
+    """
+    Compare the results of several reports, e.g. variants of the same strategy. Daily series are aligned by date, with NaN on dates a report does not cover, and every pairwise statistic only uses the dates both reports cover.
+    Matrices are numpy arrays whose rows and columns follow the order of numbers. Aligned series are computed once per field and reused.
+    Use WTClient.compare_reports() to create one from report numbers, reusing reports that were already fetched.
+
+    :param reports: Report objects with daily results, i.e. fetched with details.
+    """
+
+    def __init__(self, reports: list[Report]):
+        if not reports:
+            raise ValueError("At least one report is required.")
+        for report in reports:
+            if report.daily_results is None:
+                raise ValueError(f"Report {report.number} has no daily results. Fetch it with client.get_report() first.")
+        self.reports: dict[str, Report] = {report.number: report for report in reports}  #: compared reports, keyed by number
+        self.numbers: list[str] = list(self.reports)  #: report numbers, in the order of matrix rows and columns
+        ordinals = [self._ordinals(report.daily_results) for report in self.reports.values()]
+        self._ordinals_all: np.ndarray = np.unique(np.concatenate(ordinals))
+        self._positions: list[np.ndarray] = [np.searchsorted(self._ordinals_all, o) for o in ordinals]
+        self._series: dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _ordinals(days) -> np.ndarray:
+        if isinstance(days, DailyResults):
+            return np.frombuffer(days.ordinals, dtype=np.int32).astype(np.int64)
+        return np.array([d.date.toordinal() for d in days], dtype=np.int64)
+
+    @staticmethod
+    def _column(days, field: str) -> np.ndarray:
+        if isinstance(days, DailyResults):
+            return np.asarray(days.column(field), dtype=np.float64)
+        return np.array([getattr(d, field) for d in days], dtype=np.float64)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """All dates covered by any report, sorted, as datetime64[D]"""
+        return (self._ordinals_all - 719163).astype('datetime64[D]')  # 719163 is the ordinal of 1970-01-01
+
+    def series(self, field: str = 'day_return_percent') -> np.ndarray:
+        """
+        Daily values of a ResultByDay field for all reports, aligned by date.
+
+        :param field: Optional, defaults to day_return_percent.
+        :return: array of shape (reports, dates), NaN where a report has no result for the date
+        """
+        if field not in self._series:
+            if field == 'date' or field not in ResultByDay.model_fields:
+                raise ValueError(f"Invalid field: {field}. Valid fields are {[f for f in ResultByDay.model_fields if f != 'date']}")
+            values = np.full((len(self.numbers), len(self._ordinals_all)), np.nan)
+            for row, (report, positions) in enumerate(zip(self.reports.values(), self._positions)):
+                values[row, positions] = self._column(report.daily_results, field)
+            self._series[field] = values
+        return self._series[field]
+
+    def _masked(self, field: str) -> tuple[np.ndarray, np.ndarray]:
+        values = self.series(field)
+        mask = ~np.isnan(values)
+        return np.where(mask, values, 0.0), mask.astype(np.float64)
+
+    def spread(self, field: str = 'total_return_percent') -> np.ndarray:
+        """
+        Mean difference between each pair of reports over their common dates.
+
+        :param field: Optional, ResultByDay field to compare, defaults to total_return_percent.
+        :return: array of shape (reports, reports) where [i, j] is the mean of report i minus report j, NaN if they share no dates
+        """
+        x, m = self._masked(field)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (x @ m.T - m @ x.T) / (m @ m.T)
+
+    def correlation(self, field: str = 'day_return_percent') -> np.ndarray:
+        """
+        Pearson correlation between each pair of reports over their common dates.
+
+        :param field: Optional, ResultByDay field to correlate, defaults to day_return_percent.
+        :return: array of shape (reports, reports), NaN where undefined e.g. fewer than 2 common dates or a constant series
+        """
+        x, m = self._masked(field)
+        n = m @ m.T
+        sx, sy = x @ m.T, m @ x.T
+        sxx, syy = (x * x) @ m.T, m @ (x * x).T
+        sxy = x @ x.T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+        corr[n < 2] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def drawdown_overlap(self, threshold: float = 0.0) -> np.ndarray:
+        """
+        How often reports are in drawdown at the same time: for each pair, the days both are in drawdown divided by the days either is, over their common dates.
+
+        :param threshold: Optional, a report is in drawdown on days where the absolute current_drawdown_percent exceeds this, defaults to 0.
+        :return: array of shape (reports, reports) with values from 0 to 1, NaN if neither is ever in drawdown on common dates
+        """
+        values = self.series('current_drawdown_percent')
+        m = (~np.isnan(values)).astype(np.float64)
+        d = (np.abs(np.nan_to_num(values)) > threshold).astype(np.float64)
+        both = d @ d.T
+        either = d @ m.T + m @ d.T - both
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return both / either
+
+    def metric(self, name: str) -> dict[str, Optional[float]]:
+        """
+        A Results field of every report, e.g. metric('sharpe').
+
+        :return: dict of report number to value
+        """
+        if name not in Results.model_fields or name in ('days', 'years', 'bots'):
+            raise ValueError(f"Invalid metric: {name}. Valid metrics are {[f for f in Results.model_fields if f not in ('days', 'years', 'bots')]}")
+        return {number: getattr(report.results, name) for number, report in self.reports.items()}
+
+    def rank(self, metric: str, descending: bool = True) -> list[tuple[str, Optional[float]]]:
+        """
+        Rank reports by a Results field, e.g. rank('sharpe') or rank('max_drawdown_percent', descending=False).
+
+        :param descending: Optional, defaults to True, highest first. Reports without a value are always last.
+        :return: list of (report number, value), best first
+        """
+        values = self.metric(metric)
+        present = sorted((item for item in values.items() if item[1] is not None), key=lambda item: item[1], reverse=descending)
+        return present + [item for item in values.items() if item[1] is None]
+
+    def matrix_dict(self, matrix: np.ndarray) -> dict[str, dict[str, float]]:
+        """Convert a (reports, reports) matrix from this comparison to a nested dict keyed by report numbers"""
+        return {a: {b: float(matrix[i, j]) for j, b in enumerate(self.numbers)} for i, a in enumerate(self.numbers)}
+
+    def __getitem__(self, number: str) -> Report:
+        return self.reports[number]
+
+    def __len__(self) -> int:
+        return len(self.reports)
+
+    def __repr__(self):
+        return f'<ReportComparison reports={len(self.reports)} dates={len(self._ordinals_all)}>'
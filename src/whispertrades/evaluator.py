@@ -0,0 +1,267 @@
+from datetime import datetime
+from typing import Optional, TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("Condition evaluation requires numpy. Install it with: pip install whispertrades[analytics]") from e
+
+if TYPE_CHECKING:
+    from .bot import Adjustment, Bot, ExitCondition
+    from .position import Position
+
+EXIT_RULES = ('profit_target', 'stop_loss', 'profit_premium', 'loss_premium', 'delta_stop', 'itm_stop', 'otm_stop')  #: exit rules evaluated, in the order of the columns of ConditionEvaluation.exit_distances
+ADJUSTMENT_CONDITIONS = ('days_to_expiration', 'position_delta', 'position_profit_percent', 'position_otm_percent', 'iv', 'vix',
+                         'underlying_percent_move_from_open', 'underlying_percent_move_from_close')  #: adjustment conditions evaluated, all of which must hold for an adjustment to trigger
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def _number(value) -> float:
+    """Parse a rule value such as "50", "50%", "$1.20" or 0.3, NaN if absent or not a number"""
+    if value is None:
+        return np.nan
+    try:
+        return float(str(value).strip().rstrip('%').lstrip('$'))
+    except ValueError:
+        return np.nan
+
+
+def _exit_thresholds(exit_condition: Optional['ExitCondition']) -> tuple[float, ...]:
+    """Thresholds of a bot's exit condition in the order of EXIT_RULES, NaN for rules not set"""
+    if exit_condition is None:
+        return (np.nan,) * len(EXIT_RULES)
+    return (abs(_number(exit_condition.profit_target_percent)), abs(_number(exit_condition.stop_loss_percent)), abs(_number(exit_condition.profit_premium_value)),
+            abs(_number(exit_condition.loss_premium_value)), abs(_number(exit_condition.delta_stop)), abs(_number(exit_condition.itm_percent_stop)),
+            abs(_number(exit_condition.otm_percent_stop)))
+
+
+def _adjustment_bounds(adjustment: 'Adjustment') -> list[tuple[float, float]]:
+    """(minimum, maximum) of each condition of an adjustment in the order of ADJUSTMENT_CONDITIONS, NaN for bounds not set"""
+    bounds = [(np.nan, float(adjustment.days_to_expiration))]  # adjusts at or below the given days to expiration
+    for name in ADJUSTMENT_CONDITIONS[1:]:
+        bounds.append((_number(getattr(adjustment, f'minimum_{name}')), _number(getattr(adjustment, f'maximum_{name}'))))
+    return bounds
+
+
+def _in_window(adjustment: 'Adjustment', now: datetime) -> bool:
+    """If now is on one of the adjustment's days of the week and within its time of day"""
+    days = adjustment.days_of_week.days_of_week.split(', ')
+    if now.weekday() >= 5 or ('All' not in days and WEEKDAYS[now.weekday()] not in days):  # "All" means every trading day
+        return False
+    window = adjustment.time_of_day
+    return window.start_time <= now.time() and (window.end_time is None or now.time() <= window.end_time)
+
+
+def _distance(x: np.ndarray, x0: np.ndarray, threshold: np.ndarray, direction: np.ndarray) -> np.ndarray:
+    """
+    Relative distance of values x to thresholds they trigger at when moving in direction (+1 upwards, -1 downwards): 1 at the entry values x0, 0 at or past the threshold.
+    If the entry value was already at or past the threshold, the distance is relative to the threshold itself (or absolute if it is 0). NaN where any input is NaN.
+    """
+    gap = direction * (threshold - x)
+    scale = direction * (threshold - x0)
+    scale = np.where(scale > 0, scale, np.where(np.abs(threshold) > 0, np.abs(threshold), 1.0))
+    return np.maximum(gap / scale, 0.0)  # NaN propagates through np.maximum
+
+
+class MarketInputs:
+    """
+    Market data not included in positions, used by ConditionEvaluation for the rules that need it. Rules whose inputs are missing are skipped.
+
+    :param vix: Optional, current VIX, for adjustment VIX ranges.
+    :param prices: Optional, current price of each underlying symbol, e.g. {"SPX": 5000.0}, for ITM/OTM stops, adjustment OTM percent and underlying moves.
+    :param opens: Optional, today's opening price of each underlying symbol, for adjustment moves from open.
+    :param closes: Optional, previous closing price of each underlying symbol, for adjustment moves from close.
+    :param iv: Optional, current implied volatility of each underlying symbol, in the unit used by the bots' IV conditions.
+    """
+
+    def __init__(self, vix: float = None, prices: dict[str, float] = None, opens: dict[str, float] = None, closes: dict[str, float] = None, iv: dict[str, float] = None):
+        self.vix = vix
+        self.prices: dict[str, float] = prices or {}
+        self.opens: dict[str, float] = opens or {}
+        self.closes: dict[str, float] = closes or {}
+        self.iv: dict[str, float] = iv or {}
+
+    def _by_symbol(self, values: dict[str, float], symbols: np.ndarray) -> np.ndarray:
+        return np.array([values.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+
+    def __repr__(self):
+        return f'<MarketInputs vix={self.vix} symbols={sorted(set(self.prices) | set(self.opens) | set(self.closes) | set(self.iv))}>'
+
+
+class ConditionEvaluation:
+    """
+    Local what-if evaluation of the exit conditions and adjustments of bots against their open positions, computed in bulk with numpy from cached data, without any request.
+    For every position and rule it computes a relative distance to the trigger: 1 at entry (or far away), 0 at or past the trigger, NaN if the rule is not set or its inputs are missing. Distances rank positions by how close they are to being closed or adjusted by the platform, e.g. to refresh those first or to manage them manually.
+    Exit rules: profit target and stop loss (compared with current_profit as percentages), profit and loss premium (with the absolute current mid price, moving away from the entry price), delta stop (with the absolute current_delta) and ITM/OTM percent stops (with the most threatened open short strike, needs MarketInputs.prices). Trailing stops and variable conditions depend on history or state not available locally and are not evaluated.
+    Adjustments: an enabled adjustment applies to a position if now is within its days of week and time of day, and triggers when every range condition holds. Its distance is the largest distance of its conditions to their range. Conditions whose market inputs are missing are skipped, i.e. assumed to hold.
+    Results are in the order of numbers. Use WTClient.evaluate_positions() to evaluate the cached open positions.
+
+    :param positions: open Position objects. Their response data is used as is, attribute access never refreshes them here.
+    :param bots: Bot objects by number, with details loaded. Positions of bots not included are evaluated without rules.
+    :param market: Optional, MarketInputs for the rules that need market data.
+    :param now: Optional, time in the exchange time zone to evaluate days to expiration and adjustment time windows at. Defaults to the current local time.
+    """
+
+    def __init__(self, positions: list['Position'], bots: dict[str, 'Bot'], market: MarketInputs = None, now: datetime = None):
+        self.market: MarketInputs = market or MarketInputs()
+        self.now: datetime = now or datetime.now()
+        data = [position._PositionResponse for position in positions]  # the response models, as attribute access on Position may trigger a refresh
+        self.positions: dict[str, 'Position'] = {position.number: position for position in positions}  #: evaluated positions, keyed by number
+        self.numbers: list[str] = [d.number for d in data]  #: position numbers, in the order of all arrays
+        n = len(data)
+        bot_numbers = [d.bot.number for d in data]
+        today = self.now.date()
+
+        self.profit: np.ndarray = np.array([np.nan if d.current_profit is None else d.current_profit for d in data], dtype=np.float64)  #: current_profit of each position, in percent
+        self.delta: np.ndarray = np.abs(np.array([np.nan if d.current_delta is None else d.current_delta for d in data], dtype=np.float64))  #: absolute current_delta of each position
+        mid = np.abs(np.array([np.nan if d.current_mid is None else d.current_mid for d in data], dtype=np.float64))
+        entry = np.abs(np.array([d.entry_price for d in data], dtype=np.float64))
+        self.days_to_expiration: np.ndarray = np.array([min(((leg.expiration_date - today).days for leg in d.legs if leg.quantity_open), default=np.nan) for d in data],
+                                                       dtype=np.float64)  #: days until the nearest expiration among the open legs of each position
+        symbols = np.array([d.symbol for d in data], dtype=object)
+        price = self.market._by_symbol(self.market.prices, symbols)
+        self.otm_percent: np.ndarray = self._otm_percent(data, price)  #: percent the most threatened open short strike of each position is out of the money (negative if in the money), NaN without a price
+        otm_at_entry = self._otm_percent(data, np.array([d.underlying_at_entry for d in data], dtype=np.float64))
+
+        rules = {number: (bot.exit_condition, [a for a in (bot.adjustments or []) if a is not None]) for number, bot in bots.items() if bot.details_loaded}
+        thresholds = np.array([_exit_thresholds(rules[b][0] if b in rules else None) for b in bot_numbers], dtype=np.float64).reshape(n, len(EXIT_RULES))
+        zero, up, down = np.zeros(n), np.ones(n), -np.ones(n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns = [
+                _distance(self.profit, zero, thresholds[:, 0], up),
+                _distance(self.profit, zero, -thresholds[:, 1], down),
+                _distance(mid, entry, thresholds[:, 2], np.where(thresholds[:, 2] > entry, 1.0, -1.0)),  # a profit premium below the entry price means a credit position
+                _distance(mid, entry, thresholds[:, 3], np.where(thresholds[:, 3] > entry, 1.0, -1.0)),
+                _distance(self.delta, zero, thresholds[:, 4], up),
+                _distance(self.otm_percent, otm_at_entry, -thresholds[:, 5], down),
+                _distance(self.otm_percent, otm_at_entry, thresholds[:, 6], down),
+            ]
+        self.exit_distances: np.ndarray = np.column_stack(columns) if n else np.empty((0, len(EXIT_RULES)))  #: distance of each position (rows) to each exit rule in EXIT_RULES (columns)
+        self.exit_distance: np.ndarray = np.fmin.reduce(self.exit_distances, axis=1) if n else np.empty(0)  #: distance of each position to its nearest exit rule, NaN without exit rules
+        nearest = np.argmin(np.where(np.isnan(self.exit_distances), np.inf, self.exit_distances), axis=1) if n else np.empty(0, dtype=np.int64)
+        self.exit_rule: list[Optional[str]] = [None if np.isnan(d) else EXIT_RULES[i] for d, i in zip(self.exit_distance, nearest)]  #: nearest exit rule of each position
+
+        self.adjustment_distance: np.ndarray = np.full(n, np.nan)  #: distance of each position to its nearest applicable adjustment, NaN if none applies now
+        self.adjustment: list[Optional[str]] = [None] * n  #: number of the nearest applicable adjustment of each position
+        self._evaluate_adjustments(data, bot_numbers, rules, symbols, price)
+
+    @staticmethod
+    def _otm_percent(data: list, price: np.ndarray) -> np.ndarray:
+        """Percent out of the money of the nearest open short strike (any open strike if there is no short one) of each position at the given underlying prices"""
+        index, strikes, puts = [], [], []
+        for i, d in enumerate(data):
+            legs = [leg for leg in d.legs if leg.quantity_open]
+            short = [leg for leg in legs if leg.action == 'SELL_TO_OPEN']
+            for leg in short or legs:
+                index.append(i)
+                strikes.append(leg.strike_price)
+                puts.append(leg.type == 'PUT')
+        otm = np.full(len(data), np.inf)
+        if index:
+            index = np.array(index, dtype=np.int64)
+            leg_price = price[index]
+            strikes = np.array(strikes, dtype=np.float64)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                leg_otm = np.where(np.array(puts), leg_price - strikes, strikes - leg_price) / leg_price * 100
+                np.minimum.at(otm, index, leg_otm)  # NaN prices propagate
+        otm[np.isinf(otm)] = np.nan
+        return otm
+
+    def _evaluate_adjustments(self, data: list, bot_numbers: list[str], rules: dict, symbols: np.ndarray, price: np.ndarray):
+        """Evaluate every (position, applicable adjustment) pair at once, then keep the nearest adjustment of each position"""
+        market = self.market
+        pair_position, pair_adjustment, bounds = [], [], []
+        window: dict[int, bool] = {}  # id of adjustment -> if now is within its days and time of day
+        for i, bot_number in enumerate(bot_numbers):
+            for adjustment in rules.get(bot_number, (None, []))[1]:
+                if adjustment.status != 'Enabled':
+                    continue
+                applies = window.get(id(adjustment))
+                if applies is None:
+                    applies = window[id(adjustment)] = _in_window(adjustment, self.now)
+                if applies:
+                    pair_position.append(i)
+                    pair_adjustment.append(adjustment.number)
+                    bounds.append(_adjustment_bounds(adjustment))
+        if not pair_position:
+            return
+        index = np.array(pair_position, dtype=np.int64)
+        bounds = np.array(bounds, dtype=np.float64)  # pairs x conditions x (minimum, maximum)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.column_stack([  # in the order of ADJUSTMENT_CONDITIONS
+                self.days_to_expiration,
+                self.delta,
+                self.profit,
+                self.otm_percent,
+                market._by_symbol(market.iv, symbols),
+                np.full(len(data), np.nan if market.vix is None else market.vix),
+                (price / market._by_symbol(market.opens, symbols) - 1) * 100,
+                (price / market._by_symbol(market.closes, symbols) - 1) * 100,
+            ])[index]
+            low, high = bounds[:, :, 0], bounds[:, :, 1]
+            gap = np.fmax(np.fmax(low - values, values - high), 0.0)  # NaN bounds and values are ignored by fmax, so unset or unknown conditions hold
+            width = high - low
+            scale = np.where(width > 0, width, np.fmax(np.abs(low), np.abs(high)))
+            scale = np.where(scale > 0, scale, 1.0)
+            distance = np.fmax.reduce(gap / scale, axis=1)
+        order = np.lexsort((distance, index))  # by position, then distance
+        first = order[np.unique(index[order], return_index=True)[1]]
+        self.adjustment_distance[index[first]] = distance[first]
+        for pair in first:
+            self.adjustment[index[pair]] = pair_adjustment[pair]
+
+    @property
+    def distance(self) -> np.ndarray:
+        """Distance of each position to its nearest exit rule or adjustment, NaN if it has none"""
+        return np.fmin(self.exit_distance, self.adjustment_distance)
+
+    @property
+    def exits_triggered(self) -> list[str]:
+        """Numbers of positions at or past an exit rule"""
+        return [self.numbers[i] for i in np.flatnonzero(self.exit_distance == 0)]
+
+    @property
+    def adjustments_triggered(self) -> dict[str, str]:
+        """Adjustment number triggered for each position whose adjustment conditions all hold now"""
+        return {self.numbers[i]: self.adjustment[i] for i in np.flatnonzero(self.adjustment_distance == 0)}
+
+    def near(self, threshold: float = 0.1) -> dict[str, float]:
+        """
+        Positions within threshold of an exit rule or adjustment, nearest first.
+
+        :param threshold: Optional, maximum distance, defaults to 0.1, i.e. within 10% of the way from entry to the trigger.
+        :return: distance of each position, keyed by number
+        """
+        distance = self.distance
+        selected = np.flatnonzero(distance <= threshold)
+        return {self.numbers[i]: float(distance[i]) for i in selected[np.argsort(distance[selected], kind='stable')]}
+
+    def priority(self, top: int = None) -> list[str]:
+        """
+        Position numbers ordered by distance to their nearest trigger, nearest first and positions without rules last, e.g. to refresh or manage positions in this order.
+
+        :param top: Optional, number of positions to return. Defaults to all.
+        """
+        order = np.argsort(np.where(np.isnan(self.distance), np.inf, self.distance), kind='stable')
+        return [self.numbers[i] for i in order[:top]]
+
+    def explain(self, number: str) -> dict:
+        """
+        Evaluation of one position: distance to each exit rule, nearest exit rule and nearest adjustment.
+
+        :param number: Position number
+        """
+        i = self.numbers.index(number)
+        return {
+            'exit_distances': {rule: float(d) for rule, d in zip(EXIT_RULES, self.exit_distances[i]) if not np.isnan(d)},
+            'exit_rule': self.exit_rule[i],
+            'exit_distance': float(self.exit_distance[i]),
+            'adjustment': self.adjustment[i],
+            'adjustment_distance': float(self.adjustment_distance[i]),
+        }
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __repr__(self):
+        return f'<ConditionEvaluation positions={len(self.numbers)} exits_triggered={len(self.exits_triggered)} adjustments_triggered={len(self.adjustments_triggered)}>'
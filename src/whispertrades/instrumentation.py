@@ -0,0 +1,206 @@
+import inspect
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Iterator, Optional
+
+from . import profiling
+from .common import LazyModel
+
+
+_trigger: ContextVar[Optional[str]] = ContextVar('whispertrades_trigger', default=None)
+
+
+class RequestEvent(LazyModel):
+    endpoint: str  #: endpoint template including the HTTP method e.g. "GET bots/orders/{number}". Cache events use the collection name e.g. "orders"
+    caller: Optional[str]  #: public method or attribute access that triggered this event e.g. "WTClient.get_orders" or "Order.status"
+    url: Optional[str] = None  #: full request URL, None for cache events
+    status_code: Optional[int] = None  #: HTTP status code, None for cache events and transport errors
+    started_at: datetime  #: wall clock time the request was issued
+    limiter_wait: float = 0.0  #: seconds spent queued in the client side rate limiter
+    http_latency: float = 0.0  #: seconds spent on the network, from sending the request to receiving the full body
+    parse_time: float = 0.0  #: seconds spent decoding JSON and validating the response envelope
+    payload_size: int = 0  #: response body size in bytes
+    not_modified: bool = False  #: True if the response was unchanged since the previous request to the same URL (304 or identical body), so parsing was skipped
+    cache_hit: Optional[bool] = None  #: True if served from the client cache without a request, False for a cache miss that caused a refresh, None for plain requests
+    error: Optional[str] = None  #: exception raised while sending the request, if any
+
+
+class EndpointStats:
+    """Counters aggregated over all events of one endpoint."""
+    __slots__ = ('requests', 'errors', 'not_modified', 'cache_hits', 'cache_misses', 'limiter_wait', 'http_latency', 'parse_time', 'payload_bytes')
+
+    def __init__(self):
+        self.requests: int = 0  #: number of requests sent
+        self.errors: int = 0  #: number of requests that raised or returned a non 2xx status
+        self.not_modified: int = 0  #: number of requests whose response was unchanged and not parsed again
+        self.cache_hits: int = 0  #: number of reads served from cache
+        self.cache_misses: int = 0  #: number of reads that caused a refresh
+        self.limiter_wait: float = 0.0  #: total seconds spent in the rate limiter
+        self.http_latency: float = 0.0  #: total seconds spent on the network
+        self.parse_time: float = 0.0  #: total seconds spent parsing
+        self.payload_bytes: int = 0  #: total response bytes received
+
+    def add(self, event: RequestEvent):
+        if event.cache_hit is not None and event.url is None:
+            if event.cache_hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            return
+        self.requests += 1
+        if event.error or (event.status_code is not None and not 200 <= event.status_code < 300):
+            self.errors += 1
+        if event.not_modified:
+            self.not_modified += 1
+        self.limiter_wait += event.limiter_wait
+        self.http_latency += event.http_latency
+        self.parse_time += event.parse_time
+        self.payload_bytes += event.payload_size
+
+    def __repr__(self):
+        return f'<EndpointStats requests={self.requests} errors={self.errors} cache_hits={self.cache_hits} cache_misses={self.cache_misses}>'
+
+
+class LoggingSink:
+    """
+    Sink that logs every event.
+
+    :param logger: Optional, defaults to the "whispertrades" logger.
+    :param level: Optional, defaults to logging.DEBUG.
+    """
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.DEBUG):
+        self.logger = logger or logging.getLogger('whispertrades')
+        self.level = level
+
+    def __call__(self, event: RequestEvent):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        if event.url is None:
+            self.logger.log(self.level, 'cache %s %s caller=%s', 'hit' if event.cache_hit else 'miss', event.endpoint, event.caller)
+        else:
+            self.logger.log(self.level, '%s status=%s caller=%s limiter_wait=%.3fs http=%.3fs parse=%.3fs bytes=%d%s%s', event.endpoint, event.status_code, event.caller,
+                            event.limiter_wait, event.http_latency, event.parse_time, event.payload_size, ' not_modified' if event.not_modified else '', f' error={event.error}' if event.error else '')
+
+
+class OpenMetricsExporter:
+    """
+    Sink that aggregates events per endpoint and renders them in the OpenMetrics text format, e.g. to serve from a /metrics handler.
+
+    :param prefix: Optional, metric name prefix, defaults to "whispertrades".
+    """
+    metrics = [
+        ('requests', 'counter', 'Requests sent to the API'),
+        ('errors', 'counter', 'Requests that failed or returned a non 2xx status'),
+        ('not_modified', 'counter', 'Requests whose response was unchanged and served from the response cache'),
+        ('cache_hits', 'counter', 'Collection reads served from the client cache'),
+        ('cache_misses', 'counter', 'Collection reads that caused a refresh'),
+        ('limiter_wait_seconds', 'counter', 'Seconds spent queued in the client side rate limiter'),
+        ('http_latency_seconds', 'counter', 'Seconds spent on the network'),
+        ('parse_seconds', 'counter', 'Seconds spent parsing responses'),
+        ('payload_bytes', 'counter', 'Response bytes received'),
+    ]
+    _attributes = ['requests', 'errors', 'not_modified', 'cache_hits', 'cache_misses', 'limiter_wait', 'http_latency', 'parse_time', 'payload_bytes']
+
+    def __init__(self, prefix: str = 'whispertrades'):
+        self.prefix = prefix
+        self.stats: dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent):
+        with self._lock:
+            self.stats.setdefault(event.endpoint, EndpointStats()).add(event)
+
+    def render(self) -> str:
+        """
+        :return: all counters in OpenMetrics text exposition format, terminated by "# EOF"
+        """
+        lines = []
+        with self._lock:
+            items = sorted(self.stats.items())
+            for (name, metric_type, help_text), attribute in zip(self.metrics, self._attributes):
+                lines.append(f'# TYPE {self.prefix}_{name} {metric_type}')
+                lines.append(f'# HELP {self.prefix}_{name} {help_text}')
+                for endpoint, stats in items:
+                    label = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{self.prefix}_{name}_total{{endpoint="{label}"}} {getattr(stats, attribute)}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """
+    Collects a RequestEvent for every API request and cache lookup made by a WTClient, aggregates counters per endpoint, and forwards events to sinks.
+    A sink is any callable accepting a RequestEvent, e.g. a plain function, LoggingSink or OpenMetricsExporter.
+
+    :param sinks: Optional, list of sinks to forward events to.
+    """
+
+    def __init__(self, sinks: list[Callable[[RequestEvent], None]] = None):
+        self.sinks: list[Callable[[RequestEvent], None]] = list(sinks or [])
+        self.stats: dict[str, EndpointStats] = {}  #: counters aggregated per endpoint
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: Callable[[RequestEvent], None]):
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[RequestEvent], None]):
+        self.sinks.remove(sink)
+
+    def emit(self, event: RequestEvent):
+        with self._lock:
+            self.stats.setdefault(event.endpoint, EndpointStats()).add(event)
+        for sink in self.sinks:
+            sink(event)
+
+    def record_cache(self, collection: str, hit: bool):
+        self.emit(RequestEvent(endpoint=collection, caller=_trigger.get(), started_at=datetime.now(), cache_hit=hit))
+
+    def reset(self):
+        """Clear the aggregated counters. Sinks are kept."""
+        with self._lock:
+            self.stats = {}
+
+
+@contextmanager
+def trigger(name: str, implicit: bool = False) -> Iterator[None]:
+    """
+    Attribute requests made inside this block to name, unless an outer block already set a trigger.
+
+    :param implicit: Optional, defaults to False. True for attribute reads that refresh, so that an active APIProfiler reports them as implicit.
+    """
+    if _trigger.get() is not None:
+        yield
+        return
+    token = _trigger.set(name)
+    opened = profiling._open(name, implicit) if profiling._profilers else None
+    try:
+        yield
+    finally:
+        profiling._close(opened)
+        _trigger.reset(token)
+
+
+def current_trigger() -> Optional[str]:
+    return _trigger.get()
+
+
+def traced(fn: Callable) -> Callable:
+    """Decorator for public methods and properties, attributing the requests they make to ClassName.method_name."""
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if _trigger.get() is not None:
+            return fn(self, *args, **kwargs)
+        name = f'{type(self).__name__}.{fn.__name__}'
+        token = _trigger.set(name)
+        opened = profiling._open(name, isinstance(inspect.getattr_static(type(self), fn.__name__, None), property)) if profiling._profilers else None
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            profiling._close(opened)
+            _trigger.reset(token)
+    return wrapper
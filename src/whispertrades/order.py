@@ -1,14 +1,15 @@
 from datetime import datetime
 from typing import Literal, Optional, TYPE_CHECKING
 
-from pydantic import BaseModel
 
 if TYPE_CHECKING:
     from . import WTClient
-from .bot import BasicBot as Bot
+from .common import BasicBot as Bot
+from .common import CircuitOpenError, Detachable, LazyModel
+from .instrumentation import trigger
 
 
-class Leg(BaseModel):
+class Leg(LazyModel):
     number: int
     type: Literal["CALL", "PUT"]
     instrument: str
@@ -21,7 +22,7 @@ class Leg(BaseModel):
     ask: float
 
 
-class Submission(BaseModel):
+class Submission(LazyModel):
     quantity: Optional[int]
     price: float
     bid: Optional[float]
@@ -30,7 +31,7 @@ class Submission(BaseModel):
     submitted_at: datetime
 
 
-class Fill(BaseModel):
+class Fill(LazyModel):
     leg_number: int
     quantity: int
     price: float
@@ -40,7 +41,7 @@ class Fill(BaseModel):
     ask: float
 
 
-class OrderResponse(BaseModel):
+class OrderResponse(LazyModel):
     number: str
     broker_order_number: str
     status: Literal["WORKING", "FILLED", "CANCELED", "EXPIRED", "REJECTED"]
@@ -63,7 +64,7 @@ class OrderResponse(BaseModel):
     fills: list[Optional[Fill]]
 
 
-class Order:
+class Order(Detachable):
     def __init__(self, data: OrderResponse, client: 'WTClient', auto_refresh: bool):
         self._OrderResponse: OrderResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
@@ -94,6 +95,10 @@ class Order:
         return f'<Order {self._OrderResponse}>'
 
     def __getattribute__(self, name):
-        if not name.endswith('Response') and name not in ['number', 'broker_order_number', 'bot', 'is_paper'] and name in self._OrderResponse.model_fields and self.auto_refresh:
-            self.client.get_order(self.number)
+        if not name.startswith('_') and not name.endswith('Response') and name not in ['number', 'broker_order_number', 'bot', 'is_paper'] and name in self._OrderResponse.model_fields and self.auto_refresh:
+            with trigger(f'Order.{name}', implicit=True):
+                try:
+                    self._sync(self.client.get_order(self.number))
+                except CircuitOpenError:  # the API is failing, keep the last known value
+                    pass
         return super().__getattribute__(name)
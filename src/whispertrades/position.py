@@ -1,17 +1,16 @@
 from datetime import date, datetime
 from typing import Literal, Optional, TYPE_CHECKING
 
-import orjson
-from pydantic import BaseModel
 
 if TYPE_CHECKING:
     from . import WTClient
-from .bot import BasicBot as Bot
-from .common import APIError, BaseResponse
+from .common import BasicBot as Bot
+from .common import APIError, CircuitOpenError, Detachable, LazyModel
 from .broker_connection import BaseBrokerConnection
+from .instrumentation import traced, trigger
 
 
-class PositionLeg(BaseModel):
+class PositionLeg(LazyModel):
     status: Literal['OPEN', 'CLOSED']
     type: Literal['CALL', 'PUT']
     action: Literal['SELL_TO_OPEN', 'BUY_TO_OPEN', 'BUY_TO_CLOSE', 'SELL_TO_CLOSE']
@@ -45,7 +44,7 @@ class PositionLeg(BaseModel):
     exercised: Optional[bool]
 
 
-class PositionResponse(BaseModel):
+class PositionResponse(LazyModel):
     number: str
     status: Literal['OPEN', 'CLOSED']
     bot: Bot
@@ -81,7 +80,7 @@ class PositionResponse(BaseModel):
     legs: list[PositionLeg]
 
 
-class Position:
+class Position(Detachable):
     def __init__(self, data: PositionResponse, client: 'WTClient', auto_refresh: bool):
         self._PositionResponse: PositionResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
@@ -121,13 +120,13 @@ class Position:
         self.vix_at_exit: Optional[float] = data.vix_at_exit  #: VIX at exit
         self.legs: List[PositionLeg] = data.legs  #: Legs
 
+    @traced
     def close(self):
         """
         Close this specific bot position. This is only valid during market hours and while the bot is set to Enabled or Disable on Close.
         Auth Required: Write Positions
         """
-        response = self.client.session.put(f"{self.client.endpoint}bots/positions/{self.number}/close", headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/positions/{number}/close', number=self.number)
         if response.success:
             self.__init__(PositionResponse(**response.data), self.client, self.auto_refresh)
             return response.message
@@ -138,6 +137,10 @@ class Position:
         return f'<Position {self._PositionResponse}>'
 
     def __getattribute__(self, name):
-        if not name.endswith('Response') and name not in ['number', 'broker_order_number', 'bot', 'is_paper'] and name in self._PositionResponse.model_fields and self.auto_refresh:
-            self.client.get_position(self.number)
+        if not name.startswith('_') and not name.endswith('Response') and name not in ['number', 'broker_order_number', 'bot', 'is_paper'] and name in self._PositionResponse.model_fields and self.auto_refresh:
+            with trigger(f'Position.{name}', implicit=True):
+                try:
+                    self._sync(self.client.get_position(self.number))
+                except CircuitOpenError:  # the API is failing, keep the last known value
+                    pass
         return super().__getattribute__(name)
@@ -0,0 +1,218 @@
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Literal, Optional, Union
+
+_SKIPPED_FILES = (os.path.dirname(os.path.abspath(__file__)), contextlib.__file__)  # frames of this package and of the trigger() context manager
+
+_profilers: list['APIProfiler'] = []  # active profilers, checked before any profiling work so that it costs nothing when empty
+_block: ContextVar[Optional['ProfileRecord']] = ContextVar('whispertrades_profile_block', default=None)
+_lock = threading.Lock()
+
+Frame = tuple[str, int, str]  # file name, line number, function name
+
+
+def _user_stack(depth: int) -> tuple[Frame, ...]:
+    """Frames of the current thread outside of this package, outermost first, at most depth of the innermost ones"""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_SKIPPED_FILES):
+            frames.append((filename, frame.f_lineno, frame.f_code.co_name))
+            if len(frames) >= depth:
+                break
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+class ProfileRecord:
+    """One access that went through the API while an APIProfiler was active: an attribute read (implicit) or a method call (explicit)."""
+    __slots__ = ('trigger', 'implicit', 'stack', 'thread', 'requests', 'duration', '_start')
+
+    def __init__(self, trigger: str, implicit: bool, stack: tuple[Frame, ...]):
+        self.trigger: str = trigger  #: attribute or method that was accessed e.g. "Position.profit_dollars" or "WTClient.get_orders"
+        self.implicit: bool = implicit  #: True for attribute reads (auto-refreshing attributes and properties), False for method calls
+        self.stack: tuple[Frame, ...] = stack  #: calling frames outside of this package, outermost first
+        self.thread: str = threading.current_thread().name
+        self.requests: int = 0  #: requests sent, including those the access made on the thread pool
+        self.duration: float = 0.0  #: seconds the access took
+        self._start: float = time.perf_counter()
+
+    @property
+    def site(self) -> Optional[Frame]:
+        """Innermost calling frame outside of this package, i.e. the line of user code that made the access"""
+        return self.stack[-1] if self.stack else None
+
+    def close(self):
+        self.duration = time.perf_counter() - self._start
+        for profiler in list(_profilers):
+            profiler._add(self)
+
+    def __repr__(self):
+        site = f' at {_format(self.site)}' if self.site else ''
+        return f'<ProfileRecord {self.trigger}{site} requests={self.requests} duration={self.duration * 1000:.1f}ms>'
+
+
+def _format(frame: Frame, basename: bool = True) -> str:
+    filename, lineno, function = frame
+    return f'{os.path.basename(filename) if basename else filename}:{lineno} in {function}'
+
+
+def _open(trigger: str, implicit: bool) -> Optional[tuple[ProfileRecord, object]]:
+    """Start a record for an outermost trigger block, used by instrumentation.trigger() and traced while profiling"""
+    depth = max(profiler.stack_depth for profiler in _profilers) if _profilers else 0
+    if not depth:
+        return None
+    record = ProfileRecord(trigger, implicit, _user_stack(depth))
+    return record, _block.set(record)
+
+
+def _close(opened: Optional[tuple[ProfileRecord, object]]):
+    if opened is not None:
+        record, token = opened
+        _block.reset(token)
+        record.close()
+
+
+def _note_request():
+    """Count a request sent by WTClient towards the access being profiled, if any"""
+    record = _block.get()
+    with _lock:
+        if record is not None:
+            record.requests += 1
+        else:
+            for profiler in _profilers:
+                profiler.untraced_requests += 1
+
+
+class SiteStats:
+    """Accesses aggregated by call site and trigger."""
+    __slots__ = ('site', 'trigger', 'implicit', 'calls', 'requests', 'duration')
+
+    def __init__(self, site: Optional[Frame], trigger: str, implicit: bool):
+        self.site: Optional[Frame] = site  #: file name, line number and function of the user code, None if the access came from a thread without user frames
+        self.trigger: str = trigger  #: attribute or method accessed
+        self.implicit: bool = implicit
+        self.calls: int = 0  #: number of accesses
+        self.requests: int = 0  #: requests sent by them
+        self.duration: float = 0.0  #: seconds spent in them
+
+    def __repr__(self):
+        return f'<SiteStats {self.trigger} at {_format(self.site) if self.site else "?"} calls={self.calls} requests={self.requests} duration={self.duration:.3f}s>'
+
+
+class APIProfiler:
+    """
+    Records which lines of your code send API requests, e.g. to find loops like sum(p.profit_dollars for p in positions) that refresh every position with auto_refresh on.
+    While active (as a context manager, or between start() and stop()), every read of an auto-refreshing attribute or property and every public method call of any WTClient in the process is recorded with the calling frames outside of this package, the requests it sent and the time it took. Nested calls are attributed to the outermost one.
+    Use report() for a table ranked by requests, and folded() or write_folded() for stacks in the folded format read by flamegraph.pl, speedscope and similar tools.
+
+    :param stack_depth: Optional, number of calling frames kept per access, defaults to 32.
+    """
+
+    def __init__(self, stack_depth: int = 32):
+        if stack_depth < 1:
+            raise ValueError(f"stack_depth must be at least 1, got {stack_depth}")
+        self.stack_depth = stack_depth
+        self.records: list[ProfileRecord] = []  #: every recorded access, in the order they finished
+        self.untraced_requests: int = 0  #: requests sent outside of any recorded access, e.g. by internal threads
+        self.duration: float = 0.0  #: seconds the profiler was active
+        self._start: Optional[float] = None
+
+    def start(self):
+        with _lock:
+            if self not in _profilers:
+                _profilers.append(self)
+        self._start = time.perf_counter()
+
+    def stop(self):
+        with _lock:
+            if self in _profilers:
+                _profilers.remove(self)
+        if self._start is not None:
+            self.duration += time.perf_counter() - self._start
+            self._start = None
+
+    def _add(self, record: ProfileRecord):
+        with _lock:
+            self.records.append(record)
+
+    @property
+    def requests(self) -> int:
+        """Total requests sent while active"""
+        return sum(record.requests for record in self.records) + self.untraced_requests
+
+    def stats(self, by: Literal['site', 'trigger'] = 'site', implicit_only: bool = False) -> list[SiteStats]:
+        """
+        Accesses aggregated per call site and trigger (or per trigger only), ranked by requests, then time.
+
+        :param by: Optional, "site" (default) to aggregate per line of user code and trigger, "trigger" per attribute or method only.
+        :param implicit_only: Optional, defaults to False. If True, only attribute reads are included.
+        """
+        aggregated: dict[tuple, SiteStats] = {}
+        with _lock:
+            records = list(self.records)
+        for record in records:
+            if implicit_only and not record.implicit:
+                continue
+            site = record.site if by == 'site' else None
+            stats = aggregated.get((site, record.trigger))
+            if stats is None:
+                stats = aggregated[site, record.trigger] = SiteStats(site, record.trigger, record.implicit)
+            stats.calls += 1
+            stats.requests += record.requests
+            stats.duration += record.duration
+        return sorted(aggregated.values(), key=lambda s: (s.requests, s.duration), reverse=True)
+
+    def report(self, top: int = 20, by: Literal['site', 'trigger'] = 'site', implicit_only: bool = False) -> str:
+        """
+        Text table of the top call sites by requests. Implicit accesses (attribute reads) are marked with *.
+
+        :param top: Optional, number of rows, defaults to 20.
+        """
+        rows = self.stats(by, implicit_only)
+        lines = [f'{self.requests} requests in {len(self.records)} accesses over {self.duration + (time.perf_counter() - self._start if self._start else 0):.2f}s'
+                 f'{f", {self.untraced_requests} outside of any access" if self.untraced_requests else ""}',
+                 f'{"requests":>8} {"calls":>7} {"seconds":>9}  {"trigger":<32} call site']
+        for stats in rows[:top]:
+            trigger = f'{stats.trigger}{" *" if stats.implicit else ""}'
+            site = _format(stats.site) if stats.site else '-'
+            lines.append(f'{stats.requests:>8} {stats.calls:>7} {stats.duration:>9.3f}  {trigger:<32} {site}')
+        if len(rows) > top:
+            lines.append(f'... {len(rows) - top} more')
+        return '\n'.join(lines)
+
+    def folded(self, weight: Literal['requests', 'time'] = 'requests') -> str:
+        """
+        Stacks in the folded format ("outer;inner;trigger count" per line), for flamegraph.pl, speedscope, inferno and similar tools.
+
+        :param weight: Optional, "requests" (default) to weigh stacks by requests sent, "time" by microseconds spent.
+        """
+        counts: Counter[str] = Counter()
+        with _lock:
+            records = list(self.records)
+        for record in records:
+            value = record.requests if weight == 'requests' else int(record.duration * 1e6)
+            if value:
+                frames = [f'{function} ({os.path.basename(filename)}:{lineno})' for filename, lineno, function in record.stack]
+                counts[';'.join([*frames, record.trigger])] += value
+        return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common())
+
+    def write_folded(self, path: Union[str, os.PathLike], weight: Literal['requests', 'time'] = 'requests'):
+        with open(path, 'w') as f:
+            f.write(self.folded(weight))
+
+    def __enter__(self) -> 'APIProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __repr__(self):
+        return f'<APIProfiler accesses={len(self.records)} requests={self.requests} active={self._start is not None}>'
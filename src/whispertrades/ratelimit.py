@@ -0,0 +1,233 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from .transport import cap_timeout
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date. Returns seconds from now, or None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe client side rate limiter that adapts to the quota reported by the server.
+    Without server information it allows per_minute requests in any rolling 60 second window, which permits bursts up to the limit. Once the server reports X-RateLimit-Limit / X-RateLimit-Remaining, those take precedence, so requests are sent immediately while the server says quota remains and held back once it is exhausted. Retry-After on a 429 blocks all requests until it passes.
+    A single limiter can be shared by several clients or sessions that use the same API token.
+
+    :param per_minute: Optional, defaults to 30, the documented Whispertrades limit.
+    :param window: Optional, length of the rate limit window in seconds, defaults to 60.
+    """
+
+    def __init__(self, per_minute: int = 30, window: float = 60.0):
+        self.limit: int = per_minute  #: requests allowed per window, updated from X-RateLimit-Limit
+        self.window: float = window
+        self.remaining: Optional[int] = None  #: last server reported remaining quota, None if unknown
+        self._remaining_expires: float = 0.0  # monotonic time after which the server reported quota is considered outdated
+        self._blocked_until: float = 0.0
+        self._sent: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        while self._sent and now - self._sent[0] >= self.window:
+            self._sent.popleft()
+        if self.remaining is not None and now < self._remaining_expires:
+            if self.remaining > 0:
+                return 0.0
+            return self._remaining_expires - now
+        if len(self._sent) < self.limit:
+            return 0.0
+        return self.window - (now - self._sent[len(self._sent) - self.limit])
+
+    def acquire(self, timeout: float = None) -> float:
+        """
+        Block until a request may be sent and reserve it.
+
+        :param timeout: Optional, maximum seconds to wait. Raises Timeout if exceeded.
+        :return: seconds spent waiting
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    self._sent.append(now)
+                    if self.remaining is not None and now < self._remaining_expires:
+                        self.remaining -= 1
+                    return now - start
+            if timeout is not None and now - start + wait > timeout:
+                raise Timeout(f'Rate limit not cleared within {timeout}s')
+            time.sleep(wait)
+
+    def block_for(self, seconds: float):
+        """Hold back all requests for the given number of seconds, e.g. after a 429 response."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def update(self, response: Response):
+        """Update the limiter from the rate limit headers and status of a response."""
+        headers = response.headers
+        with self._lock:
+            now = time.monotonic()
+            try:
+                if 'X-RateLimit-Limit' in headers:
+                    self.limit = max(1, int(headers['X-RateLimit-Limit']))
+                if 'X-RateLimit-Remaining' in headers:
+                    self.remaining = max(0, int(headers['X-RateLimit-Remaining']))
+                    reset = headers.get('X-RateLimit-Reset')
+                    if reset is not None:
+                        reset = float(reset)
+                        reset = reset - time.time() if reset > 1e9 else reset  # epoch timestamp or seconds
+                    self._remaining_expires = now + (reset if reset is not None and reset > 0 else self.window)
+            except ValueError:
+                pass
+            if response.status_code == 429:
+                retry_after = parse_retry_after(headers.get('Retry-After'))
+                if retry_after is None:  # assume the window is full
+                    retry_after = self.window - (now - self._sent[0]) if self._sent else self.window
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self.remaining = 0
+                self._remaining_expires = max(self._remaining_expires, now + retry_after)
+
+    def export_state(self) -> dict:
+        """State of the limiter with unix timestamps, to be restored with import_state() in another process, e.g. by the command line tool between invocations."""
+        with self._lock:
+            offset = time.time() - time.monotonic()
+            return {'limit': self.limit, 'remaining': self.remaining, 'remaining_expires': self._remaining_expires + offset,
+                    'blocked_until': self._blocked_until + offset, 'sent': [t + offset for t in self._sent]}
+
+    def import_state(self, state: dict):
+        """Merge a state from export_state(): requests sent by either count against the window, and the stricter quota and block apply."""
+        with self._lock:
+            offset = time.time() - time.monotonic()
+            now = time.monotonic()
+            sent = {t - offset for t in state.get('sent', ()) if now - (t - offset) < self.window}
+            self._sent = deque(sorted(sent.union(self._sent)))
+            self._blocked_until = max(self._blocked_until, state.get('blocked_until', 0.0) - offset)
+            self.limit = state.get('limit', self.limit)
+            expires = state.get('remaining_expires', 0.0) - offset
+            if state.get('remaining') is not None and expires > now:
+                if self.remaining is None or now >= self._remaining_expires:
+                    self.remaining, self._remaining_expires = state['remaining'], expires
+                else:
+                    self.remaining, self._remaining_expires = min(self.remaining, state['remaining']), max(self._remaining_expires, expires)
+
+    def __repr__(self):
+        return f'<AdaptiveRateLimiter limit={self.limit}/{self.window:g}s remaining={self.remaining}>'
+
+
+class RetryPolicy:
+    """
+    When and how to retry failed requests. 429 responses are always safe to retry as the server did not process the request. Server errors and connection failures are only retried for idempotent methods (GET), so actions such as closing a position are never sent twice.
+
+    :param max_retries: Optional, defaults to 3. Set to 0 to disable retries.
+    :param backoff: Optional, base delay in seconds for exponential backoff, defaults to 1.
+    :param max_backoff: Optional, maximum delay in seconds between attempts, defaults to 30.
+    :param retry_statuses: Optional, server error statuses to retry for idempotent methods, defaults to 500, 502, 503, 504.
+    """
+
+    def __init__(self, max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 30.0, retry_statuses: tuple = (500, 502, 503, 504)):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def should_retry(self, method: str, attempt: int, status_code: int = None) -> bool:
+        """:param status_code: response status, or None if the request failed with a connection error or timeout"""
+        if attempt >= self.max_retries:
+            return False
+        if status_code == 429:
+            return True
+        return method in IDEMPOTENT_METHODS and (status_code is None or status_code in self.retry_statuses)
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Seconds to wait before the given retry attempt (0 based), using full jitter, or Retry-After plus a small jitter if the server sent one."""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, min(1.0, retry_after * 0.1))
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class AdaptiveLimiterAdapter(HTTPAdapter):
+    """
+    Transport adapter that rate limits requests with an AdaptiveRateLimiter and retries them according to a RetryPolicy.
+    Sets limiter_wait (seconds queued in the limiter and backing off), network_time (seconds on the network for the final attempt) and retries on each returned response.
+
+    :param limiter: Optional, defaults to a new AdaptiveRateLimiter.
+    :param retry: Optional, defaults to RetryPolicy().
+    :param deadline: Optional, maximum total seconds for one request including limiter waits, retries and backoff. Attempt timeouts are shortened to the time left, and Timeout is raised once it is used up. Defaults to None, no limit.
+    """
+
+    def __init__(self, limiter: AdaptiveRateLimiter = None, retry: RetryPolicy = None, deadline: float = None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.deadline = deadline
+
+    @staticmethod
+    def _past(expires: Optional[float], delay: float) -> bool:
+        return expires is not None and time.monotonic() + delay >= expires
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        attempt = 0
+        waited = 0.0
+        expires = None if self.deadline is None else time.monotonic() + self.deadline
+        timeout = kwargs.get('timeout')
+        while True:
+            if expires is None:
+                waited += self.limiter.acquire()
+            else:
+                waited += self.limiter.acquire(timeout=max(0.0, expires - time.monotonic()))
+                remaining = expires - time.monotonic()
+                if remaining <= 0:
+                    raise Timeout(f'Deadline of {self.deadline}s exceeded after {attempt} retries', request=request)
+                kwargs['timeout'] = cap_timeout(timeout, remaining)
+            start = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+                response.content  # read the body so that network time includes the download
+            except (ConnectionError, Timeout):
+                if not self.retry.should_retry(request.method, attempt):
+                    raise
+                delay = self.retry.delay(attempt)
+                if self._past(expires, delay):
+                    raise
+                time.sleep(delay)
+                waited += delay
+                attempt += 1
+                continue
+            network_time = time.perf_counter() - start
+            self.limiter.update(response)
+            if response.status_code >= 400 and self.retry.should_retry(request.method, attempt, response.status_code):
+                delay = self.retry.delay(attempt, parse_retry_after(response.headers.get('Retry-After')))
+                if not self._past(expires, delay):  # else no time left to retry, return the failed response
+                    response.close()
+                    time.sleep(delay)
+                    waited += delay
+                    attempt += 1
+                    continue
+            response.limiter_wait = waited
+            response.network_time = network_time
+            response.retries = attempt
+            return response
@@ -0,0 +1,178 @@
+import math
+import threading
+import time
+import warnings
+from collections import deque
+from typing import Optional, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from . import WTClient
+
+#: Default refresh interval in seconds per collection
+DEFAULT_INTERVALS = {'bots': 300.0, 'orders': 30.0, 'positions': 15.0}
+COLLECTIONS = ('bots', 'brokers', 'orders', 'variables', 'positions')
+PAGE_SIZE = 100
+
+
+def request_budget(client: 'WTClient', share: float) -> int:
+    """Requests per rolling window of the client's rate limiter (client.rate_limiter.window) that a share of its limit allows, following the limit the server reports"""
+    return max(1, int(client.rate_limiter.limit * share))
+
+
+class Snapshot:
+    """
+    Point in time copy of a client collection, published by BackgroundRefresher after each refresh.
+    The dict is a shallow copy, so it is safe to iterate while the next refresh is running. The entity objects inside are shared with the client cache.
+    """
+
+    def __init__(self, data: dict, refreshed_at: float = None):
+        self.data: dict = data  #: the collection, keyed by number
+        self.refreshed_at: float = refreshed_at or time.time()  #: unix timestamp of the refresh that produced this snapshot
+        self._monotonic: float = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """Seconds since this snapshot was taken"""
+        return time.monotonic() - self._monotonic
+
+    def __repr__(self):
+        return f'<Snapshot items={len(self.data)} age={self.age:.1f}s>'
+
+
+class BackgroundRefresher:
+    """
+    Refreshes client collections on a background thread, so that WTClient.bots, .orders, .positions etc. return the latest snapshot immediately instead of blocking on a network round trip.
+    Use WTClient.start_background_refresh() rather than creating this directly.
+
+    :param client: WTClient to refresh
+    :param intervals: Optional, refresh interval in seconds per collection. Valid collections are bots, brokers, orders, variables and positions. Collections not listed are not managed and keep their normal behaviour. Defaults to DEFAULT_INTERVALS.
+    :param max_staleness: Optional, seconds (for all collections or as dict per collection). If a snapshot is older than this when read, the read blocks and refreshes it first. Defaults to None, never block once a snapshot exists.
+    :param budget_share: Optional, fraction of the client's rate limit (client.rate_limiter.limit) that background refreshes may use, defaults to 0.5. The rest is left for foreground calls. Refreshes are delayed as needed to stay within it.
+    """
+
+    def __init__(self, client: 'WTClient', intervals: dict[str, float] = None, max_staleness: Union[float, dict[str, float]] = None, budget_share: float = 0.5):
+        intervals = dict(intervals or DEFAULT_INTERVALS)
+        for name, interval in intervals.items():
+            if name not in COLLECTIONS:
+                raise ValueError(f"Invalid collection: {name}. Valid collections are {COLLECTIONS}")
+            if interval <= 0:
+                raise ValueError(f"Refresh interval for {name} must be positive, got {interval}")
+        if not 0 < budget_share <= 1:
+            raise ValueError(f"budget_share must be between 0 and 1, got {budget_share}")
+        if not isinstance(max_staleness, dict):
+            max_staleness = {name: max_staleness for name in intervals}
+        self.client = client
+        self.intervals: dict[str, float] = intervals
+        self.max_staleness: dict[str, Optional[float]] = max_staleness
+        self.budget_share: float = budget_share
+        self.errors: dict[str, Exception] = {}  #: last error raised while refreshing each collection, cleared on success
+
+        self._snapshots: dict[str, Snapshot] = {}
+        self._due: dict[str, float] = {}
+        self._sent: deque[float] = deque()  # monotonic timestamps of background requests in the last rate limiter window
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        now = time.monotonic()
+        for name in self.intervals:
+            cached = getattr(client, f'_{name}')
+            if cached:  # already loaded e.g. by auto_init, so publish it and refresh after one interval
+                self._snapshots[name] = Snapshot(dict(cached))
+                self._due[name] = now + self.intervals[name]
+            else:
+                self._due[name] = now
+
+    @property
+    def budget(self) -> int:
+        """Maximum background requests per rolling rate limiter window, budget_share of the current limit of the client's rate limiter"""
+        return request_budget(self.client, self.budget_share)
+
+    def manages(self, name: str) -> bool:
+        return name in self.intervals and self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='whispertrades-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the background thread. Collections go back to their normal auto_refresh behaviour."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def snapshot(self, name: str) -> Optional[Snapshot]:
+        """Latest snapshot of a collection, without refreshing. None if it was never loaded."""
+        return self._snapshots.get(name)
+
+    def age(self, name: str) -> Optional[float]:
+        """Seconds since the collection was last refreshed, or None if it was never loaded"""
+        snapshot = self._snapshots.get(name)
+        return snapshot.age if snapshot else None
+
+    def read(self, name: str) -> dict:
+        """Return the latest snapshot of a collection, refreshing it first only if it is missing or older than max_staleness."""
+        snapshot = self._snapshots.get(name)
+        bound = self.max_staleness.get(name)
+        stale = snapshot is None or (bound is not None and snapshot.age > bound)
+        self.client._record_cache(name, hit=not stale)
+        if stale:
+            snapshot = self.refresh(name, if_older_than=bound)
+        return snapshot.data
+
+    def refresh(self, name: str, if_older_than: float = None) -> Snapshot:
+        """
+        Refresh a collection now and publish a new snapshot. Blocks while another refresh of any collection is running.
+
+        :param if_older_than: Optional, skip the refresh if a concurrent refresh already produced a snapshot younger than this many seconds.
+        """
+        with self._refresh_lock:
+            snapshot = self._snapshots.get(name)
+            if snapshot is not None and if_older_than is not None and snapshot.age <= if_older_than:
+                return snapshot
+            self._sent.extend([time.monotonic()] * self._estimate_requests(name))
+            data = self.client._refresh_collection(name)
+            snapshot = Snapshot(dict(data))
+            self._snapshots[name] = snapshot
+            self._due[name] = time.monotonic() + self.intervals.get(name, 0)
+            self.errors.pop(name, None)
+            return snapshot
+
+    def _estimate_requests(self, name: str) -> int:
+        if name in ('orders', 'positions'):  # paginated
+            return max(1, math.ceil((len(getattr(self.client, f'_{name}')) + 1) / PAGE_SIZE))
+        return 1
+
+    def _budget_wait(self, name: str) -> float:
+        now = time.monotonic()
+        window = self.client.rate_limiter.window
+        while self._sent and now - self._sent[0] >= window:
+            self._sent.popleft()
+        budget = self.budget  # follows the limit reported by the server
+        needed = min(self._estimate_requests(name), budget)
+        excess = len(self._sent) + needed - budget
+        if excess <= 0:
+            return 0.0
+        return window - (now - self._sent[excess - 1])
+
+    def _run(self):
+        while not self._stop.is_set():
+            name = min(self._due, key=self._due.get)
+            wait = max(self._due[name] - time.monotonic(), self._budget_wait(name))
+            if wait > 0:
+                self._stop.wait(min(wait, 1.0))  # re-evaluate regularly, foreground refreshes may have changed the schedule
+                continue
+            try:
+                self.refresh(name)
+            except Exception as e:
+                self.errors[name] = e
+                self._due[name] = time.monotonic() + self.intervals[name]
+                warnings.warn(f"Background refresh of {name} failed, retrying in {self.intervals[name]}s: {e!r}")
+
+    def __repr__(self):
+        ages = {name: None if age is None else round(age, 1) for name, age in ((n, self.age(n)) for n in self.intervals)}
+        return f'<BackgroundRefresher running={self._thread is not None} ages={ages}>'
@@ -1,13 +1,13 @@
 import warnings
+from array import array
+from collections.abc import Sequence
 from datetime import date, datetime
-from typing import Literal, Optional, TYPE_CHECKING
+from typing import Literal, Optional, TYPE_CHECKING, Union
 
-import orjson
-from pydantic import BaseModel
 
-from .bot import BasicBot
 from .broker_connection import BaseBrokerConnection
-from .common import APIError, BaseResponse, ReportUninitializedWarning
+from .common import APIError, BasicBot, Detachable, LazyModel, ReportUninitializedWarning
+from .instrumentation import traced
 
 if TYPE_CHECKING:
     from . import WTClient
@@ -15,7 +15,7 @@ if TYPE_CHECKING:
 warnings.filterwarnings('always', category=ReportUninitializedWarning)
 
 
-class BasicReportDetail(BaseModel):
+class BasicReportDetail(LazyModel):
     total_trades: Optional[int]
     winning_trades: Optional[int]
     losing_trades: Optional[int]
@@ -35,7 +35,7 @@ class BotReportDetail(BasicBot, BasicReportDetail):
     total_profit: float
 
 
-class ResultByDay(BaseModel):
+class ResultByDay(LazyModel):
     date: date
     current_drawdown_dollars: float
     current_drawdown_percent: float
@@ -48,6 +48,83 @@ class ResultByDay(BaseModel):
     underlying_total_return_percent: float
 
 
+class DailyResults(Sequence):
+    """
+    Daily results of a report stored column by column in typed arrays (dates as ordinals) instead of one ResultByDay model per day, which takes a fraction of the memory and skips per day validation.
+    Behaves like a read only list of ResultByDay; each item is built on access. Use column() for whole columns without building any models.
+    """
+    _typecodes = {float: 'd', int: 'q', date: 'i'}
+    fields: tuple[str, ...] = tuple(ResultByDay.model_fields)  #: column names, in the order of ResultByDay fields
+    _columns_spec: tuple[tuple[str, type], ...] = tuple((name, field.annotation) for name, field in ResultByDay.model_fields.items())
+
+    def __init__(self, columns: dict[str, array]):
+        self._columns = columns
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> 'DailyResults':
+        """Build from the raw days of a report payload. If any record has unexpected types, all records are validated through ResultByDay instead, raising its ValidationError if invalid."""
+        try:
+            columns = {name: cls._column(kind, [record[name] for record in records]) for name, kind in cls._columns_spec}
+        except (KeyError, TypeError, ValueError, OverflowError):
+            days = [ResultByDay.model_validate(record) for record in records]
+            columns = {name: cls._column(kind, [getattr(day, name) for day in days]) for name, kind in cls._columns_spec}
+        return cls(columns)
+
+    @classmethod
+    def _column(cls, kind: type, values: list) -> array:
+        if kind is date:
+            values = [(v if isinstance(v, date) else date.fromisoformat(v[:10])).toordinal() for v in values]
+        return array(cls._typecodes[kind], values)
+
+    def column(self, name: str) -> Union[array, list[date]]:
+        """
+        All values of one field, e.g. column('profit').
+
+        :return: typed array of the values, or a list of date for the date column
+        """
+        if name == 'date':
+            return self.dates
+        return self._columns[name]
+
+    @property
+    def dates(self) -> list[date]:
+        return [date.fromordinal(d) for d in self._columns['date']]
+
+    @property
+    def ordinals(self) -> array:
+        """Dates as proleptic Gregorian ordinals (date.toordinal()), without converting them to date objects"""
+        return self._columns['date']
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the column buffers in bytes"""
+        return sum(c.itemsize * len(c) for c in self._columns.values())
+
+    def _build(self, i: int) -> ResultByDay:
+        values = {name: self._columns[name][i] for name in self.fields}
+        values['date'] = date.fromordinal(values['date'])
+        return ResultByDay.model_construct(**values)
+
+    def __len__(self) -> int:
+        return len(self._columns['date'])
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[ResultByDay, list[ResultByDay]]:
+        if isinstance(i, slice):
+            return [self._build(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('DailyResults index out of range')
+        return self._build(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._build(i)
+
+    def __repr__(self):
+        return f'<DailyResults days={len(self)} bytes={self.nbytes}>'
+
+
 class ResultByTimeframe(BasicReportDetail):
     date: date
     starting_net_liquidation_value: float
@@ -97,10 +174,10 @@ class Results(BasicReportDetail):
     underlying_annualized_volatility: float
     bots: list[BotReportDetail] = None
     years: dict[int, ResultByYear] = None
-    days: list[ResultByDay] = None
+    days: list[ResultByDay] = None  #: a DailyResults when parsed with parse_report()
 
 
-class ReportResponse(BaseModel):
+class ReportResponse(LazyModel):
     number: str
     name: str
     status: Literal['Complete', 'Running', 'Draft']
@@ -120,7 +197,24 @@ class ReportResponse(BaseModel):
     results: Results
 
 
-class Report:
+def parse_report(report_data: dict) -> ReportResponse:
+    """
+    Validate a raw report payload, storing its daily results in a DailyResults instead of validating one ResultByDay per day.
+    The days list of the payload is replaced in place by the DailyResults, so the raw day records can be freed and parsing the same payload again reuses it.
+    """
+    results = report_data.get('results')
+    days = None
+    if isinstance(results, dict) and results.get('days') is not None:
+        days = results['days']
+        if not isinstance(days, DailyResults):
+            days = results['days'] = DailyResults.from_records(days)
+        report_data = {**report_data, 'results': {k: v for k, v in results.items() if k != 'days'}}
+    response = ReportResponse(**report_data)
+    response.results.days = days
+    return response
+
+
+class Report(Detachable):
     def __init__(self, data: ReportResponse, client: 'WTClient', auto_refresh: bool):
         self._ReportResponse: ReportResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
@@ -144,14 +238,15 @@ class Report:
         self.bot_position_tags: List[Optional[str]] = data.bot_position_tags  #: Bot position tags
         self.results: Results = data.results  #: Results
 
-        #: Daily results for this report
+        #: Daily results for this report, a DailyResults if parsed by the client. None unless the report was fetched with details.
         #: Auth Required: Read Reports
-        self.daily_results: List[ResultByDay] = data.results.days
+        self.daily_results: Sequence[ResultByDay] = data.results.days
 
         self._monthly_results: Optional[Dict[date, ResultByTimeframe]] = None
         self._yearly_results: Optional[Dict[date, ResultByTimeframe]] = None
 
     @property
+    @traced
     def monthly_results(self) -> Optional[dict[date, ResultByTimeframe]]:
         """
         Monthly results for this report
@@ -160,7 +255,7 @@ class Report:
         :return: Monthly results for this report in a dictionary with date as key and ResultByTimeframe as value
         """
         if self.auto_refresh:
-            self.client.get_report(self.number)
+            self._sync(self.client.get_report(self.number))
         elif self._monthly_results is None:
             warnings.warn(f'Monthly results are not initialized yet for report {self.number} as you have turned off auto refresh. Please run client.get_report({self.number}) or turn on auto refresh to access it.', ReportUninitializedWarning)
         if self.auto_refresh or (self._monthly_results is None and self.results.years is not None):  # if previously uninitialized and now we have the raw data, initialize it. If auto refresh is on, reinitialize anyways
@@ -172,6 +267,7 @@ class Report:
         return self._monthly_results
 
     @property
+    @traced
     def yearly_results(self) -> Optional[dict[date, ResultByTimeframe]]:
         """
         Yearly results for this report
@@ -180,7 +276,7 @@ class Report:
         :return: Yearly results for this report in a dictionary with date as key and ResultByTimeframe as value
         """
         if self.auto_refresh:
-            self.client.get_report(self.number)
+            self._sync(self.client.get_report(self.number))
         elif self._yearly_results is None:
             warnings.warn(f'Yearly results are not initialized yet for report {self.number} as you have turned off auto refresh. Please run client.get_report({self.number}) or turn on auto refresh to access it.', ReportUninitializedWarning)
         if self.auto_refresh or (self._yearly_results is None and self.results.years is not None):  # if previously uninitialized and now we have the raw data, initialize it. If auto refresh is on, reinitialize anyways
@@ -191,6 +287,7 @@ class Report:
             self._yearly_results = r
         return self._yearly_results
 
+    @traced
     def update(self, name: str = None, start_date: date = None, end_date: date = None, run_until_latest_date: bool = None) -> str:
         """
         Change a bot report name or date range
@@ -215,20 +312,19 @@ class Report:
             payload['end_date'] = end_date.isoformat()
         if run_until_latest_date is not None:
             payload['run_until_latest_date'] = run_until_latest_date
-        response = self.client.session.put(f"{self.client.endpoint}bots/reports/{self.number}", headers=self.client.headers, json=payload)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/reports/{number}', json=payload, number=self.number)
         if response.success:
             return response.message
         else:
             raise APIError(response.message)
 
+    @traced
     def run(self):
         """
         Run/refresh this report using its current configuration
         Auth Required: Write Reports
         """
-        response = self.client.session.put(f"{self.client.endpoint}bots/reports/{self.number}/run", headers=self.client.headers)
-        response = BaseResponse(**orjson.loads(response.text))
+        response = self.client._request('PUT', 'bots/reports/{number}/run', number=self.number)
         if response.success:
             return response.message
         else:
@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+import warnings
+from collections import deque
+from concurrent.futures import Future, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Literal, Optional, TYPE_CHECKING, Union
+
+import orjson
+
+from .common import APIError
+from .instrumentation import trigger
+
+if TYPE_CHECKING:
+    from . import WTClient
+    from .report import Report
+
+CLOCK_SKEW = timedelta(seconds=60)  # a report completed up to this long before the local start time still counts as this run, in case the local clock is ahead
+
+
+class ReportJob:
+    """One queued or running report run of a ReportJobManager."""
+
+    def __init__(self, number: str, changes: dict = None, callback: Callable[['Report'], None] = None):
+        self.number: str = number  #: Report number
+        self.changes: dict = changes or {}  #: arguments of Report.update() applied before running, e.g. start_date
+        self.status: Literal['QUEUED', 'RUNNING', 'COMPLETE', 'FAILED'] = 'QUEUED'  #: job status
+        self.future: Future = Future()  #: resolved with the finished Report, or the exception that failed the job
+        self.callback: Optional[Callable[['Report'], None]] = callback
+        self.queued_at: datetime = datetime.now(timezone.utc)  #: UTC time the job was submitted
+        self.started_at: Optional[datetime] = None  #: UTC time the run request was sent
+        self.finished_at: Optional[datetime] = None  #: UTC time the job was seen finished
+        self.seen_running: bool = False  #: if the report was listed as Running since started_at
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('COMPLETE', 'FAILED')
+
+    def _finished(self, status: str, completed_at: Optional[str]) -> bool:
+        """If the listed status and completion time of the report show that this run is over"""
+        if status == 'Running':
+            self.seen_running = True
+            return False
+        if self.seen_running:
+            return True
+        if completed_at is None:
+            return False
+        completed = datetime.fromisoformat(completed_at.replace('Z', '+00:00'))  # the list is not validated into models, see ReportJobManager.poll()
+        return (completed if completed.tzinfo is not None else completed.replace(tzinfo=timezone.utc)) >= self.started_at - CLOCK_SKEW
+
+    def _state(self) -> dict:
+        return {'number': self.number, 'changes': self.changes, 'status': self.status, 'queued_at': self.queued_at, 'started_at': self.started_at, 'seen_running': self.seen_running}
+
+    @classmethod
+    def _from_state(cls, state: dict) -> 'ReportJob':
+        changes = {k: date.fromisoformat(v) if k in ('start_date', 'end_date') and v else v for k, v in state['changes'].items()}
+        job = cls(state['number'], changes)
+        job.status = state['status']
+        job.queued_at = datetime.fromisoformat(state['queued_at'])
+        job.started_at = datetime.fromisoformat(state['started_at']) if state['started_at'] else None
+        job.seen_running = state['seen_running']
+        return job
+
+    def __repr__(self):
+        return f'<ReportJob {self.number} {self.status}>'
+
+
+class ReportJobManager:
+    """
+    Runs many reports with at most max_concurrent of them running at a time, so that the backtest service is not flooded, and resolves a Future with each finished Report.
+    Running reports are polled together with one bots/reports list request per tick, and only a finished report is fetched with its details. Jobs run on a background thread (start() or use as a context manager), or call step() from your own loop.
+    If state_path is given, queued and running jobs are saved to it after every change and loaded again on creation, so that a restarted process resumes monitoring the runs it started and runs the reports still queued. Callbacks and futures are not saved: pass callback to the manager to handle jobs resumed this way.
+
+    :param client: WTClient to run reports with
+    :param max_concurrent: Optional, maximum number of reports running at a time, defaults to 2.
+    :param poll_interval: Optional, seconds between polls of the running reports, defaults to 15.
+    :param state_path: Optional, file to persist jobs to. Defaults to None, jobs are lost when the process exits.
+    :param callback: Optional, called with each finished Report on the polling thread, in addition to the callback of its job.
+    """
+
+    def __init__(self, client: 'WTClient', max_concurrent: int = 2, poll_interval: float = 15.0, state_path: Union[str, os.PathLike] = None,
+                 callback: Callable[['Report'], None] = None):
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be at least 1, got {max_concurrent}")
+        self.client = client
+        self.max_concurrent = max_concurrent
+        self.poll_interval = poll_interval
+        self.state_path = state_path
+        self.callback = callback
+        self.polls: int = 0  #: list requests sent to poll running reports
+        self._queue: deque[ReportJob] = deque()
+        self._running: dict[str, ReportJob] = {}  # report number -> job
+        self._fetching: set[str] = set()  # numbers of running jobs whose finished report is being fetched by poll()
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if state_path is not None:
+            self._load()
+
+    @property
+    def jobs(self) -> list[ReportJob]:
+        """Running jobs, then queued jobs in the order they will start"""
+        with self._lock:
+            return [*self._running.values(), *self._queue]
+
+    def submit(self, report: Union['Report', str], callback: Callable[['Report'], None] = None, **changes) -> Future:
+        """
+        Queue a run of a report. It starts as soon as fewer than max_concurrent reports are running and no earlier job of the same report is.
+        Auth Required: Write Reports, Read Reports
+
+        :param report: Report object or report number
+        :param callback: Optional, called with the finished Report on the polling thread.
+        :param changes: Optional, arguments of Report.update() (name, start_date, end_date, run_until_latest_date) to apply right before running.
+        :return: Future resolved with the finished Report, with its details
+        """
+        job = ReportJob(report if isinstance(report, str) else report.number, changes, callback)
+        with self._lock:
+            self._queue.append(job)
+            self._save()
+        self._wake.set()
+        return job.future
+
+    def _report(self, number: str) -> 'Report':
+        report = dict.get(self.client._reports, number)  # plain dict lookup, as UpdatingDict refreshes on item access
+        if report is None:
+            self.client.get_reports()
+            report = dict.__getitem__(self.client._reports, number)
+        return report
+
+    def _start(self, job: ReportJob):
+        try:
+            with trigger('ReportJobManager'):
+                report = self._report(job.number)
+                if job.changes:
+                    report.update(**job.changes)
+                job.started_at = datetime.now(timezone.utc)
+                report.run()
+        except Exception as e:
+            self._finish(job, error=e)
+            return
+        job.status = 'RUNNING'
+        self._running[job.number] = job
+
+    def _finish(self, job: ReportJob, report: 'Report' = None, error: Exception = None):
+        job.status = 'FAILED' if error is not None else 'COMPLETE'
+        job.finished_at = datetime.now(timezone.utc)
+        self._running.pop(job.number, None)
+        if error is not None:
+            job.future.set_exception(error)
+            return
+        job.future.set_result(report)
+        for callback in (job.callback, self.callback):
+            if callback is not None:
+                try:
+                    callback(report)
+                except Exception as e:
+                    warnings.warn(f"Callback for report {job.number} failed: {e!r}")
+
+    def poll(self):
+        """List the reports once and finish the running jobs whose report is no longer running. Each finished report is then fetched with its details, without holding the lock of the manager."""
+        with self._lock:
+            if not self._running:
+                return
+        with trigger('ReportJobManager'):
+            response = self.client._request('GET', 'bots/reports/{number}', number='')
+        self.polls += 1
+        if not response.success:
+            raise APIError(response.message)
+        listed = {item['number']: item for item in response.data}  # only status and completion time are needed, so the list is not validated into models
+        with self._lock:
+            finished = []
+            for number, job in list(self._running.items()):
+                if number in self._fetching:  # finished, fetched by another poll() right now
+                    continue
+                item = listed.get(number)
+                if item is None:
+                    self._finish(job, error=APIError(f"Report {number} no longer exists"))
+                elif job._finished(item['status'], item.get('completed_at')):
+                    finished.append((job, item['status']))
+                    self._fetching.add(number)
+            if not finished:
+                self._save()
+                return
+        try:
+            for job, status in finished:  # still counted as running, so that no new run of the same report starts before its result is fetched
+                try:
+                    with trigger('ReportJobManager'):
+                        report = self.client.get_report(job.number)
+                except Exception as e:
+                    error = e
+                else:
+                    error = None if status == 'Complete' else APIError(f"Report {job.number} stopped with status {status}")
+                with self._lock:
+                    self._finish(job, report if error is None else None, error)
+                    self._fetching.discard(job.number)
+        finally:
+            with self._lock:
+                self._fetching.difference_update(job.number for job, _ in finished if not job.done)  # if interrupted
+                self._save()
+
+    def _start_queued(self):
+        with self._lock:
+            started = False
+            for job in list(self._queue):
+                if len(self._running) >= self.max_concurrent:
+                    break
+                if job.number in self._running:  # the same report can only run once at a time
+                    continue
+                self._queue.remove(job)
+                self._start(job)
+                started = True
+            if started:
+                self._save()
+
+    def step(self) -> bool:
+        """Poll the running reports, then start queued ones up to max_concurrent. Returns whether any job is left."""
+        self.poll()
+        self._start_queued()
+        with self._lock:
+            return bool(self._running or self._queue)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Run or wait for the background thread until every job submitted so far is done.
+
+        :param timeout: Optional, maximum seconds to wait.
+        :return: True if all jobs are done, False if the timeout expired
+        """
+        futures = [job.future for job in self.jobs]
+        if self._thread is not None:
+            return not wait(futures, timeout).not_done
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._start_queued()
+        while self.jobs:
+            if deadline is not None and time.monotonic() + self.poll_interval > deadline:
+                return all(f.done() for f in futures)
+            time.sleep(self.poll_interval)
+            self.step()
+        return True
+
+    def _save(self):
+        if self.state_path is None:
+            return
+        content = orjson.dumps({'version': 1, 'jobs': [job._state() for job in self.jobs]})
+        temp = f'{os.fspath(self.state_path)}.{os.getpid()}.tmp'
+        with open(os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            f.write(content)
+        os.replace(temp, self.state_path)
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'rb') as f:
+                saved = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return
+        if not isinstance(saved, dict) or saved.get('version') != 1:
+            return
+        for state in saved['jobs']:
+            job = ReportJob._from_state(state)
+            if job.status == 'RUNNING':
+                self._running[job.number] = job
+            else:
+                self._queue.append(job)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='whispertrades-report-jobs', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the background thread. Jobs are kept, and resumed by start() or, with state_path, by a new manager."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.step()
+            except Exception as e:
+                warnings.warn(f"Polling reports failed, retrying in {self.poll_interval}s: {e!r}")
+            with self._lock:
+                idle = not self._running
+            if idle:
+                self._wake.wait()  # until a job is submitted
+            else:
+                self._stop.wait(self.poll_interval)
+
+    def __enter__(self) -> 'ReportJobManager':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __repr__(self):
+        with self._lock:
+            return f'<ReportJobManager running={len(self._running)}/{self.max_concurrent} queued={len(self._queue)} polls={self.polls}>'
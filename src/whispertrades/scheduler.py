@@ -0,0 +1,241 @@
+import heapq
+import threading
+import time
+import warnings
+from collections import deque
+from datetime import date
+from typing import Callable, Optional, TYPE_CHECKING
+
+from .instrumentation import trigger
+from .refresher import request_budget
+
+if TYPE_CHECKING:
+    from . import WTClient
+    from .bot import ExitCondition
+    from .position import Position, PositionResponse
+
+
+def _percent(value: Optional[str]) -> Optional[float]:
+    """Parse an exit condition percentage such as "50" or "50%", None if absent or not a number"""
+    if value is None:
+        return None
+    try:
+        return abs(float(str(value).strip().rstrip('%')))
+    except ValueError:
+        return None
+
+
+class PositionRefreshScheduler:
+    """
+    Refreshes open positions individually, each at its own interval, so that a fixed share of the rate limit is spent on the positions most at risk.
+    The interval of a position starts from its days to expiration (of the nearest open leg): min_interval * (1 + DTE)², e.g. 15s on expiration day, 1 minute the day before, 4 minutes at 3 DTE, capped at max_interval. It is then shortened in proportion to how close the position is to an exit threshold of its bot's ExitCondition (profit target, stop loss or delta stop): at half the distance it is refreshed twice as often, and at or past a threshold every min_interval.
+    Refreshes run on a background thread within budget_share of the rate limit. If the budget cannot sustain every interval, positions are refreshed in order of due time, so short intervals still come first. The set of open positions is reloaded every discovery_interval seconds. Refreshed positions are recorded in the client's mark_store like any other refresh.
+
+    :param client: WTClient to refresh positions of
+    :param min_interval: Optional, shortest interval in seconds, defaults to 15.
+    :param max_interval: Optional, longest interval in seconds, defaults to 1800.
+    :param budget_share: Optional, fraction of the client's rate limit (client.rate_limiter.limit) that the scheduler may use, defaults to 0.5.
+    :param discovery_interval: Optional, seconds between reloads of the list of open positions, defaults to 300.
+    :param callback: Optional, called with each refreshed Position on the scheduler thread, e.g. to check custom exit rules.
+    """
+
+    def __init__(self, client: 'WTClient', min_interval: float = 15.0, max_interval: float = 1800.0, budget_share: float = 0.5, discovery_interval: float = 300.0,
+                 callback: Callable[['Position'], None] = None):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError(f"Intervals must satisfy 0 < min_interval <= max_interval, got {min_interval} and {max_interval}")
+        if not 0 < budget_share <= 1:
+            raise ValueError(f"budget_share must be between 0 and 1, got {budget_share}")
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.discovery_interval = discovery_interval
+        self.callback = callback
+        self.budget_share: float = budget_share
+        self.intervals: dict[str, float] = {}  #: current refresh interval in seconds of each scheduled position
+        self.refreshes: int = 0  #: number of position refreshes sent
+        self.errors: dict[str, Exception] = {}  #: last error raised while refreshing each position, cleared on success
+        self._due: dict[str, float] = {}  # position number -> monotonic due time
+        self._heap: list[tuple[float, str]] = []  # (due, number), entries not matching _due are outdated
+        self._sent: deque[float] = deque()
+        self._next_discovery: float = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def budget(self) -> int:
+        """Maximum scheduler requests per rolling rate limiter window, budget_share of the current limit of the client's rate limiter"""
+        return request_budget(self.client, self.budget_share)
+
+    def _exit_condition(self, data: 'PositionResponse') -> Optional['ExitCondition']:
+        bot = self.client._bots.get(data.bot.number)
+        if bot is None or not bot.details_loaded:
+            return None  # loaded in bulk by discover(), never one request per bot here
+        return bot.exit_condition
+
+    def days_to_expiration(self, data: 'PositionResponse') -> Optional[int]:
+        """Days until the nearest expiration among the open legs of a position, None if it has no open legs"""
+        today = date.today()
+        days = [(leg.expiration_date - today).days for leg in data.legs if leg.quantity_open]
+        return max(0, min(days)) if days else None
+
+    def threshold_distance(self, data: 'PositionResponse', exit_condition: Optional['ExitCondition']) -> float:
+        """
+        Relative distance of a position to the nearest exit threshold of its bot: 1 or more when far or without thresholds, 0 at or past one.
+        Profit target and stop loss are compared with current_profit as percentages, the delta stop with the absolute current_delta.
+        """
+        if exit_condition is None:
+            return 1.0
+        distances = [1.0]
+        profit = data.current_profit
+        if profit is not None:
+            target = _percent(exit_condition.profit_target_percent)
+            if target:
+                distances.append((target - profit) / target)
+            stop = _percent(exit_condition.stop_loss_percent)
+            if stop:
+                distances.append((stop + profit) / stop)  # losses are negative profit
+        if exit_condition.delta_stop and data.current_delta is not None:
+            distances.append((abs(exit_condition.delta_stop) - abs(data.current_delta)) / abs(exit_condition.delta_stop))
+        return max(0.0, min(distances))
+
+    def interval(self, position: 'Position') -> Optional[float]:
+        """Refresh interval in seconds of a position, None if it no longer needs refreshing (closed). Override to customize the policy."""
+        data = position._PositionResponse  # the response model, as attribute access on Position may trigger a refresh
+        if data.status != 'OPEN':
+            return None
+        dte = self.days_to_expiration(data)
+        base = self.max_interval if dte is None else self.min_interval * (1 + dte) ** 2
+        interval = base * self.threshold_distance(data, self._exit_condition(data))
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _schedule(self, position: 'Position', now: float):
+        interval = self.interval(position)
+        with self._lock:
+            if interval is None:
+                self._due.pop(position.number, None)
+                self.intervals.pop(position.number, None)
+                return
+            due = now + interval
+            if position.number in self._due and self._due[position.number] <= due:  # keep an earlier due time e.g. after discovery
+                due = self._due[position.number]
+            self._due[position.number] = due
+            self.intervals[position.number] = interval
+            heapq.heappush(self._heap, (due, position.number))
+
+    def discover(self):
+        """Reload the open positions, load the exit conditions of their bots in one request, and schedule positions not yet scheduled. Called automatically every discovery_interval."""
+        with trigger('PositionRefreshScheduler'):
+            self._spend(1)
+            positions = [p for p in self.client.get_positions(status='OPEN').values() if p._PositionResponse.status == 'OPEN']
+            bots = {p._PositionResponse.bot.number for p in positions}
+            missing = [b for b in bots if b not in self.client._bots or not self.client._bots[b].details_loaded]
+            if missing:
+                self._spend(1)
+                self.client.prefetch_details(missing)
+        now = time.monotonic()
+        for position in positions:
+            if position.number not in self._due:
+                self._schedule(position, now)
+        self._next_discovery = now + self.discovery_interval
+
+    def _spend(self, requests: int):
+        self._sent.extend([time.monotonic()] * requests)
+
+    def _budget_wait(self) -> float:
+        now = time.monotonic()
+        window = self.client.rate_limiter.window
+        while self._sent and now - self._sent[0] >= window:
+            self._sent.popleft()
+        budget = self.budget  # follows the limit reported by the server
+        if len(self._sent) < budget:
+            return 0.0
+        return window - (now - self._sent[len(self._sent) - budget])
+
+    def _next(self) -> Optional[tuple[float, str]]:
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0] if self._heap else None
+
+    def refresh(self, number: str):
+        """Refresh one position now and reschedule it"""
+        with self._lock:
+            self._due.pop(number, None)
+        self._spend(1)
+        try:
+            with trigger('PositionRefreshScheduler'):
+                position = self.client.get_position(number)
+        except Exception as e:
+            self.errors[number] = e
+            with self._lock:
+                interval = self.intervals.get(number, self.min_interval)
+                self._due[number] = time.monotonic() + interval
+                heapq.heappush(self._heap, (self._due[number], number))
+            raise
+        self.refreshes += 1
+        self.errors.pop(number, None)
+        self._schedule(position, time.monotonic())
+        if self.callback is not None:
+            self.callback(position)
+
+    def step(self) -> float:
+        """
+        Run the discovery or refresh that is due, if the budget allows. Used by the background thread, or call it from your own loop instead of start().
+
+        :return: seconds until something is due
+        """
+        now = time.monotonic()
+        wait = self._budget_wait()
+        if wait > 0:
+            return wait
+        if now >= self._next_discovery:
+            self.discover()
+            return 0.0
+        head = self._next()
+        if head is None:
+            return self._next_discovery - now
+        due, number = head
+        if due > now:
+            return min(due, self._next_discovery) - now
+        self.refresh(number)
+        return 0.0
+
+    def due_in(self) -> dict[str, float]:
+        """Seconds until the next refresh of each scheduled position, soonest first"""
+        now = time.monotonic()
+        with self._lock:
+            return dict(sorted(((number, max(0.0, due - now)) for number, due in self._due.items()), key=lambda item: item[1]))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='whispertrades-position-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.step()
+            except Exception as e:
+                wait = self.min_interval
+                warnings.warn(f"Scheduled position refresh failed, retrying in {wait}s: {e!r}")
+            if wait > 0:
+                self._stop.wait(min(wait, 1.0))  # re-evaluate regularly, refreshes elsewhere may have changed the data
+
+    def __enter__(self) -> 'PositionRefreshScheduler':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __repr__(self):
+        return f'<PositionRefreshScheduler positions={len(self._due)} running={self._thread is not None} refreshes={self.refreshes}>'
@@ -0,0 +1,250 @@
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional, TYPE_CHECKING, Union
+
+import orjson
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("The position mark store requires numpy. Install it with: pip install whispertrades[analytics]") from e
+
+if TYPE_CHECKING:
+    from .position import Position, PositionResponse
+
+#: Layout of one mark record. leg is the index into Position.legs, or -1 for the mark of the whole position. Missing values are NaN.
+MARK_DTYPE = np.dtype([('timestamp', '<f8'), ('position', '<i4'), ('leg', '<i4'), ('bid', '<f8'), ('mid', '<f8'), ('ask', '<f8'), ('profit', '<f8'), ('delta', '<f8')])
+MARK_FIELDS = ('bid', 'mid', 'ask', 'profit', 'delta')
+POSITION_LEG = -1
+
+
+class PositionMarkStore:
+    """
+    Append-only time series of live position marks (current bid, mid, ask, profit and delta of a position and each of its legs), so that intraday history survives refreshes.
+    Marks are stored as fixed size binary records in one segment file per UTC day (marks-YYYY-MM-DD.bin), read back through memory mapped numpy arrays. Position numbers are mapped to integer ids in a sidecar index (index.jsonl) that also lists the instruments of the legs.
+    Pass it to WTClient(mark_store=...) to record every open position on each refresh, or call record() directly. Only one process should write to a directory at a time.
+
+    :param directory: directory of the store, created if missing. Existing data is kept and appended to.
+    :param legs: Optional, defaults to True. If False, only the position level mark is recorded.
+    :param dedupe: Optional, defaults to True. Skip marks identical to the previous one of the same position and leg, so series hold only changes. Set to False to record every refresh, e.g. to sample at fixed intervals.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], legs: bool = True, dedupe: bool = True):
+        self.directory = os.fspath(directory)
+        self.legs = legs
+        self.dedupe = dedupe
+        os.makedirs(self.directory, exist_ok=True)
+        self._ids: dict[str, int] = {}
+        self._index: dict[int, dict] = {}  # id -> latest index entry
+        self._last: dict[tuple[int, int], tuple] = {}  # (position id, leg) -> last recorded values, for dedupe
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_day: Optional[str] = None
+        self._last_timestamp: float = -math.inf
+        self._load_index()
+        segments = self._segments(None, None)
+        if segments and os.path.getsize(segments[-1]) >= MARK_DTYPE.itemsize:
+            with open(segments[-1], 'rb') as f:
+                f.seek((os.path.getsize(segments[-1]) // MARK_DTYPE.itemsize - 1) * MARK_DTYPE.itemsize)
+                self._last_timestamp = float(np.frombuffer(f.read(MARK_DTYPE.itemsize), dtype=MARK_DTYPE)['timestamp'][0])
+
+    def _load_index(self):
+        path = os.path.join(self.directory, 'index.jsonl')
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    entry = orjson.loads(line)
+                    self._ids[entry['position']] = entry['id']
+                    self._index[entry['id']] = entry
+
+    def _position_id(self, position: 'PositionResponse') -> int:
+        legs = [leg.instrument for leg in position.legs]
+        position_id = self._ids.get(position.number)
+        if position_id is not None and self._index[position_id]['legs'] == legs:
+            return position_id
+        if position_id is None:
+            position_id = len(self._ids)
+            self._ids[position.number] = position_id
+        entry = {'id': position_id, 'position': position.number, 'bot': position.bot.number, 'symbol': position.symbol, 'legs': legs}
+        self._index[position_id] = entry
+        with open(os.path.join(self.directory, 'index.jsonl'), 'ab') as f:
+            f.write(orjson.dumps(entry) + b'\n')
+        return position_id
+
+    @staticmethod
+    def _day(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.directory, f'marks-{day}.bin')
+
+    def _write(self, records: np.ndarray, timestamp: float):
+        day = self._day(timestamp)
+        if self._file is None or self._file_day != day:
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self._segment_path(day), 'ab')
+            self._file_day = day
+        self._file.write(records.tobytes())
+        self._file.flush()
+
+    @staticmethod
+    def _value(value: Optional[float]) -> float:
+        return math.nan if value is None else value
+
+    @staticmethod
+    def _same(a: tuple, b: tuple) -> bool:
+        return all(x == y or (x != x and y != y) for x, y in zip(a, b))  # NaN equals NaN here
+
+    def record(self, positions: Union['Position', Iterable['Position']], timestamp: float = None) -> int:
+        """
+        Append the current marks of one or more positions. Closed positions are skipped.
+        Reads the values already cached on the positions and never refreshes them.
+
+        :param positions: a Position, or any iterable of them e.g. client.positions.values()
+        :param timestamp: Optional, unix timestamp of the marks, defaults to now. Must not be earlier than the previous record, as queries rely on records being in time order.
+        :return: number of records written
+        """
+        from .position import Position
+        positions = [positions] if isinstance(positions, Position) else list(positions)  # any iterable, e.g. client.positions.values() or a generator
+        rows = []
+        with self._lock:
+            if timestamp is None:
+                timestamp = max(time.time(), self._last_timestamp)  # the wall clock may step back
+            elif timestamp < self._last_timestamp:
+                raise ValueError(f"Timestamp {timestamp} is earlier than the last recorded mark at {self._last_timestamp}")
+            for position in positions:
+                data = position._PositionResponse  # the response model, as attribute access on Position may trigger a refresh
+                if data.status != 'OPEN':
+                    continue
+                position_id = self._position_id(data)
+                marks = [(POSITION_LEG, data)]
+                if self.legs:
+                    marks.extend(enumerate(data.legs))
+                for leg, source in marks:
+                    values = (self._value(source.current_bid), self._value(source.current_mid), self._value(source.current_ask), self._value(source.current_profit), self._value(source.current_delta))
+                    key = (position_id, leg)
+                    if self.dedupe and key in self._last and self._same(self._last[key], values):
+                        continue
+                    self._last[key] = values
+                    rows.append((timestamp, position_id, leg) + values)
+            if rows:
+                self._write(np.array(rows, dtype=MARK_DTYPE), timestamp)
+                self._last_timestamp = timestamp
+        return len(rows)
+
+    def _segments(self, start: Optional[float], end: Optional[float]) -> list[str]:
+        first = self._day(start) if start is not None else None
+        last = self._day(end) if end is not None else None
+        days = sorted(name[6:-4] for name in os.listdir(self.directory) if name.startswith('marks-') and name.endswith('.bin'))
+        return [self._segment_path(d) for d in days if (first is None or d >= first) and (last is None or d <= last)]
+
+    @staticmethod
+    def _timestamp(value: Union[datetime, date, float, None]) -> Optional[float]:
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        return value.timestamp()
+
+    def query(self, position: Union['Position', str] = None, start: Union[datetime, date, float] = None, end: Union[datetime, date, float] = None, leg: Optional[int] = POSITION_LEG) -> np.ndarray:
+        """
+        Marks recorded in a time range, oldest first.
+
+        :param position: Optional, Position or position number. Defaults to all positions.
+        :param start: Optional, datetime (naive means local time), date (UTC midnight) or unix timestamp, inclusive. Defaults to the first record.
+        :param end: Optional, same types as start, exclusive. Defaults to the last record.
+        :param leg: Optional, index into Position.legs. Defaults to -1, the mark of the whole position. None returns all legs and the position mark.
+        :return: structured array with MARK_DTYPE fields (timestamp, position id, leg, bid, mid, ask, profit, delta)
+        """
+        start, end = self._timestamp(start), self._timestamp(end)
+        position_id = None
+        if position is not None:
+            number = position if isinstance(position, str) else position.number
+            if number not in self._ids:
+                return np.empty(0, dtype=MARK_DTYPE)
+            position_id = self._ids[number]
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            paths = self._segments(start, end)
+        parts = []
+        for path in paths:
+            if os.path.getsize(path) < MARK_DTYPE.itemsize:
+                continue
+            marks = np.memmap(path, dtype=MARK_DTYPE, mode='r', shape=(os.path.getsize(path) // MARK_DTYPE.itemsize,))
+            times = marks['timestamp']
+            lo = 0 if start is None else np.searchsorted(times, start, side='left')
+            hi = len(marks) if end is None else np.searchsorted(times, end, side='left')
+            selected = marks[lo:hi]
+            mask = np.ones(len(selected), dtype=bool)
+            if position_id is not None:
+                mask &= selected['position'] == position_id
+            if leg is not None:
+                mask &= selected['leg'] == leg
+            parts.append(np.array(selected[mask]))  # copy, so the memory map can be released
+            del marks
+        return np.concatenate(parts) if parts else np.empty(0, dtype=MARK_DTYPE)
+
+    def curve(self, position: Union['Position', str], field: str = 'profit', start: Union[datetime, date, float] = None, end: Union[datetime, date, float] = None,
+              leg: int = POSITION_LEG) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Time series of one mark field of a position, e.g. its intraday P&L curve with field='profit'.
+
+        :param field: Optional, one of bid, mid, ask, profit, delta. Defaults to profit.
+        :return: (times as datetime64[ms] in UTC, values)
+        """
+        if field not in MARK_FIELDS:
+            raise ValueError(f"Invalid field: {field}. Valid fields are {MARK_FIELDS}")
+        marks = self.query(position, start, end, leg)
+        return (marks['timestamp'] * 1000).astype('datetime64[ms]'), marks[field]
+
+    def position_info(self, position: Union[int, str]) -> Optional[dict]:
+        """
+        Index entry of a position, by number or by the id stored in records.
+
+        :return: dict with id, position (number), bot (number), symbol and legs (instrument of each leg), or None if never recorded
+        """
+        position_id = self._ids.get(position) if isinstance(position, str) else position
+        return self._index.get(position_id)
+
+    @property
+    def positions(self) -> list[str]:
+        """Numbers of all positions with recorded marks"""
+        return list(self._ids)
+
+    def prune(self, before: Union[datetime, date, float]) -> int:
+        """
+        Delete whole days of marks older than the UTC day of before. The index is kept.
+
+        :return: number of segment files deleted
+        """
+        first_kept = self._day(self._timestamp(before))
+        with self._lock:
+            paths = [p for p in self._segments(None, None) if os.path.basename(p)[6:-4] < first_kept]
+            for path in paths:
+                if self._file is not None and self._file.name == path:
+                    self._file.close()
+                    self._file = None
+                os.remove(path)
+        return len(paths)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> 'PositionMarkStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f'<PositionMarkStore directory={self.directory} positions={len(self._ids)}>'
@@ -0,0 +1,54 @@
+from typing import Optional, Union
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+class TransportConfig:
+    """
+    HTTP transport settings of a WTClient. The defaults suit many small requests to a single host: one pool of reused keep-alive connections, compressed responses, and timeouts so that a hung connection cannot stall the client.
+
+    :param pool_maxsize: Optional, maximum number of connections kept open to the API. Defaults to None, enough for the client's thread pool and parallel bootstrap (at least 10).
+    :param keep_alive: Optional, defaults to True, reuse connections between requests. If False, every request opens a new connection.
+    :param connect_timeout: Optional, seconds to wait for a connection to be established, defaults to 5.
+    :param read_timeout: Optional, seconds to wait for the server between bytes of the response, defaults to 30.
+    :param deadline: Optional, maximum total seconds for one API call including rate limiter waits, retries and backoff. Raises requests.exceptions.Timeout when exceeded. Defaults to None, no limit beyond the per attempt timeouts.
+    :param compression: Optional, defaults to True, accept compressed responses (gzip and deflate, plus br and zstd if the brotli or zstandard packages are installed).
+    """
+
+    def __init__(self, pool_maxsize: int = None, keep_alive: bool = True, connect_timeout: Optional[float] = 5.0, read_timeout: Optional[float] = 30.0, deadline: float = None, compression: bool = True):
+        if deadline is not None and deadline <= 0:
+            raise ValueError(f"deadline must be positive, got {deadline}")
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.compression = compression
+
+    @property
+    def timeout(self) -> tuple[Optional[float], Optional[float]]:
+        """(connect, read) timeout passed to requests"""
+        return self.connect_timeout, self.read_timeout
+
+    def pool_size(self, max_workers: int) -> int:
+        """Connection pool size for a client with the given thread pool size"""
+        return self.pool_maxsize or max(10, max_workers + 1)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Request headers implementing these settings"""
+        headers = {'Accept-Encoding': ACCEPT_ENCODING if self.compression else 'identity'}
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        return headers
+
+    def __repr__(self):
+        return (f'<TransportConfig pool_maxsize={self.pool_maxsize} keep_alive={self.keep_alive} timeout={self.timeout} deadline={self.deadline} '
+                f'compression={self.compression}>')
+
+
+def cap_timeout(timeout: Union[None, float, tuple], remaining: float) -> Union[float, tuple]:
+    """Limit a requests timeout, given as seconds or a (connect, read) tuple, to the remaining seconds of a deadline"""
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
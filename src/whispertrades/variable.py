@@ -1,16 +1,17 @@
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING, Union
 
-import orjson
-from pydantic import BaseModel
 
-from .common import APIError, BaseResponse
+from .common import APIError, CircuitOpenError, Detachable, LazyModel
+from .instrumentation import traced, trigger
 
 if TYPE_CHECKING:
     from . import WTClient
 
 
-class BaseVariable(BaseModel):
+class BaseVariable(LazyModel):
     number: str
     name: str
     value: Optional[str]
@@ -18,7 +19,7 @@ class BaseVariable(BaseModel):
     last_updated_at: Optional[datetime] = None
 
 
-class Condition(BaseModel):
+class Condition(LazyModel):
     condition: str
     value: str
 
@@ -28,7 +29,7 @@ class VariableResponse(BaseVariable):
     conditions: list[Optional[Condition]]
 
 
-class Variable:
+class Variable(Detachable):
     def __init__(self, data: VariableResponse, client: 'WTClient', auto_refresh: bool):
         self._VariableResponse: VariableResponse = data  #: raw response data from API
         self.client: 'WTClient' = client  #: the WTClient object that created this instance
@@ -45,6 +46,7 @@ class Variable:
         if data.bot is None:
             self.free_text_value: Optional[str] = data.value  # Variables not associated with bots are always free text
 
+    @traced
     def update(self, name: str = None, value: str = None) -> str:
         """
         Change this variable name or free text value
@@ -66,8 +68,10 @@ class Variable:
             payload['name'] = str(name)
         if value is not None:
             payload['value'] = str(value)
-        response = self.client.session.put(f"{self.client.endpoint}bots/variables/{self.number}", headers=self.client.headers, json=payload)
-        response = BaseResponse(**orjson.loads(response.text))
+        return self._send_update(payload)
+
+    def _send_update(self, payload: dict) -> str:
+        response = self.client._request('PUT', 'bots/variables/{number}', json=payload, number=self.number)
         if response.success:
             self.__init__(VariableResponse(**response.data), self.client, self.auto_refresh)
             return response.message
@@ -78,6 +82,161 @@ class Variable:
         return f'<Variable {self._VariableResponse}>'
 
     def __getattribute__(self, name):
-        if not name.endswith('Response') and name not in ['number', 'bot'] and name in self._VariableResponse.model_fields and self.auto_refresh:
-            self.client.get_variable(self.number)
+        if not name.startswith('_') and not name.endswith('Response') and name not in ['number', 'bot'] and name in self._VariableResponse.model_fields and self.auto_refresh:
+            with trigger(f'Variable.{name}', implicit=True):
+                try:
+                    self._sync(self.client.get_variable(self.number))
+                except CircuitOpenError:  # the API is failing, keep the last known value
+                    pass
         return super().__getattribute__(name)
+
+
+class _PendingWrite:
+    __slots__ = ('variable', 'name', 'value', 'futures')
+
+    def __init__(self, variable: Variable):
+        self.variable: Variable = variable
+        self.name: Optional[str] = None
+        self.value: Optional[str] = None
+        self.futures: list[Future] = []
+
+
+class VariableWriteBuffer:
+    """
+    Buffers updates of variables and sends them in the background, for variables updated at high frequency e.g. by signal generators.
+    Pending updates of the same variable are coalesced, the last name and value win, and updates that would not change the cached variable are dropped without a request. Pending updates are sent every interval seconds while started, and on flush().
+    Each update returns a Future that resolves to the API message once the update (or the update that superseded it) was sent, to None if no request was needed, or to the exception raised by the request.
+    Usable as a context manager, which starts it and flushes on exit.
+
+    :param client: WTClient used to send the updates
+    :param interval: Optional, seconds between automatic flushes while started, defaults to 1.
+    """
+
+    def __init__(self, client: 'WTClient', interval: float = 1.0):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.client = client
+        self.interval = interval
+        self.sent: int = 0  #: number of update requests sent
+        self.coalesced: int = 0  #: number of updates merged into a later update of the same variable
+        self.dropped: int = 0  #: number of updates dropped as they would not change the variable
+        self._pending: dict[str, _PendingWrite] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # updates of one variable must reach the API in order
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _variable(self, variable: Union[Variable, str]) -> Variable:
+        if isinstance(variable, Variable):
+            return variable
+        cached = self.client._variables.get(variable)
+        return cached if cached is not None else self.client.get_variable(variable)
+
+    @staticmethod
+    def _is_noop(variable: Variable, name: Optional[str], value: Optional[str]) -> bool:
+        data = variable._VariableResponse  # the response model, as attribute access on Variable may trigger a refresh
+        return (name is None or name == data.name) and (value is None or value == data.value)
+
+    def update(self, variable: Union[Variable, str], name: str = None, value: str = None) -> Future:
+        """
+        Queue a change of a variable name or free text value, with the same validation as Variable.update().
+
+        :param variable: Variable or variable number
+        :param name: Optional, new name of the variable
+        :param value: Optional, new free text value of the variable, only for variables not associated with a bot
+        :return: Future resolving to the API message once sent, or None if no request was needed
+        """
+        if not name and value is None:
+            raise ValueError('Either name or value are required. Name cannot be empty string.')
+        variable = self._variable(variable)
+        if value is not None and variable._VariableResponse.bot:
+            raise ValueError('You can only update values of variables that are not associated with a bot.')
+        name = str(name) if name else None
+        value = str(value) if value is not None else None
+        future = Future()
+        with self._lock:
+            pending = self._pending.get(variable.number)
+            if pending is None:
+                if self._is_noop(variable, name, value):
+                    self.dropped += 1
+                    future.set_result(None)
+                    return future
+                pending = self._pending[variable.number] = _PendingWrite(variable)
+            else:
+                self.coalesced += 1
+            pending.name = name if name is not None else pending.name
+            pending.value = value if value is not None else pending.value
+            pending.futures.append(future)
+        return future
+
+    @property
+    def pending(self) -> int:
+        """Number of variables with updates waiting to be sent"""
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Send all pending updates now, one request per variable.
+
+        :return: number of requests sent
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            sent = 0
+            for pending in batch.values():
+                futures = [f for f in pending.futures if f.set_running_or_notify_cancel()]
+                if self._is_noop(pending.variable, pending.name, pending.value):  # e.g. changed and changed back before the flush
+                    self.dropped += 1
+                    for future in futures:
+                        future.set_result(None)
+                    continue
+                payload = {'name': pending.name} if pending.name is not None else {}
+                if pending.value is not None:
+                    payload['value'] = pending.value
+                try:
+                    message = pending.variable._send_update(payload)  # already validated, and update() would refresh on attribute access with auto_refresh
+                except Exception as e:
+                    for future in futures:
+                        future.set_exception(e)
+                else:
+                    for future in futures:
+                        future.set_result(message)
+                sent += 1
+            self.sent += sent
+            return sent
+
+    def start(self):
+        """Start flushing every interval seconds on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='whispertrades-variable-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """
+        Stop the background thread.
+
+        :param flush: Optional, defaults to True, send pending updates before returning.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def __enter__(self) -> 'VariableWriteBuffer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __repr__(self):
+        return f'<VariableWriteBuffer pending={len(self._pending)} sent={self.sent} coalesced={self.coalesced} dropped={self.dropped}>'
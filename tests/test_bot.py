@@ -0,0 +1,76 @@
+import pickle
+
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import APIError, WTClient
+from whispertrades.bot import DETAIL_FIELDS
+
+BOT = 'B000000000'
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint)
+    yield client
+    client.close()
+
+
+def test_summary_bots_load_details_on_first_access(server, client):
+    bot = client.get_bots()[BOT]
+    assert not bot.details_loaded
+    assert bot._BotResponse.entry_condition is None
+    requests = server.request_count
+    assert bot.entry_condition.frequency == 'Daily'
+    assert server.request_count == requests + 1
+    assert bot.details_loaded
+    assert bot.exit_condition.delta_stop == 0.5  # validated from the payload already fetched
+    assert bot.adjustments[0].type == 'Roll'
+    assert server.request_count == requests + 1
+
+
+def test_details_load_into_uncached_instance(server, client):
+    bot = pickle.loads(pickle.dumps(client.get_bots()[BOT])).attach(client)
+    assert bot is not client.bots[BOT]
+    assert bot.variables[0].name == 'Variable 0'
+    assert bot.details_loaded
+    assert client.bots[BOT].details_loaded
+    restored = pickle.loads(pickle.dumps(bot))  # details survive the next round trip without a request
+    requests = server.request_count
+    assert restored.notifications[0].event == 'Order Filled'
+    assert server.request_count == requests
+
+
+def test_prefetch_details_loads_all_bots_in_one_request(server, client):
+    client.get_bots()
+    requests = server.request_count
+    bots = client.prefetch_details(validate=True)
+    assert server.request_count == requests + 1
+    assert all(bot.details_loaded and bot._BotResponse.entry_condition is not None for bot in bots.values())
+
+
+@pytest.mark.parametrize('numbers', [['B999999999'], [BOT, 'B999999999', 'B888888888']])
+def test_prefetch_details_reports_unknown_bots(client, numbers):
+    client.get_bots()
+    with pytest.raises(APIError, match='Bots not found: B999999999'):
+        client.prefetch_details(numbers)
+
+
+def test_details_survive_summary_refresh(server, client):
+    bot = client.get_bots()[BOT]
+    client.prefetch_details([BOT, 'B000000001'], validate=True)
+    details = {name: getattr(bot, name) for name in DETAIL_FIELDS}
+    server.account.bots[0]['name'] = 'Renamed'
+    server._cache.clear()
+    assert client.get_bots()[BOT] is bot
+    assert bot.name == 'Renamed'
+    assert bot.details_loaded
+    for name in DETAIL_FIELDS:
+        assert getattr(bot, name) is details[name]
+        assert getattr(bot._BotResponse, name) is details[name]
@@ -0,0 +1,87 @@
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+from requests import Response
+
+from whispertrades import BaseResponse, CircuitBreaker, ResponseCache, WTClient
+
+
+@pytest.fixture(params=[True, False], ids=['etag', 'digest'])
+def server(request):
+    with FakeAPIServer('small', etags=request.param) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, session=UnlimitedSession(), endpoint=server.endpoint, circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60.0))
+    yield client
+    client.close()
+
+
+def list_orders(client: WTClient) -> BaseResponse:
+    return client._request('GET', 'bots/orders/{number}', number='')
+
+
+def test_unchanged_response_reuses_parsed_envelope(server, client):
+    first = list_orders(client)
+    second = list_orders(client)
+    assert not first.cached and not first.stale
+    assert second.cached and not second.stale
+    assert second.data is first.data
+    assert server.not_modified_count == (1 if server.etags else 0)  # without ETags the body is sent again, but its digest matches
+    assert (client.response_cache.hits, client.response_cache.misses) == (1, 1)
+
+
+def test_unchanged_response_keeps_models(client):
+    orders = client.get_orders()
+    models = {number: order._OrderResponse for number, order in orders.items()}
+    assert client.get_orders() is orders
+    assert all(order._OrderResponse is models[number] for number, order in orders.items())
+
+
+def test_changed_response_is_parsed_again(server, client):
+    orders = client.get_orders()
+    number = next(iter(orders))
+    order, model = orders[number], orders[number]._OrderResponse
+    server.account.orders[0]['status'] = 'CANCELED'
+    server._cache.clear()
+    client.get_orders()
+    assert order._OrderResponse is not model
+    assert order._OrderResponse.status == 'CANCELED'
+    assert client.response_cache.misses == 2
+
+
+def test_open_circuit_serves_stale_response(client):
+    first = list_orders(client)
+    client.circuit_breaker.record_failure('orders')
+    stale = list_orders(client)
+    assert stale.cached and stale.stale
+    assert stale.data is first.data
+    assert client.is_stale('orders')
+
+
+def response(status: int, content: bytes) -> Response:
+    r = Response()
+    r.status_code = status
+    r._content = content
+    return r
+
+
+def test_lookup_by_status_and_digest():
+    cache = ResponseCache()
+    url = 'https://api.whispertrades.com/v1/bots/'
+    parsed = BaseResponse(success=True, message='OK', data=[{'number': 'B1'}])
+    cache.store(url, response(200, b'{"data": 1}'), parsed)
+    assert cache.lookup(url, response(304, b'')).data is parsed.data
+    assert cache.lookup(url, response(200, b'{"data": 1}')).cached
+    assert cache.lookup(url, response(200, b'{"data": 2}')) is None
+    assert cache.lookup('https://api.whispertrades.com/v1/bots/B1', response(304, b'')) is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_failed_response_is_not_cached():
+    cache = ResponseCache()
+    url = 'https://api.whispertrades.com/v1/bots/'
+    cache.store(url, response(200, b'{}'), BaseResponse(success=True, message='OK', data=[]))
+    cache.store(url, response(200, b'{}'), BaseResponse(success=False, message='Error', data=[]))
+    assert len(cache) == 0
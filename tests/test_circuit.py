@@ -0,0 +1,55 @@
+import pytest
+from requests import Session
+from requests.exceptions import ChunkedEncodingError, Timeout
+
+from whispertrades import CircuitBreaker, CircuitOpenError, WTClient
+
+
+class FailingSession(Session):
+    """Session whose requests raise the given exception, ignoring adapters mounted by WTClient"""
+
+    def __init__(self, error: Exception):
+        super().__init__()
+        self.error = error
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def request(self, *args, **kwargs):
+        raise self.error
+
+
+def open_circuit(breaker: CircuitBreaker, family: str):
+    breaker.record_failure(family)
+    assert breaker.state(family) == 'open'
+
+
+@pytest.mark.parametrize('error', [ChunkedEncodingError('interrupted'), Timeout('local rate limiter deadline'), KeyboardInterrupt()])
+def test_trial_without_outcome_reopens_circuit(error):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    client = WTClient(token='x', auto_init=False, session=FailingSession(error), circuit_breaker=breaker, response_cache=False)
+    open_circuit(breaker, 'orders')
+    with pytest.raises(type(error)):
+        client.get_order('O1')  # the trial request, let through as the circuit is due
+    assert breaker.state('orders') == 'open'
+    assert breaker.allow('orders')  # due again, so another trial is let through instead of failing forever
+    assert breaker.state('orders') == 'half_open'
+
+
+def test_release_keeps_retry_time_of_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    open_circuit(breaker, 'orders')
+    breaker.circuits['orders'].retry_at = 0.0
+    assert breaker.allow('orders')
+    breaker.release('orders')
+    assert breaker.state('orders') == 'open'
+    assert not breaker.allow('orders')
+    assert breaker.retry_in('orders') > 0
+
+
+def test_open_circuit_without_cache_raises():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    client = WTClient(token='x', auto_init=False, session=FailingSession(ChunkedEncodingError()), circuit_breaker=breaker, response_cache=False)
+    open_circuit(breaker, 'orders')
+    with pytest.raises(CircuitOpenError):
+        client.get_order('O1')
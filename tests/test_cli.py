@@ -0,0 +1,36 @@
+import orjson
+import pytest
+from fake_api import FakeAPIServer
+
+from whispertrades.cli import main
+
+REPORT = 'R000000000'
+PREVIOUS_COMPLETED_AT = '2024-04-26T19:59:00Z'
+
+
+def run_report(server: FakeAPIServer, cache_dir, poll: float) -> int:
+    return main(['--token', 'x', '--endpoint', server.endpoint, '--cache-dir', str(cache_dir), '-o', 'json',
+                 'report', 'run', REPORT, '--wait', '--poll', str(poll), '--timeout', '10'])
+
+
+@pytest.mark.parametrize('start_delay, run_time, poll', [
+    (0.0, 0.3, 0.1),  # listed Running right away
+    (0.3, 0.3, 0.1),  # queued first, still listed with the previous result
+    (0.05, 0.05, 0.5),  # queued, run and completed between two polls, never seen Running
+])
+def test_report_run_wait_returns_this_run(tmp_path, capsys, start_delay, run_time, poll):
+    with FakeAPIServer('small') as server:
+        server.report_start_delay = start_delay
+        server.report_delay = run_time
+        assert run_report(server, tmp_path, poll) == 0
+    row = orjson.loads(capsys.readouterr().out.splitlines()[-1])
+    assert row['number'] == REPORT
+    assert row['status'] == 'Complete'
+    assert row['completed_at'] != PREVIOUS_COMPLETED_AT
+
+
+def test_report_wait_without_run_returns_current_result(tmp_path, capsys):
+    with FakeAPIServer('small') as server:
+        assert main(['--token', 'x', '--endpoint', server.endpoint, '--cache-dir', str(tmp_path), '-o', 'json', 'report', 'wait', REPORT]) == 0
+    row = orjson.loads(capsys.readouterr().out.splitlines()[-1])
+    assert row['completed_at'] == PREVIOUS_COMPLETED_AT
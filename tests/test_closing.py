@@ -0,0 +1,72 @@
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import WTClient
+
+OPEN_POSITIONS = ['P000000000', 'P000000010', 'P000000020']  # of three different bots
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint, max_workers=3)
+    client.get_positions()
+    yield client
+    client.close()
+
+
+def test_closing_orders_are_matched_when_filled(server, client):
+    server.fill_delay = 0.3
+    report = client.close_positions(OPEN_POSITIONS, poll_interval=0.1, timeout=10)
+    assert not report.timed_out
+    assert report.filled.keys() == set(OPEN_POSITIONS)
+    assert not report.unverified
+    orders = {result.order.number for result in report.results.values()}
+    assert len(orders) == len(OPEN_POSITIONS)  # each position matched to its own closing order
+    for result in report.results.values():
+        data = result.order._OrderResponse
+        assert data.type == 'CLOSING' and data.bot.number == result.bot_number
+        assert result.found_time <= result.done_time
+    assert report.order_requests == 0  # filled orders are found in the FILLED listing
+
+
+def test_rejected_closing_order_is_matched(server, client):
+    server.fill_delay = 0.3
+    server.rejected_closes = {OPEN_POSITIONS[1]}
+    report = client.close_positions(OPEN_POSITIONS, poll_interval=0.1, timeout=10)
+    assert report.failed.keys() == {OPEN_POSITIONS[1]}
+    rejected = report.results[OPEN_POSITIONS[1]]
+    assert rejected.status == 'REJECTED' and rejected.order is not None and not rejected.verified
+    assert report.order_requests == 1  # left WORKING without filling, so fetched on its own
+    assert report.filled.keys() == {OPEN_POSITIONS[0], OPEN_POSITIONS[2]}
+
+
+def test_timeout_leaves_working_orders_pending(server, client):
+    server.fill_delay = 60.0
+    report = client.close_positions(OPEN_POSITIONS, poll_interval=0.1, timeout=0.5)
+    assert report.timed_out
+    assert report.pending.keys() == set(OPEN_POSITIONS)
+    assert all(result.status == 'WORKING' and result.done_time is None for result in report.results.values())
+    assert report.total_time < 5
+
+
+def test_closing_order_filled_before_first_poll(server, client):
+    server.fill_delay = 0.0  # never listed as WORKING
+    report = client.close_positions(OPEN_POSITIONS, poll_interval=0.2, timeout=10)
+    assert report.polls == 1
+    assert report.filled.keys() == set(OPEN_POSITIONS)
+    assert not report.unverified
+
+
+def test_close_request_failure(server, client):
+    server.account.positions[0]['status'] = 'CLOSED'
+    server._cache.clear()
+    report = client.close_positions(OPEN_POSITIONS[:2], poll_interval=0.1, timeout=10)
+    failed = report.results[OPEN_POSITIONS[0]]
+    assert failed.status == 'FAILED' and failed.error is not None and failed.order is None
+    assert report.results[OPEN_POSITIONS[1]].status == 'FILLED'
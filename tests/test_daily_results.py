@@ -0,0 +1,74 @@
+import copy
+from datetime import date
+
+import pytest
+from fake_api import ACCOUNT_SIZES, FakeAccount
+from pydantic import ValidationError
+
+from whispertrades.report import DailyResults, ResultByDay, parse_report
+
+ACCOUNT = FakeAccount(**ACCOUNT_SIZES['small'])
+REPORT = ACCOUNT.report_details['R000000000']
+RECORDS = REPORT['results']['days']
+
+
+def test_typecodes_follow_field_types():
+    days = DailyResults.from_records(RECORDS)
+    expected = {float: 'd', int: 'q', date: 'i'}
+    for name, field in ResultByDay.model_fields.items():
+        assert days._columns[name].typecode == expected[field.annotation], name
+    assert days.ordinals.typecode == 'i'
+    assert days.dates[0] == date.fromisoformat(RECORDS[0]['date'])
+    assert days.nbytes == sum(days._columns[name].itemsize for name in days.fields) * len(RECORDS)
+
+
+def test_items_match_validated_models():
+    days = DailyResults.from_records(RECORDS)
+    models = [ResultByDay.model_validate(record) for record in RECORDS]
+    assert len(days) == len(models)
+    assert list(days) == models
+    assert days[0] == models[0] and days[-1] == models[-1]
+    assert days[5:10] == models[5:10]
+    assert days[::50] == models[::50]
+    assert list(days.column('profit')) == [m.profit for m in models]
+    assert list(days.column('underlying_current_drawdown_days')) == [m.underlying_current_drawdown_days for m in models]
+    assert days.column('date') == [m.date for m in models]
+    with pytest.raises(IndexError):
+        days[len(models)]
+    with pytest.raises(IndexError):
+        days[-len(models) - 1]
+
+
+def test_from_records_falls_back_to_validation():
+    records = copy.deepcopy(RECORDS[:3])
+    records[1]['profit'] = str(records[1]['profit'])  # accepted by the model, but not by a typed array
+    records[2]['underlying_current_drawdown_days'] = float(records[2]['underlying_current_drawdown_days'])
+    days = DailyResults.from_records(records)
+    assert list(days) == [ResultByDay.model_validate(record) for record in records]
+    assert isinstance(days[1].profit, float)
+    assert isinstance(days[2].underlying_current_drawdown_days, int)
+
+
+@pytest.mark.parametrize('change', [{'date': 'not a date'}, {'date': None}])
+def test_invalid_records_raise_validation_error(change):
+    records = copy.deepcopy(RECORDS[:2])
+    records[0].update(change)
+    with pytest.raises(ValidationError):
+        DailyResults.from_records(records)
+
+
+def test_missing_field_raises_validation_error():
+    records = copy.deepcopy(RECORDS[:2])
+    del records[1]['date']
+    with pytest.raises(ValidationError):
+        DailyResults.from_records(records)
+
+
+def test_parse_report_replaces_days_in_place():
+    payload = copy.deepcopy(REPORT)
+    response = parse_report(payload)
+    days = response.results.days
+    assert isinstance(days, DailyResults)
+    assert payload['results']['days'] is days
+    assert parse_report(payload).results.days is days  # parsing the same payload again reuses it
+    assert list(days) == [ResultByDay.model_validate(record) for record in RECORDS]
@@ -0,0 +1,125 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fake_api import ACCOUNT_SIZES, FakeAccount
+
+from whispertrades import WTClient
+from whispertrades.bot import Bot, BotResponse, split_details
+from whispertrades.evaluator import EXIT_RULES, ConditionEvaluation, MarketInputs
+from whispertrades.position import Position, PositionResponse
+
+ACCOUNT = FakeAccount(**ACCOUNT_SIZES['small'])
+TUESDAY = datetime(2024, 1, 16, 11, 0)  # 3 days before the legs expire
+SHORT_STRIKE, ENTRY_UNDERLYING = 4705.0, 4750.0  # open short put of every position, and the underlying price at entry
+NO_EXITS = dict.fromkeys(['profit_target_percent', 'stop_loss_percent', 'profit_premium_value', 'loss_premium_value', 'delta_stop', 'itm_percent_stop', 'otm_percent_stop'])
+
+
+@pytest.fixture(scope='module')
+def client() -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False)  # only owns the objects, no request is sent
+    yield client
+    client.close()
+
+
+def adjustment(number: str, status: str = 'Enabled', days: str = 'All', time_of_day: str = '10:00 to 15:30', dte: int = 7, **bounds) -> dict:
+    data = dict.fromkeys(ACCOUNT.bot_details['B000000000']['adjustments'][0])
+    data.update({'number': number, 'status': status, 'type': 'Roll', 'days_of_week': days, 'days_to_expiration': dte, 'time_of_day': time_of_day, 'variables': []}, **bounds)
+    return data
+
+
+def make_bot(client: WTClient, number: str, adjustments: list[dict] = (), **exit_rules) -> Bot:
+    data = dict(ACCOUNT.bot_details['B000000000'], number=number)
+    data['exit_condition'] = {**data['exit_condition'], **NO_EXITS, **exit_rules}
+    data['adjustments'] = list(adjustments)
+    summary, details = split_details(data)
+    return Bot(BotResponse(**summary), client, False, details=details)
+
+
+def make_position(client: WTClient, number: str, bot: str, profit: float = 0.0, delta: float = 0.1, entry: float = 1.05, mid: float = 0.55) -> Position:
+    data = ACCOUNT._position(0)  # an open put credit spread expiring 2024-01-19, with its short put at 4705
+    data.update({'number': number, 'bot': {'name': bot, 'number': bot}, 'current_profit': profit, 'current_delta': -delta, 'entry_price': entry, 'current_mid': mid,
+                 'underlying_at_entry': ENTRY_UNDERLYING})
+    return Position(PositionResponse(**data), client, False)
+
+
+def otm(price: float) -> float:
+    return (price - SHORT_STRIKE) / price * 100
+
+
+def test_profit_target_stop_loss_and_delta_stop(client):
+    bots = {'B1': make_bot(client, 'B1', profit_target_percent='50%', stop_loss_percent='200%', delta_stop=0.5)}
+    positions = [make_position(client, 'P1', 'B1', profit=25.0, delta=0.1), make_position(client, 'P2', 'B1', profit=-210.0, delta=0.2)]
+    evaluation = ConditionEvaluation(positions, bots, now=TUESDAY)
+    expected = np.array([[0.5, 225 / 200, np.nan, np.nan, 0.8, np.nan, np.nan],
+                         [260 / 50, 0.0, np.nan, np.nan, 0.6, np.nan, np.nan]])
+    np.testing.assert_allclose(evaluation.exit_distances, expected)
+    assert evaluation.exit_rule == ['profit_target', 'stop_loss']
+    np.testing.assert_allclose(evaluation.exit_distance, [0.5, 0.0])
+    assert evaluation.exits_triggered == ['P2']
+    assert evaluation.explain('P1')['exit_distances'] == pytest.approx({'profit_target': 0.5, 'stop_loss': 1.125, 'delta_stop': 0.8})
+
+
+def test_premium_direction_of_credit_and_debit_positions(client):
+    bots = {'CREDIT': make_bot(client, 'CREDIT', profit_premium_value='0.50', loss_premium_value='2.10'),
+            'DEBIT': make_bot(client, 'DEBIT', profit_premium_value='2.10', loss_premium_value='0.50')}
+    positions = [make_position(client, 'P1', 'CREDIT', entry=1.05, mid=0.55),  # credit: profit when the mid falls towards 0.50
+                 make_position(client, 'P2', 'DEBIT', entry=1.05, mid=1.575),  # debit: profit when the mid rises towards 2.10
+                 make_position(client, 'P3', 'CREDIT', entry=-1.05, mid=-2.20)]  # credits may be signed, and past the loss premium
+    evaluation = ConditionEvaluation(positions, bots, now=TUESDAY)
+    premiums = evaluation.exit_distances[:, [EXIT_RULES.index('profit_premium'), EXIT_RULES.index('loss_premium')]]
+    np.testing.assert_allclose(premiums, [[0.05 / 0.55, 1.55 / 1.05], [0.525 / 1.05, 1.075 / 0.55], [1.70 / 0.55, 0.0]])
+    assert evaluation.exit_rule == ['profit_premium', 'profit_premium', 'loss_premium']
+
+
+@pytest.mark.parametrize('price, itm, otm_stop', [
+    (4800.0, (1 + otm(4800)) / (1 + otm(ENTRY_UNDERLYING)), (otm(4800) - 0.5) / (otm(ENTRY_UNDERLYING) - 0.5)),  # moved away from the strike
+    (4700.0, (1 + otm(4700)) / (1 + otm(ENTRY_UNDERLYING)), 0.0),  # past the OTM stop, not yet the ITM stop
+    (4650.0, 0.0, 0.0),  # more than 1% in the money
+    (None, np.nan, np.nan),  # no price, skipped
+])
+def test_itm_and_otm_stops(client, price, itm, otm_stop):
+    bots = {'B1': make_bot(client, 'B1', itm_percent_stop='1%', otm_percent_stop='0.5%')}
+    market = MarketInputs(prices={'SPX': price} if price else None)
+    evaluation = ConditionEvaluation([make_position(client, 'P1', 'B1')], bots, market=market, now=TUESDAY)
+    np.testing.assert_allclose(evaluation.exit_distances[0, -2:], [itm, otm_stop])
+    if price:
+        assert evaluation.otm_percent[0] == pytest.approx(otm(price))
+
+
+def test_adjustment_windows(client):
+    bots = {'B1': make_bot(client, 'B1', adjustments=[adjustment('A1', minimum_position_delta='0.3')]),
+            'B2': make_bot(client, 'B2', adjustments=[adjustment('A2', days='Monday, Wednesday', minimum_position_delta='0.3')]),
+            'B3': make_bot(client, 'B3', adjustments=[adjustment('A3', dte=2, minimum_position_delta='0.3')])}
+    positions = [make_position(client, 'P1', 'B1', delta=0.1), make_position(client, 'P2', 'B1', delta=0.35),
+                 make_position(client, 'P3', 'B2', delta=0.35), make_position(client, 'P4', 'B3', delta=0.35)]
+    evaluation = ConditionEvaluation(positions, bots, now=TUESDAY)
+    np.testing.assert_allclose(evaluation.adjustment_distance, [0.2 / 0.3, 0.0, np.nan, 1 / 2])  # not on Tuesdays; 3 days to expiration, 1 above its maximum of 2
+    assert evaluation.adjustment == ['A1', 'A1', None, 'A3']
+    assert evaluation.adjustments_triggered == {'P2': 'A1'}
+    for now in (datetime(2024, 1, 16, 16, 0), datetime(2024, 1, 16, 9, 59), datetime(2024, 1, 13, 11, 0)):  # after and before the time of day, Saturday
+        assert ConditionEvaluation(positions, bots, now=now).adjustment == [None] * 4
+
+
+def test_nearest_enabled_adjustment_is_selected(client):
+    adjustments = [adjustment('FAR', minimum_position_delta='0.3'), adjustment('NEAR', minimum_position_delta='0.12'),
+                   adjustment('OFF', status='Disabled', minimum_position_delta='0.05'), adjustment('PROFIT', minimum_position_profit_percent='20')]
+    bots = {'B1': make_bot(client, 'B1', adjustments)}
+    positions = [make_position(client, 'P1', 'B1', delta=0.1, profit=10.0), make_position(client, 'P2', 'B1', delta=0.1, profit=25.0)]
+    evaluation = ConditionEvaluation(positions, bots, now=TUESDAY)
+    assert evaluation.adjustment == ['NEAR', 'PROFIT']
+    np.testing.assert_allclose(evaluation.adjustment_distance, [0.02 / 0.12, 0.0])
+    assert evaluation.adjustments_triggered == {'P2': 'PROFIT'}
+
+
+def test_priority(client):
+    bots = {'B1': make_bot(client, 'B1', [adjustment('A1', minimum_position_delta='0.3')], profit_target_percent='50%')}
+    positions = [make_position(client, 'FAR', 'B1', profit=0.0, delta=0.0),  # exit 1.0, adjustment 1.0
+                 make_position(client, 'NONE', 'B9'),  # bot not evaluated, no rules
+                 make_position(client, 'EXIT', 'B1', profit=40.0, delta=0.0),  # exit 0.2
+                 make_position(client, 'ADJUST', 'B1', profit=0.0, delta=0.27)]  # adjustment 0.1
+    evaluation = ConditionEvaluation(positions, bots, now=TUESDAY)
+    np.testing.assert_allclose(evaluation.distance, [1.0, np.nan, 0.2, 0.1])
+    assert evaluation.priority() == ['ADJUST', 'EXIT', 'FAR', 'NONE']
+    assert evaluation.priority(top=2) == ['ADJUST', 'EXIT']
+    assert list(evaluation.near(0.2)) == ['ADJUST', 'EXIT']
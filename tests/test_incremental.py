@@ -0,0 +1,39 @@
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import WTClient
+
+BOT = 'B000000000'
+
+
+def test_bot_orders_refresh_from_oldest_working_order():
+    with FakeAPIServer('small') as server:
+        orders = [o for o in server.account.orders if o['bot']['number'] == BOT]
+        for day, order in enumerate(orders, start=1):
+            order['submitted_at'] = f'2024-01-{day:02d}T15:00:00.000000Z'
+        working, oldest = orders[10], orders[0]
+        working['status'] = 'WORKING'
+        queries = []
+        respond = server.respond
+
+        def recording_respond(path, query):
+            if path.startswith('/v1/bots/orders/'):
+                queries.append({k: v[0] for k, v in query.items()})
+            return respond(path, query)
+
+        server.respond = recording_respond
+        with WTClient(token='x', auto_init=False, session=UnlimitedSession(), endpoint=server.endpoint) as client:
+            bot = client.get_bot(BOT, include_details=False)
+            view = bot.orders
+            assert queries == [{'bot': BOT}]  # all orders of the bot the first time
+            assert len(view) == len(orders)
+            untouched = view[oldest['number']]
+
+            working['status'] = 'FILLED'
+            oldest['status'] = 'CANCELED'  # older than the working order, so not expected to change and not requested again
+            server._cache.clear()
+            view = bot.orders
+            assert queries[1:] == [{'bot': BOT, 'from_date': '2024-01-10'}]  # one request, from a day before the oldest working order
+            assert view[working['number']]._OrderResponse.status == 'FILLED'  # merged from the incremental response, read without refreshing the order
+            assert len(view) == len(orders)
+            assert view[oldest['number']] is untouched
+            assert untouched._OrderResponse.status == 'FILLED'
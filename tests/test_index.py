@@ -0,0 +1,51 @@
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import WTClient
+
+BOT, OTHER_BOT = 'B000000000', 'B000000001'
+ORDER, POSITION = 'O000000003', 'P000000003'  # of BOT
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint)
+    yield client
+    client.close()
+
+
+def change(server: FakeAPIServer, items: list, number: str, **changes):
+    next(i for i in items if i['number'] == number).update(changes)
+    server._cache.clear()
+
+
+def test_merge_updates_collection_and_bot_view(server, client):
+    orders = client.get_orders()
+    order = orders[ORDER]
+    view = client._bot_view('orders', BOT)
+    assert view[ORDER] is order
+    change(server, server.account.orders, ORDER, status='CANCELED')
+    client.get_orders()
+    assert dict.__getitem__(client._orders, ORDER) is order  # merged into the cached instance
+    assert order.status == 'CANCELED'
+    assert view[ORDER] is order
+    assert len(view) == sum(o['bot']['number'] == BOT for o in server.account.orders)
+
+
+@pytest.mark.parametrize('kind', ['orders', 'positions'])
+def test_index_drops_entities_that_move_to_another_bot(server, client, kind):
+    get, items, number = (client.get_orders, server.account.orders, ORDER) if kind == 'orders' else (client.get_positions, server.account.positions, POSITION)
+    item = get()[number]
+    previous, new = client._bot_view(kind, BOT), client._bot_view(kind, OTHER_BOT)
+    assert number in previous and number not in new
+    change(server, items, number, bot={'name': 'Bot 1', 'number': OTHER_BOT})
+    get()
+    assert item.bot.number == OTHER_BOT
+    assert number not in previous and number not in list(previous)
+    assert new[number] is item
@@ -0,0 +1,130 @@
+import os
+import pickle
+import threading
+
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import DetachedError, WTClient
+from whispertrades.client import _reinit_clients_after_fork
+
+BOT, ORDER, POSITION, REPORT = 'B000000000', 'O000000003', 'P000000003', 'R000000000'
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, session=UnlimitedSession(), endpoint=server.endpoint, max_workers=2)
+    yield client
+    client.close()
+
+
+def change(server: FakeAPIServer, kind: str, number: str, **changes):
+    """Change an item of the fake account, as if it changed on the server"""
+    items = {'orders': server.account.orders, 'positions': server.account.positions, 'reports': server.account.reports}[kind]
+    next(i for i in items if i['number'] == number).update(changes)
+    if kind == 'reports':
+        server.account.report_details[number].update(changes)
+    server._cache.clear()
+
+
+def round_trip(obj):
+    restored = pickle.loads(pickle.dumps(obj))
+    assert restored.detached and not restored.auto_refresh
+    return restored
+
+
+def test_bot_with_orders_and_positions(server, client):
+    bot = client.get_bots()[BOT]
+    orders, positions = dict(bot.orders), dict(bot.positions)
+    assert ORDER in orders and POSITION in positions
+    restored = round_trip(bot)
+    requests = server.request_count
+    assert restored.orders.keys() == orders.keys() and restored.positions.keys() == positions.keys()  # read without requests while detached
+    assert restored.orders[ORDER].status == 'FILLED'
+    assert server.request_count == requests
+    with pytest.raises(DetachedError):
+        restored.enable()
+    restored_order = restored.orders[ORDER]
+    restored.attach(client)
+    assert not restored.detached and not restored_order.detached
+    change(server, 'orders', ORDER, status='CANCELED')
+    assert restored_order.status == 'CANCELED'  # refreshed through the client, then copied from its cached instance
+    assert restored_order is not client.orders[ORDER]
+    assert restored.orders[ORDER] is dict.__getitem__(client._orders, ORDER)  # refreshing replaces the plain dict by the view of the client
+
+
+@pytest.mark.parametrize('kind, number, field, value', [('orders', ORDER, 'status', 'CANCELED'), ('positions', POSITION, 'status', 'CLOSED')])
+def test_order_and_position(server, client, kind, number, field, value):
+    get = client.get_order if kind == 'orders' else client.get_position
+    original = get(number)
+    restored = round_trip(original)
+    assert getattr(restored, field) == getattr(original, field)
+    restored.attach(client)
+    change(server, kind, number, **{field: value})
+    assert getattr(restored, field) == value
+    assert getattr(dict.__getitem__(getattr(client, f'_{kind}'), number), field) == value
+
+
+def test_report(server, client):
+    client.get_reports()
+    report = client.get_report(REPORT)
+    days = len(report.daily_results)
+    restored = round_trip(report)
+    assert len(restored.daily_results) == days
+    assert restored.daily_results[0].date == report.daily_results[0].date
+    with pytest.raises(DetachedError):
+        restored.run()
+    restored.attach(client)
+    change(server, 'reports', REPORT, name='Renamed')
+    restored.yearly_results  # refreshes with auto_refresh
+    assert restored.name == 'Renamed'
+    assert len(restored.daily_results) == days
+
+
+def test_reinit_after_fork_resets_locks_session_and_pool(server, client):
+    client.get_orders()
+    client.submit(client.get_bots).result()
+    adapter = client.session.get_adapter(server.endpoint)
+    pool, lock, limiter_lock, executor = adapter.poolmanager, client._lock, client.rate_limiter._lock, client._executor
+    _reinit_clients_after_fork()
+    assert client._lock is not lock and client.rate_limiter._lock is not limiter_lock
+    assert client._executor is None and executor is not None
+    assert adapter.poolmanager is not pool
+    assert client.get_orders()  # opens a new connection
+    executor.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_fork_child_gets_new_locks_and_connections(server, client):
+    client.get_orders()
+    client.submit(client.get_bots).result()
+    pool = client.session.get_adapter(server.endpoint).poolmanager
+    held, release = threading.Event(), threading.Event()
+
+    def hold():  # a lock held by another thread at fork time would never be released in the child
+        with client._lock, client.rate_limiter._lock:
+            held.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = (client._lock.acquire(timeout=5) and client.rate_limiter._lock.acquire(timeout=5) and client._executor is None
+                  and client.session.get_adapter(server.endpoint).poolmanager is not pool)
+            ok = ok and client.rate_limiter._lock.release() is None and bool(client.get_positions())
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    release.set()
+    holder.join()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,182 @@
+from email.utils import formatdate
+
+import pytest
+from requests import Request, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from whispertrades import ratelimit
+from whispertrades.ratelimit import AdaptiveLimiterAdapter, AdaptiveRateLimiter, RetryPolicy
+
+
+class FakeClock:
+    """Replaces the time module of whispertrades.ratelimit, so that waits advance a counter instead of sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    perf_counter = monotonic
+
+    def time(self) -> float:
+        return 1_700_000_000.0 + self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, 'time', clock)
+    return clock
+
+
+def response(status: int = 200, **headers) -> Response:
+    r = Response()
+    r.status_code = status
+    r.headers.update({k.replace('_', '-'): v for k, v in headers.items()})
+    r._content = b'{}'
+    return r
+
+
+class ScriptedTransport(HTTPAdapter):
+    """Returns or raises the given outcomes in order instead of sending requests"""
+
+    def __init__(self, outcomes: list, **kwargs):
+        super().__init__(**kwargs)
+        self.outcomes = list(outcomes)
+        self.sent: list[dict] = []
+
+    def send(self, request, **kwargs):
+        self.sent.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class ScriptedAdapter(AdaptiveLimiterAdapter, ScriptedTransport):
+    pass
+
+
+def adapter(outcomes: list, **kwargs) -> ScriptedAdapter:
+    kwargs.setdefault('retry', RetryPolicy(max_retries=3, backoff=1.0))
+    return ScriptedAdapter(outcomes=outcomes, **kwargs)
+
+
+def send(a: ScriptedAdapter, method: str = 'GET', **kwargs) -> Response:
+    return a.send(Request(method, 'https://api.whispertrades.com/v1/bots').prepare(), **kwargs)
+
+
+def test_rolling_window_allows_bursts_up_to_the_limit(clock):
+    limiter = AdaptiveRateLimiter(per_minute=3, window=60)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    clock.now += 10
+    assert limiter.acquire() == pytest.approx(50.0)  # until the first request leaves the window
+    clock.now += 60
+    assert limiter.acquire() == 0.0
+
+
+def test_rolling_window_frees_slots_one_by_one(clock):
+    limiter = AdaptiveRateLimiter(per_minute=2, window=60)
+    limiter.acquire()
+    clock.now += 30
+    limiter.acquire()
+    assert limiter.acquire() == pytest.approx(30.0)
+    assert limiter.acquire() == pytest.approx(30.0)
+
+
+def test_server_remaining_quota_takes_precedence(clock):
+    limiter = AdaptiveRateLimiter(per_minute=1, window=60)
+    limiter.acquire()
+    limiter.update(response(X_RateLimit_Limit='100', X_RateLimit_Remaining='2'))
+    assert limiter.limit == 100
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.0
+    assert limiter.remaining == 0
+    assert limiter.acquire() == pytest.approx(60.0)  # exhausted until the reported quota expires
+
+
+def test_server_reset_header(clock):
+    limiter = AdaptiveRateLimiter()
+    limiter.update(response(X_RateLimit_Remaining='0', X_RateLimit_Reset='10'))
+    assert limiter.acquire() == pytest.approx(10.0)
+    limiter.update(response(X_RateLimit_Remaining='0', X_RateLimit_Reset=str(clock.time() + 20)))  # epoch timestamp
+    assert limiter.acquire() == pytest.approx(20.0)
+
+
+@pytest.mark.parametrize('retry_after', ['5', formatdate(1_700_000_000.0 + 1005.0, usegmt=True)])
+def test_retry_after_blocks_the_limiter(clock, retry_after):
+    limiter = AdaptiveRateLimiter()
+    limiter.update(response(429, Retry_After=retry_after))
+    assert limiter.acquire() == pytest.approx(5.0)
+
+
+def test_retry_after_is_honoured_by_the_adapter(clock):
+    a = adapter([response(429, Retry_After='5'), response(200)])
+    r = send(a)
+    assert r.status_code == 200
+    assert r.retries == 1
+    assert 5.0 <= clock.slept <= 5.5  # Retry-After plus at most 10% jitter
+    assert r.limiter_wait == pytest.approx(clock.slept)
+
+
+@pytest.mark.parametrize('method', ['GET', 'PUT', 'POST', 'DELETE'])
+def test_429_is_retried_for_every_method(clock, method):
+    a = adapter([response(429, Retry_After='1'), response(200)])
+    assert send(a, method).status_code == 200
+    assert len(a.sent) == 2
+
+
+@pytest.mark.parametrize('method, attempts', [('GET', 2), ('PUT', 1), ('POST', 1)])
+def test_server_errors_are_retried_only_for_get(clock, method, attempts):
+    a = adapter([response(503), response(200)])
+    r = send(a, method)
+    assert len(a.sent) == attempts
+    assert r.status_code == (200 if method == 'GET' else 503)
+
+
+@pytest.mark.parametrize('method', ['GET', 'PUT'])
+def test_connection_errors_are_retried_only_for_get(clock, method):
+    a = adapter([ConnectionError('reset'), response(200)])
+    if method == 'GET':
+        assert send(a, method).status_code == 200
+    else:
+        with pytest.raises(ConnectionError):
+            send(a, method)
+        assert len(a.sent) == 1
+
+
+def test_retries_stop_after_max_retries(clock):
+    a = adapter([response(502)] * 5, retry=RetryPolicy(max_retries=2))
+    r = send(a)
+    assert r.status_code == 502
+    assert r.retries == 2
+    assert len(a.sent) == 3
+
+
+def test_deadline_caps_attempt_timeouts(clock):
+    a = adapter([response(200)], deadline=10.0)
+    send(a, timeout=(5, 30))
+    assert a.sent[0]['timeout'] == (5, 10.0)
+
+
+def test_deadline_returns_failed_response_without_time_to_retry(clock):
+    a = adapter([response(429, Retry_After='20'), response(200)], deadline=10.0)
+    r = send(a, 'PUT')
+    assert r.status_code == 429
+    assert clock.slept == 0.0
+    assert len(a.sent) == 1
+
+
+def test_deadline_raises_when_the_limiter_is_blocked(clock):
+    a = adapter([response(200)], deadline=10.0)
+    a.limiter.block_for(30)
+    with pytest.raises(Timeout):
+        send(a)
+    assert a.sent == []
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import AdaptiveRateLimiter, WTClient
+from whispertrades.refresher import BackgroundRefresher, request_budget
+from whispertrades.scheduler import PositionRefreshScheduler
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint)
+    client.get_bots()
+    yield client
+    client.close()
+
+
+def test_reads_return_snapshot_while_refreshing(server, client):
+    server.latency = 0.5
+    refresher = client.start_background_refresh(intervals={'bots': 0.05})
+    first = refresher.snapshot('bots')
+    started = time.monotonic()
+    while refresher.snapshot('bots') is first:
+        assert client.bots is refresher.snapshot('bots').data  # the published snapshot, without waiting for the refresh in flight
+        time.sleep(0.05)
+        assert time.monotonic() - started < 5
+    assert time.monotonic() - started >= 0.4  # at least one read happened during the refresh
+    assert refresher.snapshot('bots').refreshed_at > first.refreshed_at
+    assert client.bots.keys() == first.data.keys()
+
+
+def test_max_staleness_blocks_until_refreshed(server, client):
+    refresher = BackgroundRefresher(client, intervals={'bots': 3600.0}, max_staleness=0.2)
+    first = refresher.snapshot('bots')  # published from the bots already loaded
+    requests = server.request_count
+    assert refresher.read('bots') is first.data
+    assert server.request_count == requests
+    time.sleep(0.25)
+    refresher.read('bots')
+    assert server.request_count == requests + 1
+    assert refresher.snapshot('bots') is not first and refresher.age('bots') < 0.2
+    assert refresher.refresh('bots', if_older_than=0.2) is refresher.snapshot('bots')  # refreshed meanwhile, so not sent again
+    assert server.request_count == requests + 1
+
+
+def test_missing_snapshot_blocks_without_max_staleness(server, client):
+    refresher = BackgroundRefresher(client, intervals={'positions': 3600.0})
+    assert refresher.snapshot('positions') is None
+    assert len(refresher.read('positions')) == len(server.account.positions)
+    requests = server.request_count
+    time.sleep(0.1)
+    refresher.read('positions')
+    assert server.request_count == requests
+
+
+@pytest.mark.parametrize('limit, window, share, expected', [
+    (30, 60.0, 0.5, 15),
+    (30, 10.0, 0.5, 15),  # per window, whatever its length
+    (120, 60.0, 0.25, 30),
+    (3, 60.0, 0.1, 1),  # never below one request
+])
+def test_request_budget(limit, window, share, expected):
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, rate_limiter=AdaptiveRateLimiter(limit, window))
+    assert request_budget(client, share) == expected
+    client.close()
+
+
+def test_budget_follows_the_limiter(client):
+    refresher = BackgroundRefresher(client, intervals={'bots': 60.0}, budget_share=0.5)
+    scheduler = PositionRefreshScheduler(client, budget_share=0.25)
+    assert (refresher.budget, scheduler.budget) == (15, 7)
+    client.rate_limiter.limit = 120  # e.g. from X-RateLimit-Limit
+    assert (refresher.budget, scheduler.budget) == (60, 30)
+
+
+def test_budget_wait_uses_limiter_window(client):
+    client.rate_limiter = AdaptiveRateLimiter(per_minute=4, window=2.0)
+    refresher = BackgroundRefresher(client, intervals={'bots': 60.0}, budget_share=0.5)
+    scheduler = PositionRefreshScheduler(client, budget_share=0.5)
+    assert refresher.budget == scheduler.budget == 2
+    now = time.monotonic()
+    for sent, budget_wait in ((refresher._sent, lambda: refresher._budget_wait('bots')), (scheduler._sent, scheduler._budget_wait)):
+        sent.extend([now - 2.5, now - 0.5])  # the first is outside the window
+        assert budget_wait() == 0.0
+        assert len(sent) == 1
+        sent.append(now - 0.25)
+        assert budget_wait() == pytest.approx(1.5, abs=0.05)  # until the oldest leaves the window
+
+
+def test_budget_wait_of_paginated_refresh(client):
+    client.rate_limiter = AdaptiveRateLimiter(per_minute=8, window=2.0)
+    refresher = BackgroundRefresher(client, intervals={'orders': 60.0}, budget_share=0.5)
+    client._orders.update({str(i): None for i in range(250)})  # 3 pages
+    assert refresher._estimate_requests('orders') == 3
+    now = time.monotonic()
+    refresher._sent.extend([now - 1.0, now - 0.5])
+    assert refresher._budget_wait('orders') == pytest.approx(1.0, abs=0.05)  # 3 requests fit in the budget of 4 once the oldest is gone
+    client._orders.update({str(i): None for i in range(1000)})
+    refresher._sent.clear()
+    assert refresher._budget_wait('orders') == 0.0  # more pages than the budget still refresh when nothing else was sent
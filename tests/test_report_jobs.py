@@ -0,0 +1,102 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from fake_api import FakeAPIServer, UnlimitedSession
+
+from whispertrades import ReportJobManager, WTClient
+from whispertrades.report_jobs import CLOCK_SKEW, ReportJob
+
+REPORTS = ['R000000000', 'R000000001']
+
+
+@pytest.fixture
+def server():
+    with FakeAPIServer('small') as server:
+        server.report_delay = 0.2
+        yield server
+
+
+@pytest.fixture
+def client(server) -> WTClient:
+    client = WTClient(token='x', auto_init=False, auto_refresh=False, session=UnlimitedSession(), endpoint=server.endpoint)
+    yield client
+    client.close()
+
+
+def iso(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def test_finished_with_clock_skew():
+    job = ReportJob(REPORTS[0])
+    job.started_at = datetime.now(timezone.utc)
+    assert not job._finished('Complete', iso(job.started_at - timedelta(days=1)))  # the previous run
+    assert job._finished('Complete', iso(job.started_at - CLOCK_SKEW / 2))  # this run, with the local clock ahead
+    assert not job._finished('Complete', iso(job.started_at - CLOCK_SKEW * 2))
+    assert not job._finished('Complete', None)
+    assert not job._finished('Running', None)
+    assert job.seen_running
+    assert job._finished('Complete', iso(job.started_at - timedelta(days=1)))  # seen running, so any later status is final
+    assert job._finished('Failed', None)
+
+
+def test_concurrency_cap(server, client):
+    manager = ReportJobManager(client, max_concurrent=1, poll_interval=0.1)
+    futures = [manager.submit(number) for number in REPORTS]
+    manager._start_queued()
+    first, second = jobs = manager.jobs
+    assert [job.status for job in jobs] == ['RUNNING', 'QUEUED']
+    assert len(server._runs) == 1
+    assert manager.wait(timeout=10)
+    assert [f.result().status for f in futures] == ['Complete', 'Complete']
+    assert second.started_at >= first.finished_at
+
+
+def test_same_report_runs_once_at_a_time(server, client):
+    manager = ReportJobManager(client, max_concurrent=2, poll_interval=0.1)
+    first = manager.submit(REPORTS[0], name='First')
+    second = manager.submit(REPORTS[0], name='Second')
+    manager._start_queued()
+    assert [job.status for job in manager.jobs] == ['RUNNING', 'QUEUED']
+    assert manager.wait(timeout=10)
+    assert first.result().name == 'First'
+    assert second.result().name == 'Second'
+
+
+def test_state_is_persisted_and_resumed(tmp_path, server, client):
+    path = tmp_path / 'jobs.json'
+    manager = ReportJobManager(client, max_concurrent=1, poll_interval=0.1, state_path=path)
+    for number in REPORTS:
+        manager.submit(number)
+    manager._start_queued()
+    saved = orjson.loads(path.read_bytes())['jobs']
+    assert [(job['number'], job['status']) for job in saved] == [(REPORTS[0], 'RUNNING'), (REPORTS[1], 'QUEUED')]
+
+    finished = []
+    resumed = ReportJobManager(client, max_concurrent=1, poll_interval=0.1, state_path=path, callback=finished.append)  # e.g. after a restart
+    assert [(job.number, job.status) for job in resumed.jobs] == [(REPORTS[0], 'RUNNING'), (REPORTS[1], 'QUEUED')]
+    assert resumed.jobs[0].started_at == manager.jobs[0].started_at
+    assert resumed.wait(timeout=10)
+    assert [report.number for report in finished] == REPORTS
+    assert orjson.loads(path.read_bytes())['jobs'] == []
+
+
+def test_poll_does_not_hold_lock_while_fetching(server, client):
+    manager = ReportJobManager(client, max_concurrent=1, poll_interval=0.1)
+    future = manager.submit(REPORTS[0])
+    get_report = client.get_report
+    acquired = []
+
+    def fetch(number):
+        other = threading.Thread(target=lambda: acquired.append(manager._lock.acquire(timeout=2) and manager._lock.release() is None))
+        other.start()
+        other.join()
+        assert manager.jobs[0].number == number  # still counted as running meanwhile
+        return get_report(number)
+
+    client.get_report = fetch
+    assert manager.wait(timeout=10)
+    assert future.result().status == 'Complete'
+    assert acquired == [True]